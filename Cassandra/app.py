@@ -106,6 +106,7 @@ def print_menu():
         11: "Q11 - Conteo de tickets por prioridad",
         12: "Q12 - Tickets por instalaciones",
         13: "Q13 - Tickets por turno",
+        14: "Q3b - Conteo por categoria en un rango de dias",
         0: "Salir",
     }
     print("\n=== Menu de consultas Cassandra ===")
@@ -185,6 +186,10 @@ def main():
             model.tickets_por_instalaciones(session, depto)
         elif opcion == 13:
             model.tickets_por_turno(session)
+        elif opcion == 14:
+            f1 = input("Fecha inicio (YYYY-MM-DD): ").strip()
+            f2 = input("Fecha fin (YYYY-MM-DD): ").strip()
+            model.tickets_por_categoria_rango(session, f1, f2)
 
         else:
             print("Opcion no valida.")
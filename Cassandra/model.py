@@ -1,5 +1,7 @@
+from collections import deque
+from datetime import datetime, date, timedelta
+from itertools import islice
 import logging
-from datetime import datetime, date
 
 # Logger
 log = logging.getLogger()
@@ -12,15 +14,45 @@ CREATE_KEYSPACE = """
 """
 
 
-# 1. Alerta de tickets vencidos
-CREATE_ALERTAS_TICKETS_VENCIDOS_TABLE = """
-    CREATE TABLE IF NOT EXISTS alertas_tickets_vencidos (
-        dias_inactivos int,
+# 1. Alerta de tickets vencidos (antiguedad del backlog)
+# Cada ticket abierto (no cerrado) vive en la cubeta del dia de su ultimo
+# cambio: la cubeta es la fecha de inicio de un bloque de DIAS_POR_CUBETA
+# dias. "Mas de N dias inactivo" se responde leyendo solo las cubetas
+# anteriores al corte; los dias se calculan al consultar, no se guardan.
+# Cambiar DIAS_POR_CUBETA requiere volver a cargar estas tablas.
+DIAS_POR_CUBETA = 7
+
+CREATE_TICKETS_POR_ANTIGUEDAD_TABLE = """
+    CREATE TABLE IF NOT EXISTS tickets_por_antiguedad (
+        cubeta date,
+        fecha_ultimo_cambio timestamp,
+        ticket_id text,
+        estado_actual text,
+        PRIMARY KEY (cubeta, fecha_ultimo_cambio, ticket_id)
+    ) WITH CLUSTERING ORDER BY (fecha_ultimo_cambio ASC, ticket_id ASC);
+"""
+
+# Cubetas que tienen (o tuvieron) tickets: una sola particion con pocas filas
+# (una por bloque de dias), para no tener que adivinar desde donde leer.
+GRUPO_CUBETAS = 0
+
+CREATE_CUBETAS_ANTIGUEDAD_TABLE = """
+    CREATE TABLE IF NOT EXISTS cubetas_antiguedad (
+        grupo int,
+        cubeta date,
+        PRIMARY KEY (grupo, cubeta)
+    ) WITH CLUSTERING ORDER BY (cubeta ASC);
+"""
+
+# Donde esta cada ticket, para sacarlo de su cubeta cuando cambia de estado
+CREATE_ULTIMO_CAMBIO_TICKET_TABLE = """
+    CREATE TABLE IF NOT EXISTS ultimo_cambio_ticket (
         ticket_id text,
+        cubeta date,
         fecha_ultimo_cambio timestamp,
         estado_actual text,
-        PRIMARY KEY (dias_inactivos, ticket_id)
-    ) WITH CLUSTERING ORDER BY (ticket_id ASC);
+        PRIMARY KEY (ticket_id)
+    );
 """
 
 
@@ -105,16 +137,19 @@ CREATE_TICKETS_POR_ESTADO_TABLE = """
 
 
 # 8. Filtrado de tickets por fecha
-CREATE_FILTRADO_TICKETS_POR_FECHA_TABLE = """
-    CREATE TABLE IF NOT EXISTS filtrado_tickets_por_fecha (
-        fecha timestamp,
+# Particionada por dia: un rango de fechas lee solo las particiones de los
+# dias del rango (ver leer_por_cubetas), nunca toda la tabla.
+CREATE_TICKETS_POR_DIA_TABLE = """
+    CREATE TABLE IF NOT EXISTS tickets_por_dia (
+        fecha date,
+        hora timestamp,
         ticket_id text,
         user_id text,
         categoria text,
         estado text,
         prioridad text,
-        PRIMARY KEY (fecha, ticket_id)
-    );
+        PRIMARY KEY (fecha, hora, ticket_id)
+    ) WITH CLUSTERING ORDER BY (hora ASC, ticket_id ASC);
 """
 
 
@@ -192,14 +227,16 @@ def create_schema(session):
     """Crea todas las tablas del modelo de soporte al cliente."""
     log.info("Creando tablas de Cassandra para soporte al cliente")
 
-    session.execute(CREATE_ALERTAS_TICKETS_VENCIDOS_TABLE)
+    session.execute(CREATE_TICKETS_POR_ANTIGUEDAD_TABLE)
+    session.execute(CREATE_CUBETAS_ANTIGUEDAD_TABLE)
+    session.execute(CREATE_ULTIMO_CAMBIO_TICKET_TABLE)
     session.execute(CREATE_HISTORIAL_POR_USUARIO_TABLE)
     session.execute(CREATE_CONTEO_TICKETS_POR_CATEGORIA_DIA_TABLE)
     session.execute(CREATE_TICKETS_POR_PROFESOR_TABLE)
     session.execute(CREATE_HISTORIAL_TICKET_TABLE)
     session.execute(CREATE_TICKETS_POR_INSTALACION_TABLE)
     session.execute(CREATE_TICKETS_POR_ESTADO_TABLE)
-    session.execute(CREATE_FILTRADO_TICKETS_POR_FECHA_TABLE)
+    session.execute(CREATE_TICKETS_POR_DIA_TABLE)
     session.execute(CREATE_TICKETS_POR_USUARIO_DIA_TABLE)
     session.execute(CREATE_TICKETS_POR_ROL_TABLE)
     session.execute(CREATE_CONTEO_TICKETS_POR_PRIORIDAD_TABLE)
@@ -209,6 +246,32 @@ def create_schema(session):
 
 #consultas
 
+# Lecturas por cubeta en vuelo a la vez en los reportes por rango
+CONCURRENCIA_RANGO = 32
+
+
+def dias_en_rango(inicio: date, fin: date) -> list:
+    """Cubetas (dias) de inicio a fin, ambos incluidos."""
+    return [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+
+
+def leer_por_cubetas(session, stmt, parametros, concurrencia: int = CONCURRENCIA_RANGO):
+    """
+    Ejecuta `stmt` una vez por juego de `parametros` (uno por cubeta, en
+    orden de tiempo) con execute_async, con a lo mas `concurrencia` lecturas
+    en vuelo, y va regresando las filas en el orden de las cubetas: como
+    cada cubeta ya viene ordenada por su columna de clustering, el resultado
+    queda en orden de tiempo sin tener que juntar todo en memoria.
+    """
+    parametros = iter(parametros)
+    en_vuelo = deque(session.execute_async(stmt, p) for p in islice(parametros, concurrencia))
+    while en_vuelo:
+        filas = en_vuelo.popleft().result()
+        # Se manda la siguiente lectura antes de consumir esta cubeta
+        for p in islice(parametros, 1):
+            en_vuelo.append(session.execute_async(stmt, p))
+        yield from filas
+
 def _parse_date(date_str: str) -> date:
     return datetime.strptime(date_str, "%Y-%m-%d").date()
 
@@ -221,29 +284,123 @@ def _parse_timestamp(ts_str: str) -> datetime:
     return datetime.fromisoformat(ts_str)
 
 
+def cubeta_antiguedad(fecha) -> date:
+    """Cubeta (fecha de inicio del bloque de DIAS_POR_CUBETA dias) de una fecha."""
+    if isinstance(fecha, datetime):
+        fecha = fecha.date()
+    ordinal = fecha.toordinal()
+    return date.fromordinal(ordinal - ordinal % DIAS_POR_CUBETA)
+
+
+# Sentencias de registrar_cambio_ticket
+CQL_ANTIGUEDAD = {
+    "leer": "SELECT cubeta, fecha_ultimo_cambio FROM ultimo_cambio_ticket WHERE ticket_id = ?",
+    "sacar": """
+        DELETE FROM tickets_por_antiguedad
+        WHERE cubeta = ? AND fecha_ultimo_cambio = ? AND ticket_id = ?
+        """,
+    "olvidar": "DELETE FROM ultimo_cambio_ticket WHERE ticket_id = ?",
+    "meter": """
+        INSERT INTO tickets_por_antiguedad
+        (cubeta, fecha_ultimo_cambio, ticket_id, estado_actual)
+        VALUES (?, ?, ?, ?)
+        """,
+    "cubeta": "INSERT INTO cubetas_antiguedad (grupo, cubeta) VALUES (?, ?)",
+    "recordar": """
+        INSERT INTO ultimo_cambio_ticket
+        (ticket_id, cubeta, fecha_ultimo_cambio, estado_actual)
+        VALUES (?, ?, ?, ?)
+        """,
+}
+
+
+def preparar_antiguedad(session) -> dict:
+    """Prepara las sentencias de CQL_ANTIGUEDAD (para reusarlas en muchos cambios)."""
+    return {nombre: session.prepare(cql) for nombre, cql in CQL_ANTIGUEDAD.items()}
+
+
+def sentencias_cambio_ticket(ticket_id: str, estado: str, fecha, previo) -> list:
+    """
+    [(tabla, sentencia de CQL_ANTIGUEDAD, parametros)] que mueven el ticket
+    de su cubeta anterior (`previo`: fila de ultimo_cambio_ticket o None) a
+    la de `fecha`, o solo lo sacan si quedo cerrado. Las escrituras no
+    dependen entre si, asi que se pueden mandar en paralelo.
+    """
+    sentencias = []
+    if previo is not None:
+        sentencias.append(
+            ("tickets_por_antiguedad", "sacar",
+             (previo.cubeta, previo.fecha_ultimo_cambio, ticket_id))
+        )
+    if estado == "cerrado":
+        sentencias.append(("ultimo_cambio_ticket", "olvidar", (ticket_id,)))
+        return sentencias
+
+    cubeta = cubeta_antiguedad(fecha)
+    sentencias += [
+        ("tickets_por_antiguedad", "meter", (cubeta, fecha, ticket_id, estado)),
+        ("cubetas_antiguedad", "cubeta", (GRUPO_CUBETAS, cubeta)),
+        ("ultimo_cambio_ticket", "recordar", (ticket_id, cubeta, fecha, estado)),
+    ]
+    return sentencias
+
+
+def registrar_cambio_ticket(session, ticket_id: str, estado: str, fecha=None, stmts=None):
+    """
+    Mueve el ticket a la cubeta de `fecha` (ahora por defecto) con su nuevo
+    estado. Si el ticket queda cerrado solo se saca de su cubeta anterior.
+    stmts: resultado de preparar_antiguedad, si se llama muchas veces.
+    Leer la cubeta anterior y mover no es atomico: dos cambios del mismo
+    ticket al mismo tiempo pueden dejarlo en dos cubetas, asi que los
+    cambios de un ticket deben venir de un solo escritor (en la carga, el
+    sink de Cassandra del pipeline, que corre en un solo hilo).
+    """
+    stmts = preparar_antiguedad(session) if stmts is None else stmts
+    fecha = datetime.utcnow() if fecha is None else fecha
+    previo = session.execute(stmts["leer"], (ticket_id,)).one()
+    for _, nombre, params in sentencias_cambio_ticket(ticket_id, estado, fecha, previo):
+        session.execute(stmts[nombre], params)
+
+
 def alertas_tickets_vencidos(session, dias_minimos: int = 5):
     """
     1) Alerta de tickets vencidos:
-       SELECT ticket_id, dias_inactivos
-       FROM alertas_tickets_vencidos
-       WHERE dias_inactivos > 5;
+       SELECT cubeta FROM cubetas_antiguedad
+       WHERE grupo = 0 AND cubeta <= <cubeta del corte>;
+
+       y por cada cubeta (en paralelo):
+       SELECT ticket_id, fecha_ultimo_cambio
+       FROM tickets_por_antiguedad
+       WHERE cubeta = ? AND fecha_ultimo_cambio < <ahora - 5 dias>;
     """
-    log.debug("Q1 - alertas_tickets_vencidos")
+    log.debug("Q1 - tickets_por_antiguedad")
+    ahora = datetime.utcnow()
+    corte = ahora - timedelta(days=dias_minimos)
+    cubetas = session.execute(
+        session.prepare(
+            """
+            SELECT cubeta FROM cubetas_antiguedad
+            WHERE grupo = ? AND cubeta <= ?
+            """
+        ),
+        (GRUPO_CUBETAS, cubeta_antiguedad(corte)),
+    )
     stmt = session.prepare(
         """
-        SELECT dias_inactivos, ticket_id, fecha_ultimo_cambio, estado_actual
-        FROM alertas_tickets_vencidos
-        WHERE dias_inactivos > ?
-        ALLOW FILTERING
+        SELECT fecha_ultimo_cambio, ticket_id, estado_actual
+        FROM tickets_por_antiguedad
+        WHERE cubeta = ? AND fecha_ultimo_cambio < ?
         """
     )
-    rows = session.execute(stmt, (dias_minimos,))
+    futuros = [session.execute_async(stmt, (c.cubeta, corte)) for c in cubetas]
     print(f"\n=== Tickets con mas de {dias_minimos} dias inactivos ===")
-    for r in rows:
-        print(
-            f"- Ticket {r.ticket_id}: {r.dias_inactivos} dias, "
-            f"ultimo cambio {r.fecha_ultimo_cambio}, estado {r.estado_actual}"
-        )
+    # Cubetas en orden ascendente: del ticket mas viejo al mas reciente
+    for futuro in futuros:
+        for r in futuro.result():
+            print(
+                f"- Ticket {r.ticket_id}: {(ahora - r.fecha_ultimo_cambio).days} dias, "
+                f"ultimo cambio {r.fecha_ultimo_cambio}, estado {r.estado_actual}"
+            )
 
 
 def historial_por_usuario(session, user_id: str):
@@ -292,6 +449,34 @@ def tickets_por_categoria_dia(session, fecha_str: str):
         print(f"- Categoria {r.categoria}: total={r.total}")
 
 
+def tickets_por_categoria_rango(session, fecha_inicio: str, fecha_fin: str):
+    """
+    3b) Conteo de tickets por categoria en un rango de dias:
+        SELECT fecha, categoria, total
+        FROM conteo_tickets_por_categoria_dia
+        WHERE fecha = ?;
+        una vez por dia del rango, en paralelo.
+    """
+    log.debug("Q3b - conteo_tickets_por_categoria_dia (rango)")
+    fi = _parse_date(fecha_inicio)
+    ff = _parse_date(fecha_fin)
+    stmt = session.prepare(
+        """
+        SELECT fecha, categoria, total
+        FROM conteo_tickets_por_categoria_dia
+        WHERE fecha = ?
+        """
+    )
+    totales = {}
+    print(f"\n=== Tickets por categoria entre {fi} y {ff} ===")
+    for r in leer_por_cubetas(session, stmt, ((dia,) for dia in dias_en_rango(fi, ff))):
+        print(f"{r.fecha} - Categoria {r.categoria}: total={r.total}")
+        totales[r.categoria] = totales.get(r.categoria, 0) + r.total
+    print("Total del rango:")
+    for categoria, total in sorted(totales.items()):
+        print(f"- Categoria {categoria}: total={total}")
+
+
 def tickets_por_profesor(session, profesor_id: str):
     """
     4) Tickets por profesor:
@@ -405,29 +590,32 @@ def tickets_por_fecha_rango(
     session, fecha_inicio: str, fecha_fin: str
 ):
     """
-    8) Filtrado de tickets por fecha:
+    8) Filtrado de tickets por fecha (una lectura por dia del rango):
        SELECT *
-       FROM filtrado_tickets_por_fecha
-       WHERE fecha >= '2025-10-01'
-         AND fecha <= '2025-10-15';
+       FROM tickets_por_dia
+       WHERE fecha = '2025-10-01'
+         AND hora >= '2025-10-01'
+         AND hora <= '2025-10-15';
+       ... hasta fecha = '2025-10-15'.
     """
-    log.debug("Q8 - tickets por fecha (ALLOW FILTERING)")
+    log.debug("Q8 - tickets_por_dia")
     fi = _parse_timestamp(fecha_inicio)
     ff = _parse_timestamp(fecha_fin)
     stmt = session.prepare(
         """
-        SELECT fecha, ticket_id, user_id, categoria, estado, prioridad
-        FROM filtrado_tickets_por_fecha
-        WHERE fecha >= ?
-          AND fecha <= ?
-        ALLOW FILTERING
+        SELECT fecha, hora, ticket_id, user_id, categoria, estado, prioridad
+        FROM tickets_por_dia
+        WHERE fecha = ?
+          AND hora >= ?
+          AND hora <= ?
         """
     )
-    rows = session.execute(stmt, (fi, ff))
+    dias = dias_en_rango(fi.date(), ff.date())
+    rows = leer_por_cubetas(session, stmt, ((dia, fi, ff) for dia in dias))
     print(f"\n=== Tickets entre {fi} y {ff} ===")
     for r in rows:
         print(
-            f"{r.fecha} - Ticket {r.ticket_id} "
+            f"{r.hora} - Ticket {r.ticket_id} "
             f"[{r.categoria}] estado={r.estado} prioridad={r.prioridad}"
         )
 
@@ -0,0 +1,87 @@
+"""
+Archivo de tickets cerrados (capa fria).
+
+Los tickets con status "cerrado" y mas de MONGO_ARCHIVO_DIAS dias (ver
+connect.py) se mueven de db.tickets a `tickets_archivo`, por lotes. Asi
+los reportes por defecto solo recorren los tickets vivos; con
+include_archived=True (Mongo/client.py) tambien leen el archivo.
+
+tickets_archivo se crea comprimida con zstd: casi no se lee y ocupa menos.
+
+    python -m Mongo.archivo [dias]
+"""
+from datetime import datetime, timedelta
+
+from pymongo import ReplaceOne
+
+import connect
+from connect import db
+from Mongo.compacto import codificar_consulta, decodificar
+from Mongo.rollups import aplicar_deltas, COLECCION_ROLLUPS, COLECCION_ROLLUPS_ARCHIVO
+
+COLECCION_ARCHIVO = "tickets_archivo"
+
+# Tickets por lote: acota memoria y el tamano de cada delete_many
+LOTE_ARCHIVO = 1000
+
+
+def asegurar_archivo(database=None) -> None:
+    """Crea tickets_archivo con compresion zstd si no existe."""
+    database = db if database is None else database
+    if COLECCION_ARCHIVO not in database.list_collection_names():
+        database.create_collection(
+            COLECCION_ARCHIVO,
+            storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}},
+        )
+
+
+def filtro_archivables(dias=None) -> dict:
+    """Tickets cerrados creados hace mas de `dias` dias (usa el indice {status, created_at})."""
+    dias = connect.MONGO_ARCHIVO_DIAS if dias is None else dias
+    return {
+        "status": "cerrado",
+        "created_at": {"$lt": datetime.utcnow() - timedelta(days=dias)},
+    }
+
+
+def archivar_cerrados(dias=None, lote: int = LOTE_ARCHIVO, database=None) -> int:
+    """
+    Mueve los tickets archivables a tickets_archivo, `lote` a la vez.
+    Cada lote se copia (upsert por _id) y se pasan sus conteos a los rollups
+    del archivo antes de borrarlo, asi si el proceso se corta a la mitad se
+    puede volver a correr sin perder tickets. Si el corte cae justo entre
+    los rollups y el borrado, ese lote se cuenta dos veces al reintentar:
+    `python -m Mongo.rollups` los recalcula.
+    Regresa cuantos tickets movio.
+    """
+    database = db if database is None else database
+    asegurar_archivo(database)
+    # Los documentos se copian tal cual estan guardados (formato compacto)
+    filtro = codificar_consulta(filtro_archivables(dias))
+    tickets = database.tickets
+    archivo = database[COLECCION_ARCHIVO]
+
+    total = 0
+    while True:
+        docs = list(tickets.find(filtro).limit(lote))
+        if not docs:
+            return total
+
+        archivo.bulk_write(
+            [ReplaceOne({"_id": d["_id"]}, d, upsert=True) for d in docs], ordered=False
+        )
+
+        # Los conteos pasan de ticket_rollups a ticket_rollups_archivo
+        legibles = [decodificar(d) for d in docs]
+        aplicar_deltas(database[COLECCION_ROLLUPS], anteriores=legibles)
+        aplicar_deltas(database[COLECCION_ROLLUPS_ARCHIVO], nuevos=legibles)
+
+        tickets.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        total += len(docs)
+
+
+if __name__ == "__main__":
+    import sys
+
+    dias = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"{archivar_cerrados(dias)} tickets cerrados movidos a {COLECCION_ARCHIVO}.")
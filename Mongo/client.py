@@ -1,34 +1,180 @@
-from connect import db
-#############################
-def filtrar_por_categoria():#
+import base64
+from datetime import datetime, timedelta
 
-    tickets = list(db.tickets.find(
-        {},
-        {
-            "_id": 0,
-            "ticket_id": 1,
-            "title": 1,
-            "category": 1,
-            "status": 1,
-            "installation_id": 1,
-            "created_at": 1
-        }
-    ))
+from bson import json_util
 
-    if not tickets:
-        print("\nNo hay tickets.\n")
-        return
-    
-    print("\nTickets por categoría")
-    for t in tickets:
-        print(
-            f"{t['ticket_id']} | "
-            f"{t['title']} | "
-            f"categoria: {t['category']} | "
-            f"estado: {t['status']} | "
-            f"instalación: {t.get('installation_id')} | "
-            f"{t.get('created_at')}"
-        )
+from connect import db
+from Mongo.archivo import COLECCION_ARCHIVO
+from Mongo.compacto import compacta
+from Mongo.normalizar import rango_prefijo
+from Mongo.rollups import leer_rollups
+from Mongo.serie_tiempo import fuente_tiempo, serie_tiempo_activa
+
+# Tamano de pagina de los listados
+TAMANO_PAGINA = 20
+
+# Orden de los listados de tickets: mas recientes primero, ticket_id desempata.
+# Lo cubre el indice {created_at: -1, ticket_id: -1} (ver Mongo/indices.py)
+ORDEN_TICKETS = (("created_at", -1), ("ticket_id", -1))
+ORDEN_USUARIOS = (("user_id", 1), ("_id", 1))
+# Busqueda por prefijo: lo cubre el indice {title_norm: 1, _id: 1}
+ORDEN_TITULO = (("title_norm", 1), ("_id", 1))
+#####################################
+def _codificar_token(ultimo, orden):#
+    """Token opaco con los valores de la llave de orden del ultimo documento."""
+    valores = [ultimo.get(campo) for campo, _ in orden]
+    return base64.urlsafe_b64encode(json_util.dumps(valores).encode()).decode()
+######################################
+def _filtro_despues_de(token, orden):#
+    """
+    Condicion keyset para los documentos que van despues del token:
+    (a, b) > (va, vb)  ==>  a > va  o  (a == va y b > vb), respetando la direccion.
+    """
+    valores = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+    ramas = []
+    for i, (campo, direccion) in enumerate(orden):
+        rama = {c: valores[j] for j, (c, _) in enumerate(orden[:i])}
+        rama[campo] = {"$gt" if direccion == 1 else "$lt": valores[i]}
+        ramas.append(rama)
+    return {"$or": ramas}
+#############################################################
+def listar_paginado(coleccion, filtro=None, proyeccion=None,#
+                    orden=ORDEN_TICKETS, tamano=TAMANO_PAGINA, token=None,
+                    include_archived=False):
+    """
+    Regresa (pagina, siguiente_token) con a lo mas `tamano` documentos en
+    el orden `orden`. Usa keyset pagination: cada pagina sigue desde la
+    llave del ultimo documento, asi cuesta lo mismo la primera que la
+    milesima. siguiente_token es None cuando ya no hay mas.
+    Con include_archived tambien entran los tickets de tickets_archivo.
+    """
+    condiciones = [filtro] if filtro else []
+    if token:
+        condiciones.append(_filtro_despues_de(token, orden))
+    consulta = {"$and": condiciones} if len(condiciones) > 1 else (condiciones[0] if condiciones else {})
+
+    proyeccion, quitar = _proyeccion_con_orden(proyeccion, orden)
+    # Pedimos uno de mas para saber si hay otra pagina
+    if include_archived:
+        docs = _con_archivo(coleccion, consulta, proyeccion, orden, tamano + 1)
+    else:
+        docs = list(coleccion.find(consulta, proyeccion).sort(list(orden)).limit(tamano + 1))
+    return _cortar_pagina(docs, orden, tamano, quitar)
+##################################################################
+def _con_archivo(coleccion, consulta, proyeccion, orden, limite):#
+    """
+    Mismo find + sort + limit sobre tickets y tickets_archivo juntos: cada
+    lado ordena y corta con su indice antes del $unionWith.
+    """
+    por_lado = [{"$match": consulta}, {"$sort": dict(orden)}, {"$limit": limite}]
+    pipeline = por_lado + [
+        {"$unionWith": {"coll": COLECCION_ARCHIVO, "pipeline": por_lado}},
+        {"$sort": dict(orden)},
+        {"$limit": limite},
+    ]
+    if proyeccion:
+        pipeline.append({"$project": proyeccion})
+    return list(coleccion.aggregate(pipeline))
+##############################################
+def _proyeccion_con_orden(proyeccion, orden):#
+    """Los campos de orden tienen que venir para armar el token; regresa cuales quitar despues."""
+    quitar = []
+    if proyeccion is not None:
+        proyeccion = dict(proyeccion)
+        for campo, _ in orden:
+            if not proyeccion.get(campo, campo == "_id"):
+                proyeccion[campo] = 1
+                quitar.append(campo)
+    return proyeccion, quitar
+#################################################
+def _cortar_pagina(docs, orden, tamano, quitar):#
+    siguiente = _codificar_token(docs[tamano - 1], orden) if len(docs) > tamano else None
+    pagina = docs[:tamano]
+    for d in pagina:
+        for campo in quitar:
+            d.pop(campo, None)
+    return pagina, siguiente
+###############################################################################
+def reporte_facet(coleccion, filtro, proyeccion, totales, orden=ORDEN_TICKETS,#
+                  tamano=TAMANO_PAGINA, include_archived=False):
+    """
+    Primera pagina del listado y totales en una sola agregacion: $match va
+    primero (usa indice) y un $facet saca de la misma pasada la pagina y
+    el pipeline `totales`. Regresa (pagina, siguiente_token, totales).
+    Con include_archived la pagina sale de listar_paginado (cada coleccion
+    ordena con su indice) y solo los totales van sobre la union.
+    """
+    if include_archived:
+        docs, token = listar_paginado(coleccion, filtro, proyeccion, orden, tamano,
+                                      include_archived=True)
+        pipeline = [
+            {"$match": filtro or {}},
+            {"$unionWith": {"coll": COLECCION_ARCHIVO, "pipeline": [{"$match": filtro or {}}]}},
+        ] + totales
+        return docs, token, list(coleccion.aggregate(pipeline, allowDiskUse=True))
+
+    proyeccion, quitar = _proyeccion_con_orden(proyeccion, orden)
+    pagina = [{"$sort": dict(orden)}, {"$limit": tamano + 1}]
+    if proyeccion:
+        pagina.append({"$project": proyeccion})
+
+    pipeline = [{"$match": filtro or {}}, {"$facet": {"pagina": pagina, "totales": totales}}]
+    resultado = next(coleccion.aggregate(pipeline), {"pagina": [], "totales": []})
+    docs, token = _cortar_pagina(resultado["pagina"], orden, tamano, quitar)
+    return docs, token, resultado["totales"]
+#####################################################################
+def mostrar_paginado(coleccion, filtro, proyeccion, formato, titulo,#
+                     vacio, orden=ORDEN_TICKETS, tamano=TAMANO_PAGINA, primera=None,
+                     include_archived=False):
+    """
+    Imprime la primera pagina de inmediato y pide las siguientes bajo demanda.
+    `primera` = (pagina, token) si la primera pagina ya se trajo (reporte_facet).
+    """
+    if primera is None:
+        primera = listar_paginado(coleccion, filtro, proyeccion, orden, tamano,
+                                  include_archived=include_archived)
+    pagina, token = primera
+    if not pagina:
+        print(vacio)
+        return False
+
+    print(titulo)
+    mostrados = 0
+    while True:
+        for doc in pagina:
+            print(formato(doc))
+        mostrados += len(pagina)
+        if token is None:
+            break
+        resp = input(f"-- {mostrados} mostrados. Enter para ver mas, 'q' para terminar: ")
+        if resp.strip().lower() == "q":
+            break
+        pagina, token = listar_paginado(coleccion, filtro, proyeccion, orden, tamano, token,
+                                        include_archived)
+    return True
+########################
+def _formato_ticket(t):#
+    return (
+        f"{t['ticket_id']} | "
+        f"{t['title']} | "
+        f"categoria: {t['category']} | "
+        f"estado: {t['status']} | "
+        f"instalación: {t.get('installation_id')} | "
+        f"{t.get('created_at')}"
+    )
+###################################################
+def filtrar_por_categoria(include_archived=False):#
+
+    filtro = {}
+    proyeccion = {
+        "_id": 0,
+        "ticket_id": 1,
+        "title": 1,
+        "category": 1,
+        "status": 1,
+        "installation_id": 1,
+        "created_at": 1
+    }
 
     pipeline = [
         {"$group": {"_id": "$category", "total_tickets": {"$sum": 1}}},
@@ -36,7 +182,19 @@ def filtrar_por_categoria():#
         {"$project": {"_id": 0, "category": "$_id", "total_tickets": 1}},
     ]
 
-    resultados = list(db.tickets.aggregate(pipeline))
+    # Primera pagina y totales en una sola pasada
+    pagina, token, resultados = reporte_facet(
+        compacta(db.tickets), filtro, proyeccion, pipeline, include_archived=include_archived
+    )
+
+    hay = mostrar_paginado(
+        compacta(db.tickets), filtro, proyeccion, _formato_ticket,
+        "\nTickets por categoría", "\nNo hay tickets.\n",
+        primera=(pagina, token),
+        include_archived=include_archived,
+    )
+    if not hay:
+        return
 
     if not resultados:
         print("\nNo hay tickets.\n")
@@ -45,36 +203,19 @@ def filtrar_por_categoria():#
     print("\nTotal de tickets por categoría")
     for doc in resultados:
         print(f"- {doc['category']}: {doc['total_tickets']}")
-######################
-def resumen_estado():#
+############################################
+def resumen_estado(include_archived=False):#
 
-    tickets = list(db.tickets.find(
-        {},
-        {
-            "_id": 0,
-            "ticket_id": 1,
-            "title": 1,
-            "category": 1,
-            "status": 1,
-            "installation_id": 1,
-            "created_at": 1
-        }
-    ))
-
-    if not tickets:
-        print("\nNo hay tickets.\n")
-        return
-    
-    print("\nTickets por estado")
-    for t in tickets:
-        print(
-            f"{t['ticket_id']} | "
-            f"{t['title']} | "
-            f"categoria: {t['category']} | "
-            f"estado: {t['status']} | "
-            f"instalación: {t.get('installation_id')} | "
-            f"{t.get('created_at')}"
-        )
+    filtro = {}
+    proyeccion = {
+        "_id": 0,
+        "ticket_id": 1,
+        "title": 1,
+        "category": 1,
+        "status": 1,
+        "installation_id": 1,
+        "created_at": 1
+    }
 
     pipeline = [
         {"$group": {"_id": "$status", "total_tickets": {"$sum": 1}}},
@@ -82,7 +223,19 @@ def resumen_estado():#
         {"$project": {"_id": 0, "status": "$_id", "total_tickets": 1}},
     ]
 
-    resultados = list(db.tickets.aggregate(pipeline))
+    # Primera pagina y totales en una sola pasada
+    pagina, token, resultados = reporte_facet(
+        compacta(db.tickets), filtro, proyeccion, pipeline, include_archived=include_archived
+    )
+
+    hay = mostrar_paginado(
+        compacta(db.tickets), filtro, proyeccion, _formato_ticket,
+        "\nTickets por estado", "\nNo hay tickets.\n",
+        primera=(pagina, token),
+        include_archived=include_archived,
+    )
+    if not hay:
+        return
 
     if not resultados:
         print("\nNo hay tickets.\n")
@@ -91,12 +244,27 @@ def resumen_estado():#
     print("\nTotal de tickets por estado")
     for doc in resultados:
         print(f"- {doc['status']}: {doc['total_tickets']}")
-############################
-def buscar_titulos_falla():#
-    # Crear índice si no existe
-    db.tickets.create_index("title")
-
-    filtro = { "title": { "$regex": r"^(Falla|Daño)", "$options": "i" } }  # Usamos regex
+###################################################
+def filtro_prefijos(prefijos, campo="title_norm"):#
+    """
+    Filtro por uno o varios prefijos (sin importar acentos ni mayusculas):
+    un rango [prefijo, siguiente) por prefijo sobre el campo normalizado,
+    cada uno acotado en el indice.
+    """
+    rangos = [{campo: rango_prefijo(p)} for p in prefijos]
+    return rangos[0] if len(rangos) == 1 else {"$or": rangos}
+########################################################################
+def buscar_por_prefijo(prefijos, proyeccion=None, tamano=TAMANO_PAGINA,#
+                       token=None, include_archived=False):
+    """Pagina de tickets cuyo titulo empieza con alguno de `prefijos`; regresa (pagina, token)."""
+    return listar_paginado(
+        compacta(db.tickets), filtro_prefijos(prefijos), proyeccion, ORDEN_TITULO, tamano, token,
+        include_archived,
+    )
+##################################################
+def buscar_titulos_falla(include_archived=False):#
+    # Rango sobre title_norm: "Dano", "daño" y "Daño" encuentran lo mismo
+    prefijos = ["Falla", "Daño"]
 
     proyeccion = {
         "_id": 0,
@@ -108,26 +276,21 @@ def buscar_titulos_falla():#
         "created_at": 1
     }
 
-    resultados = list(db.tickets.find(filtro, proyeccion))
-
-    if not resultados:
-        print("\nNo se encontraron tickets.\n")
-        return
-
-    print("\nTickets cuyo título inicia con 'Falla' o 'Daño'")
-    for t in resultados:
-        print(f"- {t['ticket_id']} | {t['title']} | {t['category']} | {t['status']} | {t.get('installation_id')} | {t.get('created_at')}")
-################################
-def lugares_con_mas_perdidas():#
-
-    pipeline = [
-        {"$match": {"category": "cosas_perdidas"}},
-        {"$group": {"_id": "$place_name", "total": {"$sum": 1}}},
-        {"$sort": {"total": -1}},
-        {"$project": {"_id": 0, "place_name": "$_id", "total": 1}},
-    ]
+    mostrar_paginado(
+        compacta(db.tickets),
+        filtro_prefijos(prefijos),
+        proyeccion,
+        lambda t: f"- {t['ticket_id']} | {t['title']} | {t['category']} | {t['status']} | {t.get('installation_id')} | {t.get('created_at')}",
+        "\nTickets cuyo título inicia con 'Falla' o 'Daño'",
+        "\nNo se encontraron tickets.\n",
+        orden=ORDEN_TITULO,
+        include_archived=include_archived,
+    )
+######################################################
+def lugares_con_mas_perdidas(include_archived=False):#
 
-    resultados = list(db.tickets.aggregate(pipeline))
+    # Conteos precalculados en ticket_rollups
+    resultados = leer_rollups("lugar_perdidas", include_archived=include_archived)
 
     if not resultados:
         print("\nNo hay tickets.\n")
@@ -136,16 +299,11 @@ def lugares_con_mas_perdidas():#
     print("\nLugares con más reportes de pérdidas")
     for doc in resultados:
         print(f"- {doc['place_name']}: {doc['total']}")
-#########################################
-def instalaciones_con_mas_incidencias():#
-
-    pipeline = [
-        {"$group": {"_id": "$installation_id", "total_tickets": {"$sum": 1}}},
-        {"$sort": {"total_tickets": -1}},
-        {"$project": {"_id": 0, "installation_id": "$_id", "total_tickets": 1}},
-    ]
+###############################################################
+def instalaciones_con_mas_incidencias(include_archived=False):#
 
-    resultados = list(db.tickets.aggregate(pipeline))
+    # Conteos precalculados en ticket_rollups
+    resultados = leer_rollups("instalacion", include_archived=include_archived)
 
     if not resultados:
         print("\nNo hay tickets.\n")
@@ -153,77 +311,124 @@ def instalaciones_con_mas_incidencias():#
 
     print("\nInstalaciones con más incidencias")
     for doc in resultados:
-        print(f"- {doc['installation_id']}: {doc['total_tickets']}")
+        print(f"- {doc['installation_id']}: {doc['total']}")
+########################################################
+def buscar_texto(palabras, categoria=None, estado=None,#
+                 instalacion=None, tamano=TAMANO_PAGINA, pagina=0):
+    """
+    Busqueda de texto ordenada por relevancia (textScore), de `tamano` en
+    `tamano`. Los filtros opcionales van en la misma consulta que el $text.
+    Regresa (resultados, hay_mas).
+    """
+    filtro = {"$text": {"$search": palabras}}
+    if categoria:
+        filtro["category"] = categoria
+    if estado:
+        filtro["status"] = estado
+    if instalacion:
+        filtro["installation_id"] = instalacion
+
+    # Solo los campos que se muestran, mas el score para ordenar
+    proyeccion = {
+        "_id": 0,
+        "ticket_id": 1,
+        "title": 1,
+        "object_name": 1,
+        "category": 1,
+        "status": 1,
+        "installation_id": 1,
+        "created_at": 1,
+        "score": {"$meta": "textScore"},
+    }
+
+    resultados = list(
+        compacta(db.tickets)
+          .find(filtro, proyeccion)
+          .sort([("score", {"$meta": "textScore"})])
+          .skip(pagina * tamano)
+          .limit(tamano + 1)    # uno de mas para saber si hay otra pagina
+    )
+    return resultados[:tamano], len(resultados) > tamano
 ########################
 def buscar_por_texto():#
 
-    # Crear índice de texto si no existe
-    db.tickets.create_index([
-        ("title", "text"),
-        ("description", "text"),
-        ("object_name", "text")
-    ])
-
-    palabras = input("Escribe palabras clave para buscar: ")
-
-    filtro = { "$text": { "$search": palabras } }
+    # El indice de texto viene del registro (Mongo/indices.py)
 
+    palabras = input("Escribe palabras clave para buscar: ").strip()
+    if not palabras:
+        print("\nBusqueda vacía.\n")
+        return
+    categoria = input("Categoría (Enter para todas): ").strip() or None
+    estado = input("Estado (Enter para todos): ").strip() or None
+    instalacion = input("installation_id (Enter para todas): ").strip() or None
+
+    pagina = 0
+    mostrados = 0
+    while True:
+        resultados, hay_mas = buscar_texto(palabras, categoria, estado, instalacion, pagina=pagina)
+
+        if not resultados and pagina == 0:
+            print("\nNo se encontraron tickets.\n")
+            return
+        if pagina == 0:
+            print("\nTickets encontrados por texto (más relevantes primero)")
+
+        for t in resultados:
+            print(f"{t['ticket_id']} | {t['title']} | objeto: {t.get('object_name')} | categoría: {t.get('category')} | estado: {t.get('status')} | instalación: {t.get('installation_id')} | {t.get('created_at')}")
+        mostrados += len(resultados)
+
+        if not hay_mas:
+            break
+        resp = input(f"-- {mostrados} mostrados. Enter para ver mas, 'q' para terminar: ")
+        if resp.strip().lower() == "q":
+            break
+        pagina += 1
+
+    print(f"Coincidencias mostradas: {mostrados}")
+######################################################
+def resumen_objetos_perdidos(include_archived=False):#
+
+    # $match va primero para usar el indice {category, created_at, ticket_id}
+    filtro = {"category": "cosas_perdidas"}
     proyeccion = {
         "_id": 0,
         "ticket_id": 1,
         "title": 1,
-        "object_name": 1
+        "object_name": 1,
+        "lost_status": 1,
+        "installation_id": 1,
+        "created_at": 1
     }
 
-    resultados = list(db.tickets.find(filtro, proyeccion))
-
-    if not resultados:
-        print("\nNo se encontraron tickets.\n")
-        return
-    
-    print("\nTickets encontrados por texto")
-    for t in resultados:
-        print(f"{t['ticket_id']} | {t['title']} | objeto: {t.get('object_name')} | categoría: {t.get('category')} | instalación: {t.get('installation_id')} | {t.get('created_at')}")
-
-    print(f"Total de coincidencias: {len(resultados)}")
-################################
-def resumen_objetos_perdidos():#
+    pipeline = [
+        {"$group": {"_id": "$lost_status", "total": {"$sum": 1}}},
+        {"$sort": {"total": -1}},
+        {"$project": {"_id": 0, "lost_status": "$_id", "total": 1}},
+    ]
 
-    tickets = list(db.tickets.find(
-        {"category": "cosas_perdidas"},
-        {
-            "_id": 0,
-            "ticket_id": 1,
-            "title": 1,
-            "object_name": 1,
-            "lost_status": 1,
-            "installation_id": 1,
-            "created_at": 1
-        }
-    ))
+    # Primera pagina y totales en una sola pasada
+    pagina, token, resultados = reporte_facet(
+        compacta(db.tickets), filtro, proyeccion, pipeline, include_archived=include_archived
+    )
 
-    if not tickets:
-        print("\nNo hay objetos perdidos.\n")
-        return
-    
-    print("\nObjetos perdidos registrados")
-    for t in tickets:
-        print(
+    hay = mostrar_paginado(
+        compacta(db.tickets),
+        filtro,
+        proyeccion,
+        lambda t: (
             f"{t['ticket_id']} | {t['title']} | "
             f"objeto: {t.get('object_name')} | "
             f"estado: {t.get('lost_status')} | "
             f"instalación: {t.get('installation_id')} | "
             f"{t.get('created_at')}"
-        )
-
-    pipeline = [
-        {"$match": {"category": "cosas_perdidas"}},
-        {"$group": {"_id": "$lost_status", "total": {"$sum": 1}}},
-        {"$sort": {"total": -1}},
-        {"$project": {"_id": 0, "lost_status": "$_id", "total": 1}},
-    ]
-
-    resultados = list(db.tickets.aggregate(pipeline))
+        ),
+        "\nObjetos perdidos registrados",
+        "\nNo hay objetos perdidos.\n",
+        primera=(pagina, token),
+        include_archived=include_archived,
+    )
+    if not hay:
+        return
 
     if not resultados:
         print("\nNo hay objetos perdidos.\n")
@@ -232,38 +437,44 @@ def resumen_objetos_perdidos():#
     print("\nResumen de objetos perdidos")
     for doc in resultados:
         print(f"- {doc['lost_status']}: {doc['total']}")
-######################################
-def tickets_cerrados_por_categoria():#
-
-    tickets = list(db.tickets.find(
-        {"status": "cerrado"},
-        {
-            "_id": 0,
-            "ticket_id": 1,
-            "title": 1,
-            "category": 1,
-            "status": 1,
-            "installation_id": 1,
-            "created_at": 1
-        }
-    ))
+############################################################
+def tickets_cerrados_por_categoria(include_archived=False):#
 
-    if not tickets:
-        print("\nNo hay tickets cerrados.\n")
-        return
-
-    print("\nTickets cerrados encontrados")
-    for t in tickets:
-        print(f"{t['ticket_id']} | {t['title']} | {t['category']} | {t['installation_id']} | {t['created_at']}")
+    # $match va primero para usar el indice {status, created_at, ticket_id}
+    filtro = {"status": "cerrado"}
+    proyeccion = {
+        "_id": 0,
+        "ticket_id": 1,
+        "title": 1,
+        "category": 1,
+        "status": 1,
+        "installation_id": 1,
+        "created_at": 1
+    }
 
     pipeline = [
-        {"$match": {"status": "cerrado"}},
         {"$group": {"_id": "$category", "total_closed": {"$sum": 1}}},
         {"$sort": {"total_closed": -1}},
         {"$project": {"_id": 0, "category": "$_id", "total_closed": 1}},
     ]
 
-    resultados = list(db.tickets.aggregate(pipeline))
+    # Primera pagina y totales en una sola pasada
+    pagina, token, resultados = reporte_facet(
+        compacta(db.tickets), filtro, proyeccion, pipeline, include_archived=include_archived
+    )
+
+    hay = mostrar_paginado(
+        compacta(db.tickets),
+        filtro,
+        proyeccion,
+        lambda t: f"{t['ticket_id']} | {t['title']} | {t['category']} | {t['installation_id']} | {t['created_at']}",
+        "\nTickets cerrados encontrados",
+        "\nNo hay tickets cerrados.\n",
+        primera=(pagina, token),
+        include_archived=include_archived,
+    )
+    if not hay:
+        return
 
     if not resultados:
         print("\nNo se encontraron tickets cerrados.\n")
@@ -274,23 +485,20 @@ def tickets_cerrados_por_categoria():#
         print(f"- {doc['category']}: {doc['total_closed']}")
 ########################
 def mostrar_usuarios():#
-    usuarios = list(db.users.find(
+    mostrar_paginado(
+        db.users,
         {},
         {
             "_id": 0, 
             "user_id": 1, 
             "expediente": 1, 
             "email": 1, "role": 1
-         }
-    ))
-
-    if not usuarios:
-        print("\nNo hay usuarios registrados.\n")
-        return
-
-    print("\nLista de usuarios")
-    for u in usuarios:
-        print(f"{u['user_id']} | {u['expediente']} | {u['email']} | {u['role']}")
+         },
+        lambda u: f"{u['user_id']} | {u['expediente']} | {u['email']} | {u['role']}",
+        "\nLista de usuarios",
+        "\nNo hay usuarios registrados.\n",
+        orden=ORDEN_USUARIOS,
+    )
 
 def tickets_recientes_por_instalacion():
     install_id = input("installation_id: ").strip()
@@ -303,7 +511,9 @@ def tickets_recientes_por_instalacion():
     except ValueError:
         limite = 10
 
-    filtro = {"installation_id": install_id}
+    # tickets_ts si esta activa (buckets por instalacion), si no db.tickets
+    coleccion, campo_instalacion, _ = fuente_tiempo()
+    filtro = {campo_instalacion: install_id}
 
     proyeccion = {
         "_id": 0,
@@ -311,14 +521,13 @@ def tickets_recientes_por_instalacion():
         "title": 1,
         "status": 1,
         "priority": 1,
-        "installation_id": 1,
         "created_at": 1,
     }
 
     resultados = list(
-        db.tickets
+        coleccion
           .find(filtro, proyeccion)
-          .sort("created_at", -1)   # usamos el índice { created_at: -1 }
+          .sort("created_at", -1)   # indice { installation_id: 1, created_at: -1 } (o su version en tickets_ts)
           .limit(limite)
     )
 
@@ -326,21 +535,99 @@ def tickets_recientes_por_instalacion():
         print("\nNo hay tickets para esa instalación.\n")
         return
 
+    if serie_tiempo_activa():
+        # La serie solo guarda la creacion; el estado actual sale de db.tickets
+        estados = {
+            t["ticket_id"]: t.get("status")
+            for t in compacta(db.tickets).find(
+                {"ticket_id": {"$in": [t["ticket_id"] for t in resultados]}},
+                {"_id": 0, "ticket_id": 1, "status": 1},
+            )
+        }
+        for t in resultados:
+            t["status"] = estados.get(t["ticket_id"])
+
     print(f"\nTickets recientes para instalación '{install_id}'")
     for t in resultados:
         print(f"{t['ticket_id']} | {t['title']} | {t['status']} | {t['priority']} | {t['created_at']}")
-
-#####################################
-def distribucion_categoria_estado():#
+#############################################################
+def _filtro_ventana(dias, instalacion=None, categoria=None):#
+    """$match de los ultimos `dias` dias (y filtros opcionales) sobre la fuente de tiempo."""
+    coleccion, campo_instalacion, campo_categoria = fuente_tiempo()
+    filtro = {"created_at": {"$gte": datetime.utcnow() - timedelta(days=dias)}}
+    if instalacion:
+        filtro[campo_instalacion] = instalacion
+    if categoria:
+        filtro[campo_categoria] = categoria
+    return coleccion, filtro
+########################################################################
+def conteo_tickets_por_periodo(dias=30, unidad="day", instalacion=None,#
+                               categoria=None):
+    """Tickets creados por dia u hora (unidad "day" / "hour") en una ventana de `dias`."""
+    coleccion, filtro = _filtro_ventana(dias, instalacion, categoria)
     pipeline = [
-        {"$group": {"_id": {"category": "$category","status": "$status"},
-        "total_tickets": {"$sum": 1}}},
-        {"$project": {"_id": 0,"category": "$_id.category","status": "$_id.status",
-        "total_tickets": 1}},
-        {"$sort": {"category": 1,"status": 1}}
+        {"$match": filtro},
+        {"$group": {
+            "_id": {"$dateTrunc": {"date": "$created_at", "unit": unidad}},
+            "total": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "periodo": "$_id", "total": 1}},
+    ]
+    return list(coleccion.aggregate(pipeline))
+#######################################
+def conteo_tickets_por_turno(dias=30):#
+    """Tickets creados por turno en los ultimos `dias` dias."""
+    coleccion, filtro = _filtro_ventana(dias)
+    pipeline = [
+        {"$match": filtro},
+        {"$group": {"_id": "$turno", "total": {"$sum": 1}}},
+        {"$sort": {"total": -1}},
+        {"$project": {"_id": 0, "turno": "$_id", "total": 1}},
     ]
+    return list(coleccion.aggregate(pipeline))
+###########################
+def tickets_por_periodo():#
+    try:
+        dias = int(input("¿Cuántos días hacia atrás? ").strip() or "30")
+    except ValueError:
+        dias = 30
+    unidad = "hour" if input("Agrupar por (dia/hora): ").strip().lower().startswith("h") else "day"
+    instalacion = input("installation_id (Enter para todas): ").strip() or None
+    categoria = input("Categoría (Enter para todas): ").strip() or None
+
+    resultados = conteo_tickets_por_periodo(dias, unidad, instalacion, categoria)
+    if not resultados:
+        print("\nNo hay tickets en esa ventana.\n")
+        return
 
-    resultados = list(db.tickets.aggregate(pipeline))
+    formato = "%Y-%m-%d %H:00" if unidad == "hour" else "%Y-%m-%d"
+    print(f"\nTickets creados por {'hora' if unidad == 'hour' else 'día'} (últimos {dias} días)")
+    for doc in resultados:
+        print(f"- {doc['periodo'].strftime(formato)}: {doc['total']}")
+#################################
+def tickets_por_turno_ventana():#
+    try:
+        dias = int(input("¿Cuántos días hacia atrás? ").strip() or "30")
+    except ValueError:
+        dias = 30
+
+    resultados = conteo_tickets_por_turno(dias)
+    if not resultados:
+        print("\nNo hay tickets en esa ventana.\n")
+        return
+
+    print(f"\nTickets por turno (últimos {dias} días)")
+    for doc in resultados:
+        print(f"- {doc['turno']}: {doc['total']}")
+
+###########################################################
+def distribucion_categoria_estado(include_archived=False):#
+    # Conteos precalculados en ticket_rollups
+    resultados = leer_rollups(
+        "categoria_estado", orden=[("category", 1), ("status", 1)],
+        include_archived=include_archived,
+    )
 
     print("\n=== Distribución de tickets por categoría y estado ===")
     if not resultados:
@@ -350,5 +637,5 @@ def distribucion_categoria_estado():#
             print(
                 f"category: {doc['category']} | "
                 f"status: {doc['status']} | "
-                f"total_tickets: {doc['total_tickets']}"
+                f"total_tickets: {doc['total']}"
             )
@@ -0,0 +1,451 @@
+"""
+Formato compacto de los tickets en Mongo (tickets y tickets_archivo).
+
+Cada ticket se guarda con nombres de campo cortos, los enums como enteros
+chicos y sin los campos vacios (object_name/lost_status de los tickets que
+no son de cosas perdidas):
+
+    {"ticket_id": "TK-1", "category": "cosas_perdidas", "status": "en_proceso",
+     "turno": "tarde_noche", "object_name": "", ...}
+    ->  {"tid": "TK-1", "c": 3, "s": 2, "tu": 2, ...}
+
+Documentos mas chicos: indices mas chicos y mas tickets en la cache.
+
+El resto del codigo sigue usando los nombres largos: ColeccionCompacta
+envuelve la coleccion y traduce filtros, proyecciones, ordenes y pipelines
+al entrar, y decodifica los resultados al salir. Los codigos solo se
+agregan al final de cada lista, nunca se reordenan.
+
+Para datos cargados antes de este formato y para comparar tamanos:
+
+    python -m Mongo.compacto migrar
+    python -m Mongo.compacto tamanos
+"""
+from collections.abc import Mapping
+
+from pymongo import ReplaceOne
+
+from connect import db
+
+# Nombre largo -> nombre guardado
+CAMPOS = {
+    "ticket_id": "tid",
+    "title": "ti",
+    "title_norm": "tn",
+    "description": "de",
+    "category": "c",
+    "status": "s",
+    "priority": "p",
+    "user_id": "u",
+    "installation_id": "i",
+    "place_name": "pl",
+    "object_name": "o",
+    "lost_status": "ls",
+    "turno": "tu",
+    "created_at": "ca",
+}
+
+# Campo -> valores; el codigo de cada valor es su posicion + 1
+ENUMS = {
+    "category": ["instalaciones", "docentes", "cosas_perdidas"],
+    "status": ["abierto", "en_proceso", "cerrado"],
+    "priority": ["alta", "media", "baja"],
+    "turno": ["manana", "tarde_noche"],
+    "lost_status": ["activo", "encontrado"],
+}
+
+_LARGOS = {corto: largo for largo, corto in CAMPOS.items()}
+_CODIGOS = {campo: {v: i + 1 for i, v in enumerate(valores)} for campo, valores in ENUMS.items()}
+_VALORES = {campo: dict(enumerate(valores, 1)) for campo, valores in ENUMS.items()}
+
+COLECCIONES_COMPACTAS = ("tickets", "tickets_archivo")
+
+
+def codificar_valor(campo, valor):
+    """Valor de enum -> codigo; lo que no es enum (o no esta en la lista) queda igual."""
+    codigos = _CODIGOS.get(campo)
+    if codigos is None or not isinstance(valor, str):
+        return valor
+    return codigos.get(valor, valor)
+
+
+def codificar_consulta(spec, campo=None, expresion=None):
+    """
+    Traduce un filtro, proyeccion, orden o pipeline escrito con nombres
+    largos: renombra los campos y codifica los valores de enums comparados
+    contra su campo. Las referencias "$campo" solo se traducen donde son
+    expresiones de agregacion (etapas de un pipeline salvo $match, y
+    $expr); en un filtro "$100" es un valor como cualquier otro.
+    Un pipeline (lista) empieza como expresion y un filtro (dict) no.
+    Los nombres cortos no se aceptan como llaves: asi decodificar sabe que
+    cada nombre corto de un resultado es un campo guardado.
+    """
+    if expresion is None:
+        expresion = isinstance(spec, (list, tuple))
+    if isinstance(spec, Mapping):
+        traducido = {}
+        for llave, valor in spec.items():
+            if llave in _LARGOS:
+                raise ValueError(
+                    f"'{llave}' es un nombre guardado; usa el nombre largo ({_LARGOS[llave]})"
+                )
+            if llave in CAMPOS:
+                traducido[CAMPOS[llave]] = codificar_consulta(valor, llave, expresion)
+            elif llave == "$literal":
+                traducido[llave] = valor
+            elif llave in ("$match", "$expr"):
+                # $match lleva un filtro; $expr, una expresion dentro de un filtro
+                traducido[llave] = codificar_consulta(valor, None, llave == "$expr")
+            elif llave.startswith("$"):
+                # Operador: $in, $ne... siguen comparando contra `campo`
+                traducido[llave] = codificar_consulta(valor, campo, expresion)
+            else:
+                traducido[llave] = codificar_consulta(valor, None, expresion)
+        return traducido
+    if isinstance(spec, (list, tuple)):
+        return [codificar_consulta(v, campo, expresion) for v in spec]
+    if expresion and isinstance(spec, str) and spec.startswith("$") and not spec.startswith("$$"):
+        return "$" + CAMPOS.get(spec[1:], spec[1:])
+    return codificar_valor(campo, spec)
+
+
+def codificar_orden(orden):
+    """[(campo, direccion)] con nombres cortos (sort, create_index)."""
+    if isinstance(orden, str):
+        return CAMPOS.get(orden, orden)
+    return [(CAMPOS.get(campo, campo), direccion) for campo, direccion in orden]
+
+
+def codificar_doc(doc: dict) -> dict:
+    """Ticket completo -> documento compacto (sin campos vacios)."""
+    return {
+        CAMPOS.get(campo, campo): codificar_valor(campo, valor)
+        for campo, valor in doc.items()
+        if valor is not None and valor != ""
+    }
+
+
+def codificar_actualizacion(update: dict) -> dict:
+    """Como codificar_consulta, pero los campos vacios de $set pasan a $unset."""
+    traducido = {}
+    for op, campos in update.items():
+        if op == "$set":
+            vacios = {CAMPOS.get(c, c): "" for c, v in campos.items() if v is None or v == ""}
+            traducido["$set"] = codificar_doc(campos)
+            if vacios:
+                traducido["$unset"] = vacios
+        elif op == "$setOnInsert":
+            traducido[op] = codificar_doc(campos)
+        else:
+            traducido[op] = codificar_consulta(campos)
+    return traducido
+
+
+def decodificar(doc):
+    """
+    Documento (o resultado de un pipeline) guardado -> nombres largos y
+    valores legibles. Todo nombre corto es un campo guardado:
+    codificar_consulta no deja usarlos como nombres de resultados.
+    """
+    if isinstance(doc, Mapping):
+        legible = {}
+        for llave, valor in doc.items():
+            campo = _LARGOS.get(llave, llave)
+            if campo in _VALORES and isinstance(valor, int):
+                legible[campo] = _VALORES[campo].get(valor, valor)
+            else:
+                legible[campo] = decodificar(valor)
+        return legible
+    if isinstance(doc, list):
+        return [decodificar(v) for v in doc]
+    return doc
+
+
+def _proyeccion(proyeccion):
+    """Proyeccion de find: sus valores pueden ser expresiones ("$campo")."""
+    return codificar_consulta(proyeccion, expresion=True)
+
+
+class TicketCrudo(Mapping):
+    """
+    Ticket compacto tal como llega en bytes (RawBSONDocument), leido con los
+    nombres largos: cada campo se traduce hasta que se pide, sin armar el
+    dict completo de decodificar.
+    """
+
+    __slots__ = ("_crudo",)
+
+    def __init__(self, crudo):
+        self._crudo = crudo
+
+    def __getitem__(self, campo):
+        valor = self._crudo[CAMPOS.get(campo, campo)]
+        if campo in _VALORES and isinstance(valor, int):
+            return _VALORES[campo].get(valor, valor)
+        return valor
+
+    def __iter__(self):
+        return (_LARGOS.get(llave, llave) for llave in self._crudo)
+
+    def __len__(self):
+        return len(self._crudo)
+
+
+class CursorCompacto:
+    """Cursor de pymongo que traduce sort y decodifica cada documento."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, llave, direccion=None):
+        if direccion is not None:
+            self._cursor.sort(codificar_orden(llave), direccion)
+        else:
+            self._cursor.sort(codificar_orden(llave))
+        return self
+
+    def limit(self, n):
+        self._cursor.limit(n)
+        return self
+
+    def skip(self, n):
+        self._cursor.skip(n)
+        return self
+
+    def batch_size(self, n):
+        self._cursor.batch_size(n)
+        return self
+
+    def __iter__(self):
+        return (decodificar(d) for d in self._cursor)
+
+
+class ColeccionCompacta:
+    """
+    Envuelve una coleccion de tickets: recibe y regresa tickets con los
+    nombres largos, y guarda el formato compacto. bulk_write recibe
+    operaciones ya codificadas (codificar_consulta/codificar_actualizacion).
+    """
+
+    def __init__(self, coleccion):
+        self.cruda = coleccion
+        self.name = coleccion.name
+
+    def with_options(self, **kwargs):
+        return ColeccionCompacta(self.cruda.with_options(**kwargs))
+
+    # ---------- Lectura ----------
+
+    def find(self, filtro=None, proyeccion=None, **kwargs):
+        return CursorCompacto(self.cruda.find(
+            codificar_consulta(filtro or {}), _proyeccion(proyeccion), **kwargs
+        ))
+
+    def find_one(self, filtro=None, proyeccion=None, **kwargs):
+        doc = self.cruda.find_one(
+            codificar_consulta(filtro or {}), _proyeccion(proyeccion), **kwargs
+        )
+        return None if doc is None else decodificar(doc)
+
+    def find_raw_batches(self, filtro=None, proyeccion=None, **kwargs):
+        """Bytes BSON tal como estan guardados (nombres cortos); ver TicketCrudo."""
+        return self.cruda.find_raw_batches(
+            codificar_consulta(filtro or {}), _proyeccion(proyeccion), **kwargs
+        )
+
+    def vista_cruda(self, doc):
+        """RawBSONDocument de find_raw_batches -> TicketCrudo (nombres largos)."""
+        return TicketCrudo(doc)
+
+    def aggregate(self, pipeline, **kwargs):
+        return (decodificar(d) for d in self.cruda.aggregate(codificar_consulta(pipeline), **kwargs))
+
+    def distinct(self, campo, filtro=None):
+        return [
+            _VALORES[campo].get(v, v) if campo in _VALORES else v
+            for v in self.cruda.distinct(CAMPOS.get(campo, campo), codificar_consulta(filtro or {}))
+        ]
+
+    def count_documents(self, filtro, **kwargs):
+        return self.cruda.count_documents(codificar_consulta(filtro), **kwargs)
+
+    # ---------- Escritura ----------
+
+    def insert_one(self, doc, **kwargs):
+        return self.cruda.insert_one(codificar_doc(doc), **kwargs)
+
+    def insert_many(self, docs, **kwargs):
+        # Las posiciones (writeErrors[].index) son las mismas que en `docs`
+        return self.cruda.insert_many([codificar_doc(d) for d in docs], **kwargs)
+
+    def bulk_write(self, ops, **kwargs):
+        return self.cruda.bulk_write(ops, **kwargs)
+
+    def update_one(self, filtro, update, **kwargs):
+        return self.cruda.update_one(
+            codificar_consulta(filtro), codificar_actualizacion(update), **kwargs
+        )
+
+    def update_many(self, filtro, update, **kwargs):
+        return self.cruda.update_many(
+            codificar_consulta(filtro), codificar_actualizacion(update), **kwargs
+        )
+
+    def delete_many(self, filtro, **kwargs):
+        return self.cruda.delete_many(codificar_consulta(filtro), **kwargs)
+
+    # ---------- Indices ----------
+
+    def create_index(self, llaves, **kwargs):
+        return self.cruda.create_index(codificar_orden(llaves), **kwargs)
+
+    def index_information(self):
+        return self.cruda.index_information()
+
+    def drop_index(self, nombre):
+        return self.cruda.drop_index(nombre)
+
+
+def compacta(coleccion) -> ColeccionCompacta:
+    return coleccion if isinstance(coleccion, ColeccionCompacta) else ColeccionCompacta(coleccion)
+
+
+def tickets_compactos(database=None, nombre: str = "tickets") -> ColeccionCompacta:
+    database = db if database is None else database
+    return ColeccionCompacta(database[nombre])
+
+
+# ---------- Migracion ----------
+
+
+def migrar_coleccion(coleccion, lote: int = 1000) -> int:
+    """
+    Reescribe en formato compacto los documentos que aun tienen nombres
+    largos. Recorre la coleccion una sola vez por _id (keyset), asi cada
+    lote empieza donde acabo el anterior en vez de volver a buscar desde
+    el principio entre los ya migrados.
+    """
+    total = 0
+    ultimo = None
+    while True:
+        filtro = {} if ultimo is None else {"_id": {"$gt": ultimo}}
+        docs = list(coleccion.find(filtro).sort("_id", 1).limit(lote))
+        if not docs:
+            return total
+        ultimo = docs[-1]["_id"]
+        ops = [ReplaceOne({"_id": d["_id"]}, codificar_doc(d)) for d in docs if "ticket_id" in d]
+        if ops:
+            coleccion.bulk_write(ops, ordered=False)
+            total += len(ops)
+
+
+def quitar_indices_viejos(database=None) -> list:
+    """
+    Borra los indices de tickets/tickets_archivo sobre nombres largos: ya
+    no sirven y el de texto impide crear el nuevo (solo se permite uno).
+    """
+    database = db if database is None else database
+    quitados = []
+    for nombre in COLECCIONES_COMPACTAS:
+        for indice, info in database[nombre].index_information().items():
+            llaves = info.get("key", [])
+            # Los de texto guardan sus campos en "weights"
+            campos = [c for c, _ in llaves] + list(info.get("weights", {}))
+            if any(c in CAMPOS for c in campos):
+                database[nombre].drop_index(indice)
+                quitados.append((nombre, indice))
+    return quitados
+
+
+def migrar(database=None, lote: int = 1000) -> dict:
+    """
+    Pasa tickets y tickets_archivo al formato compacto, rehace sus indices
+    y recalcula los rollups: antes los vacios ("") contaban en grupos
+    "dimension|" y ahora, omitidos, cuentan en "dimension|None".
+    """
+    from Mongo.indices import aplicar_indices
+    from Mongo.rollups import reconstruir_rollups
+
+    database = db if database is None else database
+    resumen = {nombre: migrar_coleccion(database[nombre], lote) for nombre in COLECCIONES_COMPACTAS}
+    quitar_indices_viejos(database)
+    aplicar_indices(database)
+    reconstruir_rollups(database)
+    return resumen
+
+
+def pendientes_de_migrar(database=None) -> bool:
+    database = db if database is None else database
+    return any(
+        database[nombre].find_one({"ticket_id": {"$exists": True}}, {"_id": 1})
+        for nombre in COLECCIONES_COMPACTAS
+    )
+
+
+# ---------- Comparacion de tamanos ----------
+
+
+def _expandir(doc: dict) -> dict:
+    """El mismo ticket en el formato anterior: nombres largos, enums en texto, vacios como ""."""
+    largo = decodificar(doc)
+    for campo in ("place_name", "object_name", "lost_status"):
+        largo.setdefault(campo, "")
+    return largo
+
+
+def reporte_tamanos(database=None, muestra: int = 1000) -> dict:
+    """
+    Compara el tamano BSON de una muestra de tickets guardados contra el
+    mismo ticket en el formato anterior, y agrega las estadisticas de la
+    coleccion y sus indices (collStats).
+    """
+    import bson
+
+    database = db if database is None else database
+    compactos = largos = n = 0
+    for doc in database.tickets.aggregate([{"$sample": {"size": muestra}}]):
+        compactos += len(bson.encode(doc))
+        largos += len(bson.encode(_expandir(doc)))
+        n += 1
+
+    resumen = {
+        "muestra": n,
+        "bytes_compacto": compactos / n if n else 0,
+        "bytes_original": largos / n if n else 0,
+    }
+    try:
+        stats = database.command("collStats", "tickets")
+        resumen.update({
+            "documentos": stats.get("count"),
+            "tamano_datos": stats.get("size"),
+            "tamano_disco": stats.get("storageSize"),
+            "tamano_indices": stats.get("totalIndexSize"),
+        })
+    except Exception as e:
+        resumen["collStats"] = str(e)
+    return resumen
+
+
+def imprimir_tamanos(database=None) -> None:
+    r = reporte_tamanos(database)
+    print("\n=== Tamano de tickets: compacto vs formato anterior ===")
+    if not r["muestra"]:
+        print("No hay tickets.\n")
+        return
+    ahorro = 1 - r["bytes_compacto"] / r["bytes_original"]
+    print(f"Muestra: {r['muestra']} tickets")
+    print(f"Promedio por documento: {r['bytes_compacto']:.0f} B compacto vs "
+          f"{r['bytes_original']:.0f} B original ({ahorro:.0%} menos)")
+    if "documentos" in r:
+        print(f"Coleccion: {r['documentos']} docs | datos {r['tamano_datos']} B | "
+              f"disco {r['tamano_disco']} B | indices {r['tamano_indices']} B")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["migrar"]:
+        for nombre, n in migrar().items():
+            print(f"{nombre}: {n} tickets pasados al formato compacto.")
+    else:
+        imprimir_tamanos()
@@ -0,0 +1,201 @@
+"""
+Export de tickets y usuarios a Parquet para analisis.
+
+    python -m Mongo.exportar [directorio]
+
+Escribe:
+
+    <directorio>/tickets/mes=2025-03/category=cosas_perdidas/part-0.parquet
+    <directorio>/usuarios.parquet
+
+Se lee con find_raw_batches: cada lote llega como bytes BSON sin que el
+cursor cree un dict por documento, y se convierte completo a un
+RecordBatch de Arrow. Con pymongoarrow (requirements.txt) la conversion es
+en C de BSON a columnas, sin objetos de Python por documento. Si no esta
+instalado el export funciona igual pero mas lento: cada lote se decodifica
+a dicts con bson.decode_all y de ahi se arman las columnas.
+En memoria solo hay unos cuantos lotes a la vez, sin importar cuantos
+tickets haya. Se leen con pyarrow.dataset, pandas, DuckDB, Spark...
+"""
+import os
+
+from connect import db
+from Mongo.compacto import CAMPOS, COLECCIONES_COMPACTAS, ENUMS
+
+EXPORT_PARQUET_DIR = "data/parquet"
+
+# Documentos por getMore (y por RecordBatch)
+LOTE_EXPORT = 10000
+
+# Filas por row group de Parquet; cada particion abierta junta a lo mas esto
+FILAS_POR_GRUPO = 64 * 1024
+
+CAMPOS_TICKET = [
+    "ticket_id", "title", "description", "category", "status", "priority",
+    "user_id", "installation_id", "place_name", "object_name", "lost_status",
+    "turno", "created_at",
+]
+
+# Sin password ni campos internos (email_norm)
+CAMPOS_USUARIO = ["user_id", "expediente", "email", "role", "createdAt"]
+
+
+def _esquema(campos):
+    """Todo texto, salvo las fechas (timestamp en UTC, como las guarda Mongo)."""
+    import pyarrow as pa
+
+    return pa.schema([
+        (c, pa.timestamp("ms", tz="UTC") if c in ("created_at", "createdAt") else pa.string())
+        for c in campos
+    ])
+
+
+def _convertidor(esquema):
+    """
+    Funcion bloque BSON -> RecordBatch. Con pymongoarrow el bloque se
+    convierte en C directo a columnas, sin objetos de Python por documento;
+    si no esta, el bloque se decodifica a un dict por documento
+    (bson.decode_all) y las columnas se arman desde esos dicts.
+    """
+    import pyarrow as pa
+    from bson.codec_options import CodecOptions
+
+    opciones = CodecOptions(tz_aware=True)
+    try:
+        from pymongoarrow.context import PyMongoArrowContext
+        from pymongoarrow.schema import Schema
+    except ImportError:
+        from bson import decode_all
+
+        def convertir(bloque):
+            docs = decode_all(bloque, opciones)
+            columnas = [pa.array([d.get(c.name) for d in docs], type=c.type) for c in esquema]
+            return pa.RecordBatch.from_arrays(columnas, schema=esquema)
+
+        return convertir
+
+    esquema_pma = Schema({c.name: c.type for c in esquema})
+
+    def convertir(bloque):
+        contexto = PyMongoArrowContext(esquema_pma, codec_options=opciones)
+        contexto.process_bson_stream(bloque)
+        tabla = contexto.finish().combine_chunks()
+        lotes = tabla.to_batches()
+        return lotes[0] if lotes else pa.RecordBatch.from_pylist([], schema=esquema)
+
+    return convertir
+
+
+def lotes_arrow(coleccion, campos, filtro=None, lote: int = LOTE_EXPORT):
+    """
+    RecordBatches de Arrow con `campos` de cada documento, leidos con
+    find_raw_batches (un RecordBatch por lote del servidor). En las
+    colecciones compactas se leen los nombres cortos y los codigos, y se
+    regresan con los nombres y valores legibles.
+    """
+    import pyarrow as pa
+
+    esquema = _esquema(campos)
+    compacta = coleccion.name in COLECCIONES_COMPACTAS
+    guardados = [CAMPOS.get(c, c) if compacta else c for c in campos]
+    esquema_guardado = pa.schema([
+        (g, pa.int32() if compacta and c in ENUMS else campo.type)
+        for g, c, campo in zip(guardados, campos, esquema)
+    ])
+    convertir = _convertidor(esquema_guardado)
+    proyeccion = {"_id": 0, **{g: 1 for g in guardados}}
+    for bloque in coleccion.find_raw_batches(filtro or {}, proyeccion, batch_size=lote):
+        batch = convertir(bloque)
+        yield _legible(batch, campos, esquema) if compacta else batch
+
+
+def _legible(batch, campos, esquema):
+    """Codigos de enum -> texto (take sobre la lista de valores) y nombres largos."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    columnas = []
+    for c, columna in zip(campos, batch.columns):
+        if c in ENUMS:
+            columna = pc.take(pa.array([None] + ENUMS[c], pa.string()), columna)
+        columnas.append(columna)
+    return pa.RecordBatch.from_arrays(columnas, schema=esquema)
+
+
+def _con_mes(lotes):
+    """Agrega la columna de particion mes ("YYYY-MM") calculada sobre created_at."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for batch in lotes:
+        mes = pc.strftime(batch.column("created_at"), format="%Y-%m")
+        yield pa.RecordBatch.from_arrays(
+            batch.columns + [mes], names=batch.schema.names + ["mes"]
+        )
+
+
+def exportar_tickets(directorio: str = EXPORT_PARQUET_DIR, lote: int = LOTE_EXPORT,
+                     database=None) -> int:
+    """Tickets particionados por mes y categoria (hive: mes=.../category=...)."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    database = db if database is None else database
+    esquema = _esquema(CAMPOS_TICKET).append(pa.field("mes", pa.string()))
+    total = 0
+
+    def contar(lotes):
+        nonlocal total
+        for batch in lotes:
+            total += batch.num_rows
+            yield batch
+
+    ds.write_dataset(
+        contar(_con_mes(lotes_arrow(database.tickets, CAMPOS_TICKET, lote=lote))),
+        os.path.join(directorio, "tickets"),
+        schema=esquema,
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("mes", pa.string()), ("category", pa.string())]), flavor="hive"
+        ),
+        # Reexportar reemplaza las particiones que se vuelven a escribir
+        existing_data_behavior="delete_matching",
+        min_rows_per_group=min(lote, FILAS_POR_GRUPO),
+        max_rows_per_group=FILAS_POR_GRUPO,
+    )
+    return total
+
+
+def exportar_usuarios(directorio: str = EXPORT_PARQUET_DIR, lote: int = LOTE_EXPORT,
+                      database=None) -> int:
+    """Usuarios en un solo archivo (son pocos comparados con los tickets)."""
+    import pyarrow.parquet as pq
+
+    database = db if database is None else database
+    os.makedirs(directorio, exist_ok=True)
+    total = 0
+    with pq.ParquetWriter(os.path.join(directorio, "usuarios.parquet"),
+                          _esquema(CAMPOS_USUARIO)) as writer:
+        for batch in lotes_arrow(database.users, CAMPOS_USUARIO, lote=lote):
+            writer.write_batch(batch)
+            total += batch.num_rows
+    return total
+
+
+def exportar_parquet(directorio: str = EXPORT_PARQUET_DIR, lote: int = LOTE_EXPORT) -> dict:
+    print("=== Export Parquet ===")
+    resumen = {
+        "tickets": exportar_tickets(directorio, lote),
+        "usuarios": exportar_usuarios(directorio, lote),
+    }
+    print(
+        f"Export Parquet: {resumen['tickets']} tickets y {resumen['usuarios']} "
+        f"usuarios en {directorio}"
+    )
+    return resumen
+
+
+if __name__ == "__main__":
+    import sys
+
+    exportar_parquet(sys.argv[1] if len(sys.argv) > 1 else EXPORT_PARQUET_DIR)
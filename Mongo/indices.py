@@ -0,0 +1,177 @@
+"""
+Registro central de indices de Mongo.
+
+Cada indice esta aqui una sola vez, pensado para la forma de la consulta
+que lo usa (filtro por igualdad primero, luego el orden). Las llaves van
+con los nombres largos; en tickets y tickets_archivo se crean sobre los
+nombres cortos del formato compacto (Mongo/compacto.py). Los de
+tickets_ts solo aplican con MONGO_TIMESERIES=1 (Mongo/serie_tiempo.py).
+Se aplican al poblar (populate.ensure_mongo_indexes) o a mano como migracion:
+
+    python -m Mongo.indices
+
+main.py revisa al arrancar que no falte ninguno.
+"""
+from connect import db
+from Mongo.compacto import codificar_orden, COLECCIONES_COMPACTAS
+from Mongo.serie_tiempo import COLECCION_TS, asegurar_serie_tiempo, serie_tiempo_activa
+
+# coleccion -> [(llaves, opciones, consulta que lo usa)]
+INDICES = {
+    "users": [
+        ([("email", 1)], {"unique": True}, "populate: upsert de usuarios por email"),
+        ([("user_id", 1)], {"unique": True},
+         "buscar_usuario por user_id; usuarios de cada lote de tickets; listado paginado"),
+        ([("email_norm", 1)],
+         {"unique": True, "partialFilterExpression": {"email_norm": {"$type": "string"}}},
+         "buscar_usuario por email sin importar mayusculas"),
+        ([("role", 1), ("user_id", 1), ("expediente", 1), ("email", 1)],
+         {"partialFilterExpression": {"role": "docente"}},
+         "listar_docentes: consulta cubierta y paginada (solo docentes)"),
+    ],
+    "tickets": [
+        ([("ticket_id", 1)], {"unique": True},
+         "carga delta: upsert por ticket_id; duplicados en la carga bulk"),
+        ([("installation_id", 1), ("created_at", -1)], {},
+         "tickets_recientes_por_instalacion: filtro + orden sin sort en memoria"),
+        ([("created_at", -1), ("ticket_id", -1)], {}, "listados paginados (keyset)"),
+        ([("category", 1), ("created_at", -1), ("ticket_id", -1)], {},
+         "listados paginados filtrados por categoria"),
+        ([("status", 1), ("created_at", -1), ("ticket_id", -1)], {},
+         "listados paginados filtrados por estado"),
+        ([("category", 1), ("status", 1)], {}, "filtros por categoria y estado"),
+        ([("status", 1), ("category", 1)], {}, "tickets_cerrados_por_categoria: $match + $group"),
+        ([("category", 1), ("lost_status", 1)], {}, "resumen_objetos_perdidos: $match + $group"),
+        ([("category", 1), ("place_name", 1)], {}, "cosas perdidas por lugar"),
+        ([("title_norm", 1), ("_id", 1)], {},
+         "buscar_por_prefijo: rango sobre el titulo normalizado + orden del listado"),
+        ([("title", "text"), ("description", "text"), ("object_name", "text")], {},
+         "buscar_por_texto"),
+    ],
+    "ticket_rollups": [
+        ([("dimension", 1), ("total", -1)], {}, "reportes de conteos (Mongo/rollups.py)"),
+    ],
+    # Solo lo que usan los reportes con include_archived ($unionWith)
+    "tickets_archivo": [
+        ([("created_at", -1), ("ticket_id", -1)], {}, "listados paginados con include_archived"),
+        ([("category", 1), ("created_at", -1), ("ticket_id", -1)], {},
+         "listados por categoria con include_archived"),
+        ([("status", 1), ("created_at", -1), ("ticket_id", -1)], {},
+         "listados por estado con include_archived"),
+        ([("title_norm", 1), ("_id", 1)], {}, "buscar_por_prefijo con include_archived"),
+    ],
+    "ticket_rollups_archivo": [
+        ([("dimension", 1), ("total", -1)], {}, "conteos con include_archived"),
+    ],
+    # Coleccion time-series: se crea antes que sus indices (asegurar_serie_tiempo)
+    COLECCION_TS: [
+        ([("meta.installation_id", 1), ("created_at", -1)], {},
+         "reportes por ventana de tiempo filtrados por instalacion"),
+    ],
+}
+
+
+def nombre_indice(llaves) -> str:
+    """Mismo nombre que le pone Mongo por defecto (campo_direccion_...)."""
+    return "_".join(f"{campo}_{direccion}" for campo, direccion in llaves)
+
+
+def llaves_guardadas(coleccion: str, llaves) -> list:
+    """Llaves como quedan en Mongo (nombres cortos en las colecciones compactas)."""
+    return codificar_orden(llaves) if coleccion in COLECCIONES_COMPACTAS else list(llaves)
+
+
+def opciones_distintas(info: dict, opciones: dict) -> bool:
+    """True si un indice existente no tiene las opciones del registro (unique, parcial...)."""
+    return any(info.get(k) != v for k, v in opciones.items())
+
+
+def duplicados(coleccion, llaves, opciones: dict, limite: int = 5) -> list:
+    """
+    Valores de `llaves` repetidos en la coleccion que harian fallar un
+    indice unique (respetando su filtro parcial). Lista vacia si no es
+    unique o no hay repetidos.
+    """
+    if not opciones.get("unique") or coleccion.find_one({}, {"_id": 1}) is None:
+        return []
+    pipeline = []
+    if "partialFilterExpression" in opciones:
+        pipeline.append({"$match": opciones["partialFilterExpression"]})
+    pipeline += [
+        {"$group": {"_id": {campo: f"${campo}" for campo, _ in llaves}, "total": {"$sum": 1}}},
+        {"$match": {"total": {"$gt": 1}}},
+        {"$limit": limite},
+    ]
+    return list(coleccion.aggregate(pipeline, allowDiskUse=True))
+
+
+def aplicar_indices(database=None, excluir=()) -> list:
+    """
+    Crea los indices del registro que falten (create_index es idempotente).
+    Si uno ya existe con otras opciones (p. ej. ahora es unique) lo recrea.
+    Un indice unique sobre datos con repetidos no se toca (el anterior se
+    queda como esta): se avisa cuales son para limpiarlos a mano.
+    Las colecciones de `excluir` no se tocan, ni tickets_ts si la serie de
+    tiempo esta apagada.
+    """
+    database = db if database is None else database
+    creados = []
+    for coleccion, indices in INDICES.items():
+        if coleccion in excluir:
+            continue
+        if coleccion == COLECCION_TS and not asegurar_serie_tiempo(database):
+            continue
+        existentes = database[coleccion].index_information()
+        for llaves, opciones, _ in indices:
+            llaves = llaves_guardadas(coleccion, llaves)
+            nombre = nombre_indice(llaves)
+            distinto = nombre in existentes and opciones_distintas(existentes[nombre], opciones)
+            if nombre not in existentes or distinto:
+                repetidos = duplicados(database[coleccion], llaves, opciones)
+                if repetidos:
+                    print(f"Aviso: no se creo {coleccion}.{nombre} (unique), hay repetidos:")
+                    for doc in repetidos:
+                        print(f"  - {doc['_id']}: {doc['total']} documentos")
+                    continue
+            if distinto:
+                database[coleccion].drop_index(nombre)
+            database[coleccion].create_index(llaves, name=nombre, **opciones)
+            creados.append((coleccion, nombre))
+    return creados
+
+
+def indices_faltantes(database=None) -> list:
+    """
+    Regresa [(coleccion, nombre, uso)] de los indices del registro que no
+    existen o que existen con otras opciones.
+    """
+    database = db if database is None else database
+    faltantes = []
+    for coleccion, indices in INDICES.items():
+        if coleccion == COLECCION_TS and not serie_tiempo_activa():
+            continue
+        existentes = database[coleccion].index_information()
+        for llaves, opciones, uso in indices:
+            nombre = nombre_indice(llaves_guardadas(coleccion, llaves))
+            if nombre not in existentes:
+                faltantes.append((coleccion, nombre, uso))
+            elif opciones_distintas(existentes[nombre], opciones):
+                faltantes.append((coleccion, nombre, f"{uso}; existe con otras opciones"))
+    return faltantes
+
+
+def verificar_indices(database=None) -> list:
+    """Chequeo de arranque: avisa de cada indice faltante."""
+    faltantes = indices_faltantes(database)
+    if faltantes:
+        print(f"\nAviso: faltan {len(faltantes)} indices de Mongo:")
+        for coleccion, nombre, uso in faltantes:
+            print(f"  - {coleccion}.{nombre} ({uso})")
+        print("Ejecuta `python -m Mongo.indices` o el populate para crearlos.")
+    return faltantes
+
+
+if __name__ == "__main__":
+    for coleccion, nombre in aplicar_indices():
+        print(f"{coleccion}.{nombre}")
+    print("Indices de Mongo al dia.")
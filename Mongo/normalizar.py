@@ -0,0 +1,68 @@
+"""
+Normalizacion de texto para busquedas por prefijo.
+
+Los tickets guardan `title_norm`: el titulo sin acentos, en minusculas y
+con espacios colapsados ("Daño en pantalla" -> "dano en pantalla"), con
+indice. Asi "Dano" o "DAÑO" encuentran lo mismo con un rango sobre el
+indice, sin regex insensible a mayusculas.
+
+Para tickets cargados antes de este campo:
+
+    python -m Mongo.normalizar
+"""
+import unicodedata
+
+from pymongo import UpdateOne
+
+from connect import db
+
+
+def normalizar_texto(texto) -> str:
+    """Quita acentos (ñ -> n), pasa a minusculas y colapsa espacios."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.casefold().split())
+
+
+def normalizar_email(email) -> str:
+    """Email sin espacios y en minusculas (casefold): "Ana@ITESO.mx" -> "ana@iteso.mx"."""
+    return (email or "").strip().casefold()
+
+
+def rango_prefijo(prefijo: str) -> dict:
+    """
+    Condicion de rango [prefijo, siguiente) sobre un campo normalizado: es
+    un scan acotado del indice, sensible a mayusculas (ya vienen en minusculas).
+    """
+    p = normalizar_texto(prefijo)
+    if not p:
+        return {"$exists": True}
+    return {"$gte": p, "$lt": p[:-1] + chr(ord(p[-1]) + 1)}
+
+
+def rellenar_title_norm(database=None, lote: int = 1000) -> int:
+    """Agrega title_norm a los tickets que no lo tienen. Regresa cuantos actualizo."""
+    from Mongo.compacto import codificar_actualizacion, compacta
+
+    database = db if database is None else database
+    tickets = compacta(database.tickets)
+    ops = []
+    total = 0
+    cursor = tickets.find(
+        {"title_norm": {"$exists": False}}, {"_id": 1, "title": 1}
+    ).batch_size(lote)
+    for t in cursor:
+        actualizacion = {"$set": {"title_norm": normalizar_texto(t.get("title"))}}
+        ops.append(UpdateOne({"_id": t["_id"]}, codificar_actualizacion(actualizacion)))
+        if len(ops) >= lote:
+            tickets.bulk_write(ops, ordered=False)
+            total += len(ops)
+            ops = []
+    if ops:
+        tickets.bulk_write(ops, ordered=False)
+        total += len(ops)
+    return total
+
+
+if __name__ == "__main__":
+    print(f"title_norm agregado a {rellenar_title_norm()} tickets.")
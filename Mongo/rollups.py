@@ -0,0 +1,217 @@
+"""
+Conteos precalculados de tickets (coleccion ticket_rollups).
+
+Un documento por grupo de cada dimension, con su total:
+
+    {"_id": "instalacion|lab_computo", "dimension": "instalacion",
+     "installation_id": "lab_computo", "total": 42}
+
+populate los mantiene con $inc por cada lote de tickets insertados o
+cambiados, asi los reportes leen O(grupos) documentos y no O(tickets).
+Los tickets archivados (Mongo/archivo.py) cuentan aparte, en
+ticket_rollups_archivo; los reportes los suman solo con include_archived.
+
+El $inc va en una escritura aparte de la de los tickets (bulk_write es de
+una sola coleccion y el servidor no es replica set, asi que no hay
+transacciones): si el proceso cae entre las dos, los conteos se
+desalinean. Cada carga empieza con reconciliar_rollups, que los
+reconstruye si no cuadran con los tickets. A mano:
+
+    python -m Mongo.rollups            # reconstruye
+    python -m Mongo.rollups verificar  # solo revisa
+"""
+from pymongo import UpdateOne
+
+from connect import db
+from Mongo.compacto import compacta
+
+COLECCION_ROLLUPS = "ticket_rollups"
+COLECCION_ROLLUPS_ARCHIVO = "ticket_rollups_archivo"
+
+# dimension -> (campos del grupo, solo tickets de esta categoria o None)
+DIMENSIONES = {
+    "instalacion": (("installation_id",), None),
+    "categoria_estado": (("category", "status"), None),
+    "lugar_perdidas": (("place_name",), "cosas_perdidas"),
+    "lost_status": (("lost_status",), "cosas_perdidas"),
+}
+
+
+def _grupos(ticket) -> list:
+    """[(_id, dimension, campos)] de los grupos a los que cuenta un ticket."""
+    grupos = []
+    for dimension, (campos, categoria) in DIMENSIONES.items():
+        if categoria and ticket.get("category") != categoria:
+            continue
+        # "" y campo ausente (formato compacto) cuentan como el mismo grupo
+        valores = {c: ticket.get(c) or None for c in campos}
+        _id = "|".join([dimension] + [str(v) for v in valores.values()])
+        grupos.append((_id, dimension, valores))
+    return grupos
+
+
+def sumar_deltas(deltas: dict, tickets, signo: int = 1) -> dict:
+    """Acumula en deltas (_id -> [dimension, campos, delta]) los grupos de cada ticket."""
+    for t in tickets:
+        for _id, dimension, valores in _grupos(t):
+            if _id not in deltas:
+                deltas[_id] = [dimension, valores, 0]
+            deltas[_id][2] += signo
+    return deltas
+
+
+def ops_rollups(deltas: dict) -> list:
+    """Un UpdateOne con $inc por grupo que cambio."""
+    return [
+        UpdateOne(
+            {"_id": _id},
+            {"$inc": {"total": delta}, "$setOnInsert": {"dimension": dimension, **valores}},
+            upsert=True,
+        )
+        for _id, (dimension, valores, delta) in deltas.items()
+        if delta
+    ]
+
+
+def aplicar_deltas(coleccion, nuevos=(), anteriores=()) -> int:
+    """
+    Suma los tickets `nuevos` y resta los `anteriores` (versiones previas de
+    tickets que cambiaron) en un solo bulk_write. Regresa cuantos grupos tocó.
+    Se llama despues de escribir los tickets: no es atomico con esa
+    escritura (ver reconciliar_rollups).
+    """
+    deltas = sumar_deltas({}, nuevos, 1)
+    sumar_deltas(deltas, anteriores, -1)
+    ops = ops_rollups(deltas)
+    if ops:
+        coleccion.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def _reconstruir(tickets, rollups) -> int:
+    """Recalcula los conteos de `rollups` desde `tickets` en una sola pasada ($facet)."""
+    facetas = {}
+    for dimension, (campos, categoria) in DIMENSIONES.items():
+        etapas = [{"$match": {"category": categoria}}] if categoria else []
+        etapas.append({
+            "$group": {"_id": {c: f"${c}" for c in campos}, "total": {"$sum": 1}},
+        })
+        facetas[dimension] = etapas
+
+    resultado = next(tickets.aggregate([{"$facet": facetas}]), {})
+    docs = []
+    for dimension, grupos in resultado.items():
+        for g in grupos:
+            valores = {c: g["_id"].get(c) for c in DIMENSIONES[dimension][0]}
+            _id = "|".join([dimension] + [str(v) for v in valores.values()])
+            docs.append({"_id": _id, "dimension": dimension, **valores, "total": g["total"]})
+
+    rollups.delete_many({})
+    if docs:
+        rollups.insert_many(docs)
+    return len(docs)
+
+
+def reconstruir_rollups(database=None) -> int:
+    """Recalcula los conteos de db.tickets y los de tickets_archivo."""
+    from Mongo.archivo import COLECCION_ARCHIVO
+
+    database = db if database is None else database
+    total = _reconstruir(compacta(database.tickets), database[COLECCION_ROLLUPS])
+    total += _reconstruir(
+        compacta(database[COLECCION_ARCHIVO]), database[COLECCION_ROLLUPS_ARCHIVO]
+    )
+    return total
+
+
+def rollups_desalineados(database=None) -> bool:
+    """
+    True si los conteos no cuadran con los tickets. Cada ticket cuenta una
+    vez en la dimension "instalacion", asi que sus totales deben sumar el
+    numero de tickets (igual para el archivo). Detecta tickets escritos sin
+    su $inc, el caso de una caida entre las dos escrituras; un cambio a
+    medias de un ticket existente no mueve la suma y solo se corrige con
+    reconstruir_rollups.
+    """
+    from Mongo.archivo import COLECCION_ARCHIVO
+
+    database = db if database is None else database
+    pares = (
+        (database.tickets, database[COLECCION_ROLLUPS]),
+        (database[COLECCION_ARCHIVO], database[COLECCION_ROLLUPS_ARCHIVO]),
+    )
+    for tickets, rollups in pares:
+        suma = sum(g["total"] for g in rollups.find({"dimension": "instalacion"}, {"total": 1}))
+        if suma != tickets.estimated_document_count():
+            return True
+    return False
+
+
+def reconciliar_rollups(database=None) -> int:
+    """
+    Reconstruye los conteos si estan desalineados (rollups_desalineados).
+    Solo sin cargas en curso: con tickets a medio escribir la suma tampoco
+    cuadra. Regresa cuantos grupos reconstruyo (0 si estaban bien).
+    """
+    database = db if database is None else database
+    if not rollups_desalineados(database):
+        return 0
+    print("ticket_rollups no cuadra con los tickets: reconstruyendo conteos...")
+    return reconstruir_rollups(database)
+
+
+def leer_rollups(dimension: str, orden=None, limite: int = 0, database=None,
+                 include_archived: bool = False) -> list:
+    """
+    Grupos de una dimension con total > 0, por total descendente (o `orden`).
+    Si la coleccion esta vacia pero hay tickets, la reconstruye primero; si
+    solo esta desalineada no (ver reconciliar_rollups).
+    Con include_archived suma tambien los conteos de los tickets archivados.
+    """
+    database = db if database is None else database
+    rollups = database[COLECCION_ROLLUPS]
+    if rollups.find_one({}, {"_id": 1}) is None and database.tickets.find_one({}, {"_id": 1}):
+        print("ticket_rollups vacia: reconstruyendo conteos...")
+        reconstruir_rollups(database)
+
+    orden = orden or [("total", -1)]
+    if include_archived:
+        return _sumar_con_archivo(database, dimension, orden, limite)
+
+    cursor = rollups.find(
+        {"dimension": dimension, "total": {"$gt": 0}}, {"_id": 0, "dimension": 0}
+    ).sort(orden)
+    if limite:
+        cursor = cursor.limit(limite)
+    return list(cursor)
+
+
+def _sumar_con_archivo(database, dimension, orden, limite) -> list:
+    """Junta los grupos de ticket_rollups y ticket_rollups_archivo (son pocos)."""
+    grupos = {}
+    for nombre in (COLECCION_ROLLUPS, COLECCION_ROLLUPS_ARCHIVO):
+        for g in database[nombre].find({"dimension": dimension, "total": {"$gt": 0}}):
+            if g["_id"] in grupos:
+                grupos[g["_id"]]["total"] += g["total"]
+            else:
+                grupos[g["_id"]] = g
+    resultados = [
+        {c: v for c, v in g.items() if c not in ("_id", "dimension")}
+        for g in grupos.values()
+    ]
+    # sort estable: del ultimo criterio al primero
+    for campo, direccion in reversed(orden):
+        resultados.sort(key=lambda g: (g.get(campo) is None, g.get(campo)), reverse=direccion == -1)
+    return resultados[:limite] if limite else resultados
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["verificar"]:
+        if rollups_desalineados():
+            print("Los conteos no cuadran con los tickets; ejecuta `python -m Mongo.rollups`.")
+        else:
+            print("Conteos al dia.")
+    else:
+        print(f"ticket_rollups y ticket_rollups_archivo reconstruidas: {reconstruir_rollups()} grupos.")
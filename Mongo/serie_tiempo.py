@@ -0,0 +1,104 @@
+"""
+Coleccion de serie de tiempo para analitica de creacion de tickets.
+
+Con MONGO_TIMESERIES=1 (ver connect.py) populate escribe, junto a cada
+ticket nuevo en db.tickets, un evento en `tickets_ts`:
+
+    {"created_at": ..., "meta": {"installation_id": ..., "category": ...},
+     "ticket_id": ..., "title": ..., "priority": ..., "turno": ...}
+
+timeField created_at y metaField meta: Mongo agrupa los eventos en buckets
+por instalacion/categoria y hora, comprimidos por columna, y los reportes
+por ventana de tiempo escanean buckets en vez de tickets sueltos.
+Solo guarda datos que no cambian; el estado actual sigue en db.tickets.
+Sin la opcion, los reportes usan db.tickets con los mismos pipelines.
+"""
+import connect
+from connect import db
+from Mongo.compacto import compacta
+
+COLECCION_TS = "tickets_ts"
+
+
+def serie_tiempo_activa() -> bool:
+    return connect.MONGO_TIMESERIES
+
+
+def asegurar_serie_tiempo(database=None) -> bool:
+    """
+    Crea tickets_ts como coleccion time-series si esta activa y no existe.
+    Sus indices estan en el registro de Mongo/indices.py.
+    """
+    database = db if database is None else database
+    if not serie_tiempo_activa():
+        return False
+    if COLECCION_TS not in database.list_collection_names():
+        database.create_collection(
+            COLECCION_TS,
+            timeseries={"timeField": "created_at", "metaField": "meta", "granularity": "hours"},
+        )
+    return True
+
+
+def evento_ts(ticket: dict) -> dict:
+    return {
+        "created_at": ticket["created_at"],
+        "meta": {
+            "installation_id": ticket.get("installation_id"),
+            "category": ticket.get("category"),
+        },
+        "ticket_id": ticket.get("ticket_id"),
+        "title": ticket.get("title"),
+        "priority": ticket.get("priority"),
+        "turno": ticket.get("turno"),
+    }
+
+
+def registrar_eventos(coleccion, tickets) -> int:
+    """Escribe el evento de creacion de cada ticket nuevo (no hace nada si esta apagada)."""
+    if not serie_tiempo_activa():
+        return 0
+    eventos = [evento_ts(t) for t in tickets]
+    if eventos:
+        coleccion.insert_many(eventos, ordered=False)
+    return len(eventos)
+
+
+def fuente_tiempo(database=None) -> tuple:
+    """
+    (coleccion, campo_instalacion, campo_categoria) para los reportes por
+    tiempo: tickets_ts si esta activa, si no db.tickets.
+    """
+    database = db if database is None else database
+    if serie_tiempo_activa():
+        return database[COLECCION_TS], "meta.installation_id", "meta.category"
+    return compacta(database.tickets), "installation_id", "category"
+
+
+def rellenar_serie_tiempo(database=None, lote: int = 1000) -> int:
+    """Backfill: vuelve a llenar tickets_ts con todos los tickets de db.tickets."""
+    from itertools import islice
+
+    database = db if database is None else database
+    if not asegurar_serie_tiempo(database):
+        return 0
+    ts = database[COLECCION_TS]
+    ts.delete_many({})
+    proyeccion = {
+        "_id": 0, "created_at": 1, "installation_id": 1, "category": 1,
+        "ticket_id": 1, "title": 1, "priority": 1, "turno": 1,
+    }
+    cursor = compacta(database.tickets).find({}, proyeccion).batch_size(lote)
+    total = 0
+    while True:
+        tickets = list(islice(cursor, lote))
+        if not tickets:
+            return total
+        total += registrar_eventos(ts, tickets)
+
+
+if __name__ == "__main__":
+    if not serie_tiempo_activa():
+        print("MONGO_TIMESERIES no esta activa; no hay nada que llenar.")
+    else:
+        print(f"tickets_ts llenada con {rellenar_serie_tiempo()} eventos.")
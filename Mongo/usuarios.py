@@ -0,0 +1,74 @@
+"""
+Busqueda de usuarios por user_id o email.
+
+Cada busqueda es una sola consulta de igualdad sobre un indice unico
+(user_id o email_norm, ver Mongo/indices.py) en vez de un $or. El listado
+de docentes usa el indice parcial de role=docente: filtro, orden y campos
+salen del indice (consulta cubierta), paginado por user_id.
+
+Para usuarios cargados antes de email_norm:
+
+    python -m Mongo.usuarios
+"""
+from pymongo import UpdateOne
+
+from connect import db
+from Mongo.client import listar_paginado, TAMANO_PAGINA
+from Mongo.normalizar import normalizar_email
+
+PROYECCION_USUARIO = {"_id": 0, "user_id": 1, "expediente": 1, "email": 1, "role": 1}
+# Sin _id: todos los campos estan en el indice role_1_user_id_1_expediente_1_email_1
+PROYECCION_DOCENTE = {"_id": 0, "user_id": 1, "expediente": 1, "email": 1}
+# user_id es unico, basta como llave de keyset
+ORDEN_DOCENTES = (("user_id", 1),)
+
+
+def buscar_usuario(clave: str, rol=None, database=None):
+    """
+    Usuario por user_id o por email (sin importar mayusculas); None si no
+    existe o no tiene el rol pedido.
+    """
+    database = db if database is None else database
+    clave = (clave or "").strip()
+    if not clave:
+        return None
+    if "@" in clave:
+        filtro = {"email_norm": normalizar_email(clave)}
+    else:
+        filtro = {"user_id": clave}
+    if rol:
+        filtro["role"] = rol
+    return database.users.find_one(filtro, PROYECCION_USUARIO)
+
+
+def listar_docentes(tamano: int = TAMANO_PAGINA, token=None, database=None):
+    """(pagina, siguiente_token) de docentes ordenados por user_id."""
+    database = db if database is None else database
+    return listar_paginado(
+        database.users, {"role": "docente"}, PROYECCION_DOCENTE,
+        ORDEN_DOCENTES, tamano, token,
+    )
+
+
+def rellenar_email_norm(database=None, lote: int = 1000) -> int:
+    """Agrega email_norm a los usuarios que no lo tienen. Regresa cuantos actualizo."""
+    database = db if database is None else database
+    ops = []
+    total = 0
+    cursor = database.users.find(
+        {"email_norm": {"$exists": False}}, {"_id": 1, "email": 1}
+    ).batch_size(lote)
+    for u in cursor:
+        ops.append(UpdateOne({"_id": u["_id"]}, {"$set": {"email_norm": normalizar_email(u.get("email"))}}))
+        if len(ops) >= lote:
+            database.users.bulk_write(ops, ordered=False)
+            total += len(ops)
+            ops = []
+    if ops:
+        database.users.bulk_write(ops, ordered=False)
+        total += len(ops)
+    return total
+
+
+if __name__ == "__main__":
+    print(f"email_norm agregado a {rellenar_email_norm()} usuarios.")
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+Benchmark de populate.py contra dobles locales (en proceso) de Mongo,
+Cassandra y Dgraph, para saber que etapa es el cuello de botella sin
+levantar ninguna base de datos.
+
+Cada etapa corre en su propio proceso y reporta filas/seg, RSS pico y la
+latencia p50/p99 de una escritura individual (una llamada a la "base").
+Los dobles simulan una latencia de red fija por llamada (--latencia-ms)
+mas un costo por documento en escrituras por lote (--costo-doc-us).
+
+Uso:
+    python bench_populate.py
+    python bench_populate.py --filas 3000 30000 --etapas mongo_bulk cassandra_async
+"""
+import argparse
+import contextlib
+import csv
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import threading
+import time
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.results import (
+    BulkWriteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+import populate
+
+
+# ---------- Red simulada y medicion de escrituras ----------
+
+
+class RedSimulada:
+    """Latencia fija por llamada mas costo por documento; guarda cada latencia."""
+
+    def __init__(self, latencia_ms: float = 0.0, costo_doc_us: float = 0.0):
+        self.rtt = latencia_ms / 1000.0
+        self.costo_doc = costo_doc_us / 1_000_000.0
+        self.latencias = []
+        self._lock = threading.Lock()
+
+    def espera(self, n_docs: int = 1) -> float:
+        return self.rtt + self.costo_doc * n_docs
+
+    def llamada(self, n_docs: int = 1) -> None:
+        """Simula una llamada sincrona y registra cuanto tardo."""
+        inicio = time.perf_counter()
+        segundos = self.espera(n_docs)
+        if segundos > 0:
+            time.sleep(segundos)
+        self.registrar(time.perf_counter() - inicio)
+
+    def registrar(self, segundos: float) -> None:
+        with self._lock:
+            self.latencias.append(segundos)
+
+
+# ---------- Mongo en memoria ----------
+
+
+def _coincide(doc: dict, filtro: dict) -> bool:
+    for campo, cond in filtro.items():
+        valor = doc.get(campo)
+        if isinstance(cond, dict) and "$in" in cond:
+            if valor not in cond["$in"]:
+                return False
+        elif valor != cond:
+            return False
+    return True
+
+
+def _proyectar(doc: dict, proyeccion) -> dict:
+    if not proyeccion:
+        return dict(doc)
+    incluidos = [c for c, v in proyeccion.items() if v and c != "_id"]
+    out = {c: doc[c] for c in incluidos if c in doc}
+    if proyeccion.get("_id", 1) and "_id" in doc:
+        out["_id"] = doc["_id"]
+    return out
+
+
+def _aplicar_update(doc: dict, update: dict, insertando: bool) -> bool:
+    cambio = False
+    for campo, valor in update.get("$set", {}).items():
+        if doc.get(campo) != valor:
+            doc[campo] = valor
+            cambio = True
+    if insertando:
+        doc.update(update.get("$setOnInsert", {}))
+    return cambio
+
+
+class CursorFalso:
+    def __init__(self, docs, proyeccion):
+        self._docs = docs
+        self._proyeccion = proyeccion
+        self._limite = None
+
+    def batch_size(self, n):
+        return self
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def __iter__(self):
+        docs = self._docs if self._limite is None else itertools.islice(self._docs, self._limite)
+        for d in docs:
+            yield _proyectar(d, self._proyeccion)
+
+
+class ColeccionFalsa:
+    """
+    Lo minimo de pymongo.Collection que usa populate.py, con indices por
+    campo para que los upserts por email no sean O(n).
+    """
+
+    def __init__(self, red: RedSimulada, nombre: str = ""):
+        self.red = red
+        self.name = nombre
+        self.docs = []
+        self.indices = {}
+
+    def create_index(self, keys, **kwargs):
+        campo = keys if isinstance(keys, str) else keys[0][0]
+        if campo not in self.indices:
+            indice = {}
+            for d in self.docs:
+                indice.setdefault(d.get(campo), []).append(d)
+            self.indices[campo] = indice
+        return f"{campo}_1"
+
+    def index_information(self):
+        # Sin opciones: aplicar_indices no recrea nada en el banco
+        return {}
+
+    def with_options(self, **kwargs):
+        return self
+
+    def _insertar(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        for campo, indice in self.indices.items():
+            indice.setdefault(doc.get(campo), []).append(doc)
+        return doc["_id"]
+
+    def _buscar(self, filtro):
+        filtro = filtro or {}
+        if len(filtro) == 1:
+            campo, cond = next(iter(filtro.items()))
+            if campo in self.indices:
+                indice = self.indices[campo]
+                if not isinstance(cond, dict):
+                    return list(indice.get(cond, []))
+                if list(cond) == ["$in"]:
+                    return [d for v in dict.fromkeys(cond["$in"]) for d in indice.get(v, [])]
+        return [d for d in self.docs if _coincide(d, filtro)]
+
+    def _upsert(self, filtro, update, upsert) -> tuple:
+        encontrados = self._buscar(filtro)
+        if encontrados:
+            return 1, int(_aplicar_update(encontrados[0], update, False)), None
+        if not upsert:
+            return 0, 0, None
+        doc = dict(filtro)
+        _aplicar_update(doc, update, True)
+        return 0, 0, self._insertar(doc)
+
+    # Escrituras
+
+    def insert_one(self, doc):
+        self.red.llamada()
+        return InsertOneResult(self._insertar(doc), True)
+
+    def insert_many(self, docs, ordered=True):
+        docs = list(docs)
+        self.red.llamada(len(docs))
+        return InsertManyResult([self._insertar(d) for d in docs], True)
+
+    def update_one(self, filtro, update, upsert=False):
+        self.red.llamada()
+        n, modificados, upserted = self._upsert(filtro, update, upsert)
+        raw = {"n": n or int(upserted is not None), "nModified": modificados}
+        if upserted is not None:
+            raw["upserted"] = upserted
+        return UpdateResult(raw, True)
+
+    def bulk_write(self, ops, ordered=True):
+        ops = list(ops)
+        self.red.llamada(len(ops))
+        resultado = {
+            "nInserted": 0, "nUpserted": 0, "nMatched": 0,
+            "nModified": 0, "nRemoved": 0, "upserted": [],
+        }
+        for i, op in enumerate(ops):
+            if not isinstance(op, UpdateOne):
+                raise NotImplementedError(f"Operacion no soportada: {op!r}")
+            n, modificados, upserted = self._upsert(op._filter, op._doc, op._upsert)
+            resultado["nMatched"] += n
+            resultado["nModified"] += modificados
+            if upserted is not None:
+                resultado["nUpserted"] += 1
+                resultado["upserted"].append({"index": i, "_id": upserted})
+        return BulkWriteResult(resultado, True)
+
+    # Lecturas (sin latencia: el benchmark mide escrituras)
+
+    def find(self, filtro=None, proyeccion=None, **kwargs):
+        return CursorFalso(self._buscar(filtro), proyeccion)
+
+    def find_one(self, filtro=None, proyeccion=None):
+        encontrados = self._buscar(filtro)
+        return _proyectar(encontrados[0], proyeccion) if encontrados else None
+
+    def count_documents(self, filtro):
+        return len(self._buscar(filtro))
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def distinct(self, campo, filtro=None):
+        # El filtro solo puede ir vacio (el doble no evalua consultas)
+        if filtro:
+            raise NotImplementedError("Filtro no soportado por el doble de Mongo")
+        return list(dict.fromkeys(d.get(campo) for d in self.docs))
+
+    def aggregate(self, pipeline):
+        # Solo {"$group": {"_id": "$campo", x: {"$first": "$campo"}}}
+        if len(pipeline) != 1 or "$group" not in pipeline[0]:
+            raise NotImplementedError("Pipeline no soportado por el doble de Mongo")
+        grupo = pipeline[0]["$group"]
+        clave = grupo["_id"][1:]
+        salida = {}
+        for d in self.docs:
+            k = d.get(clave)
+            if k not in salida:
+                salida[k] = {"_id": k}
+                for campo, acc in grupo.items():
+                    if campo != "_id":
+                        salida[k][campo] = d.get(acc["$first"][1:])
+        return iter(salida.values())
+
+
+class MongoFalso:
+    def __init__(self, red: RedSimulada):
+        self.red = red
+        self._colecciones = {}
+
+    def __getattr__(self, nombre):
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        if nombre not in self._colecciones:
+            self._colecciones[nombre] = ColeccionFalsa(self.red, nombre)
+        return self._colecciones[nombre]
+
+    def __getitem__(self, nombre):
+        return getattr(self, nombre)
+
+    def list_collection_names(self):
+        return list(self._colecciones)
+
+    def create_collection(self, nombre, **kwargs):
+        return self[nombre]
+
+
+# ---------- Cassandra en memoria ----------
+
+
+class FuturoFalso:
+    """Imita ResponseFuture: se completa en el hilo del loop, como el driver."""
+
+    has_more_pages = False
+    _col_names = None
+    _col_types = None
+
+    def __init__(self, red: RedSimulada):
+        self.red = red
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self._hecho = False
+        self._callback = None
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        with self._lock:
+            if not self._hecho:
+                self._callback = (callback, callback_args)
+                return
+        callback([], *callback_args)
+
+    def clear_callbacks(self):
+        self._callback = None
+
+    def completar(self):
+        self.red.registrar(time.perf_counter() - self.inicio)
+        with self._lock:
+            self._hecho = True
+            callback = self._callback
+        if callback:
+            callback[0]([], *callback[1])
+
+
+class SesionCassandraFalsa:
+    """
+    Sesion con execute (sincrono) y execute_async. Las peticiones async se
+    completan en un hilo "event loop" cuando vence su latencia, asi varias
+    peticiones en vuelo se solapan como en el driver real.
+    """
+
+    def __init__(self, red: RedSimulada):
+        self.red = red
+        self.filas = 0
+        self._pendientes = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def prepare(self, query):
+        # Con %s en vez de ? el texto se puede usar en BatchStatement.add
+        return query.replace("?", "%s")
+
+    def _contar(self, statement) -> int:
+        n = len(getattr(statement, "_statements_and_parameters", ())) or 1
+        self.filas += n
+        return n
+
+    def execute(self, statement, parameters=None, **kwargs):
+        self.red.llamada(self._contar(statement))
+        return []
+
+    def execute_async(self, statement, parameters=None, **kwargs):
+        n = self._contar(statement)
+        futuro = FuturoFalso(self.red)
+        with self._cond:
+            vence = time.perf_counter() + self.red.espera(n)
+            heapq.heappush(self._pendientes, (vence, next(self._seq), futuro))
+            self._cond.notify()
+        return futuro
+
+    def submit(self, fn, *args, **kwargs):
+        threading.Thread(target=fn, args=args, kwargs=kwargs, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pendientes:
+                    self._cond.wait()
+                vence, _, futuro = self._pendientes[0]
+                espera = vence - time.perf_counter()
+                if espera > 0:
+                    self._cond.wait(espera)
+                    continue
+                heapq.heappop(self._pendientes)
+            futuro.completar()
+
+
+# ---------- Dgraph en memoria ----------
+
+
+class _RespuestaFalsa:
+    def __init__(self, uids=None):
+        self.uids = uids or {}
+        self.json = b"{}"
+
+
+class TxnFalsa:
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def mutate(self, mutation=None, **kwargs):
+        objetos = json.loads(mutation.set_json)
+        self.cliente.red.llamada(len(objetos))
+        uids = {}
+        with self.cliente.lock:
+            for o in objetos:
+                uid = o.get("uid", "")
+                if uid.startswith("_:"):
+                    uids[uid[2:]] = hex(next(self.cliente.ids))
+            self.cliente.nodos += len(uids)
+        return _RespuestaFalsa(uids)
+
+    def query(self, query, variables=None):
+        return _RespuestaFalsa()
+
+    def commit(self):
+        self.cliente.red.llamada(0)
+
+    def discard(self):
+        pass
+
+
+class ClienteDgraphFalso:
+    def __init__(self, red: RedSimulada):
+        self.red = red
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.nodos = 0
+
+    def alter(self, op):
+        pass
+
+    def txn(self, read_only=False):
+        return TxnFalsa(self)
+
+
+# ---------- Etapas ----------
+
+# etapa -> (funcion de populate, necesita Mongo ya poblado)
+ETAPAS = {
+    "mongo": (lambda csv_file: populate.populate_mongo(csv_file), False),
+    "mongo_bulk": (lambda csv_file: populate.populate_mongo_bulk(csv_file), False),
+    "cassandra": (lambda csv_file: populate.populate_cassandra(), True),
+    "cassandra_async": (lambda csv_file: populate.populate_cassandra_async(), True),
+    "dgraph": (lambda csv_file: populate.populate_dgraph(), True),
+    "dgraph_chunked": (lambda csv_file: populate.populate_dgraph_chunked(), True),
+}
+
+
+def _rss_actual_kb() -> int:
+    with open("/proc/self/statm") as fd:
+        paginas = int(fd.read().split()[1])
+    return paginas * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _percentil(valores, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def _correr_etapa(etapa, csv_file, filas, latencia_ms, costo_doc_us, conn) -> None:
+    """Corre una etapa en el proceso actual (hijo) y manda sus metricas por conn."""
+    red_mongo = RedSimulada()
+    mongo = MongoFalso(red_mongo)
+    populate.db = mongo
+
+    red_cassandra = RedSimulada(latencia_ms, costo_doc_us)
+    populate.get_cassandra_session = lambda: SesionCassandraFalsa(red_cassandra)
+
+    red_dgraph = RedSimulada(latencia_ms, costo_doc_us)
+    populate.create_client_stub = lambda: None
+    populate.create_client = lambda stub: ClienteDgraphFalso(red_dgraph)
+    populate.close_client_stub = lambda stub: None
+
+    funcion, necesita_mongo = ETAPAS[etapa]
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        if necesita_mongo:
+            # Precarga sin latencia: no es parte de lo que se mide
+            populate.populate_mongo_bulk(csv_file)
+
+        red_mongo.rtt = latencia_ms / 1000.0
+        red_mongo.costo_doc = costo_doc_us / 1_000_000.0
+        red = red_mongo if etapa.startswith("mongo") else (
+            red_cassandra if etapa.startswith("cassandra") else red_dgraph
+        )
+
+        rss_inicio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss_base = _rss_actual_kb()
+        inicio = time.perf_counter()
+        funcion(csv_file)
+        segundos = time.perf_counter() - inicio
+        rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    conn.send({
+        "etapa": etapa,
+        "filas": filas,
+        "segundos": segundos,
+        "filas_seg": filas / segundos if segundos else 0.0,
+        "rss_pico_mb": rss_pico / 1024,
+        "rss_etapa_mb": max(0, rss_pico - max(rss_inicio, rss_base)) / 1024,
+        "escrituras": len(red.latencias),
+        "p50_ms": _percentil(red.latencias, 0.50) * 1000,
+        "p99_ms": _percentil(red.latencias, 0.99) * 1000,
+    })
+    conn.close()
+
+
+def medir(etapa, csv_file, filas, latencia_ms=0.2, costo_doc_us=2.0) -> dict:
+    """Corre `etapa` en un proceso nuevo (RSS pico propio) y regresa sus metricas."""
+    ctx = multiprocessing.get_context("fork")
+    recibir, enviar = ctx.Pipe(duplex=False)
+    proceso = ctx.Process(
+        target=_correr_etapa,
+        args=(etapa, csv_file, filas, latencia_ms, costo_doc_us, enviar),
+    )
+    proceso.start()
+    enviar.close()
+    try:
+        resultado = recibir.recv()
+    except EOFError:
+        raise RuntimeError(f"La etapa {etapa} termino sin resultados") from None
+    finally:
+        proceso.join()
+    return resultado
+
+
+def imprimir_tabla(resultados) -> None:
+    print(
+        f"\n{'etapa':<16} {'filas':>9} {'seg':>8} {'filas/seg':>11} "
+        f"{'RSS pico MB':>12} {'RSS etapa MB':>13} {'escrituras':>11} "
+        f"{'p50 ms':>8} {'p99 ms':>8}"
+    )
+    for r in resultados:
+        print(
+            f"{r['etapa']:<16} {r['filas']:>9} {r['segundos']:>8.2f} "
+            f"{r['filas_seg']:>11.0f} {r['rss_pico_mb']:>12.1f} "
+            f"{r['rss_etapa_mb']:>13.1f} {r['escrituras']:>11} "
+            f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}"
+        )
+
+
+def contar_filas(archivos) -> int:
+    """Filas de datos (sin encabezado) que de verdad quedaron en los CSV."""
+    total = 0
+    for archivo in archivos:
+        with open(archivo, newline="", encoding="utf-8") as f:
+            total += max(0, sum(1 for _ in csv.reader(f)) - 1)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de populate.py con dobles locales")
+    parser.add_argument("--filas", type=int, nargs="+", default=[3000, 30000],
+                        help="tamanos de dataset (tickets)")
+    parser.add_argument("--etapas", nargs="+", default=list(ETAPAS), choices=list(ETAPAS))
+    parser.add_argument("--latencia-ms", type=float, default=0.2,
+                        help="latencia simulada por llamada a la base")
+    parser.add_argument("--costo-doc-us", type=float, default=2.0,
+                        help="costo simulado por documento en escrituras por lote")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pedidas in args.filas:
+            csv_file = os.path.join(tmp, f"bench-{pedidas}.csv")
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                archivos = populate.generar_csv_masivo(csv_file, filas=pedidas, seed=args.seed)
+            # generar_csv_masivo redondea a usuarios completos: se reporta lo que se leyo
+            filas = contar_filas(archivos)
+            for etapa in args.etapas:
+                print(f"Midiendo {etapa} con {filas} filas...")
+                resultados.append(
+                    medir(etapa, csv_file, filas, args.latencia_ms, args.costo_doc_us)
+                )
+
+    imprimir_tabla(resultados)
+
+
+if __name__ == "__main__":
+    main()
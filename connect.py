@@ -64,6 +64,12 @@ logger = logging.getLogger("mongo")
 client = MongoClient('mongodb://localhost:27017/')
 db = client.Soporte
 
+# Coleccion time-series opcional para reportes por tiempo (MongoDB 5.0+)
+MONGO_TIMESERIES = os.getenv('MONGO_TIMESERIES', '0') == '1'
+
+# Edad (dias) a partir de la cual un ticket cerrado pasa a tickets_archivo
+MONGO_ARCHIVO_DIAS = int(os.getenv('MONGO_ARCHIVO_DIAS', '180'))
+
 # Config de DGraph
 DGRAPH_URI = os.getenv('DGRAPH_URI', 'localhost:9080')
 
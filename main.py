@@ -16,8 +16,22 @@ from Mongo.client import (
     resumen_objetos_perdidos,
     tickets_cerrados_por_categoria,
     mostrar_usuarios,
+    mostrar_paginado,
     tickets_recientes_por_instalacion,
-    distribucion_categoria_estado
+    distribucion_categoria_estado,
+    tickets_por_periodo,
+    tickets_por_turno_ventana,
+)
+from Mongo.indices import verificar_indices
+from Mongo.archivo import archivar_cerrados
+from Mongo.compacto import compacta, imprimir_tamanos, pendientes_de_migrar
+from Mongo.exportar import exportar_parquet, EXPORT_PARQUET_DIR
+from Mongo.rollups import leer_rollups, reconstruir_rollups, rollups_desalineados
+from Mongo.usuarios import (
+    buscar_usuario,
+    listar_docentes,
+    ORDEN_DOCENTES,
+    PROYECCION_DOCENTE,
 )
 from Cassandra import model as cass_model
 from Dgraph import client as dgraph_client  #Utilizamos la las funciones de client.py
@@ -28,6 +42,9 @@ import pydgraph
 _cassandra_session = None
 _cassandra_schema_creada = False
 
+# Si los reportes de Mongo tambien leen tickets_archivo (opcion 13 del menu)
+_incluir_archivados = False
+
 
 def get_cassandra_session_con_schema():
     """
@@ -82,13 +99,8 @@ def print_sugerencias_instalaciones(limit: int = 5) -> None:
     Muestra algunos installation_id desde los tickets de Mongo.
     """
     try:
-        pipeline = [
-            {"$group": {"_id": "$installation_id", "total": {"$sum": 1}}},
-            {"$sort": {"total": -1}},
-            {"$limit": limit},
-        ]
-        resultados = list(db.tickets.aggregate(pipeline))
-        ids = [r["_id"] for r in resultados if r.get("_id")]
+        resultados = leer_rollups("instalacion", limite=limit)
+        ids = [r["installation_id"] for r in resultados if r.get("installation_id")]
         if ids:
             print("\nEjemplos de installation_id con tickets:")
             print("  " + " | ".join(ids))
@@ -102,7 +114,7 @@ def print_sugerencias_ticket_ids(limit: int = 5) -> None:
     """
     try:
         tickets = list(
-            db.tickets.find(
+            compacta(db.tickets).find(
                 {},
                 {"_id": 0, "ticket_id": 1},
             ).limit(limit)
@@ -225,7 +237,13 @@ def borrar_datos():
     try:
         db.users.delete_many({})
         db.tickets.delete_many({})
-        print("Mongo: colecciones 'users' y 'tickets' vaciadas.")
+        db.ticket_rollups.delete_many({})
+        db.tickets_ts.delete_many({})
+        db.tickets_archivo.delete_many({})
+        db.ticket_rollups_archivo.delete_many({})
+        # Sin datos cargados la watermark de la carga incremental ya no aplica
+        populate.reset_watermarks()
+        print("Mongo: colecciones 'users', 'tickets', 'tickets_archivo', rollups y 'tickets_ts' vaciadas.")
     except Exception as e:
         print("Error al borrar datos en Mongo:", e)
 
@@ -233,14 +251,16 @@ def borrar_datos():
     try:
         session = get_cassandra_session()
         tablas = [
-            "alertas_tickets_vencidos",
+            "tickets_por_antiguedad",
+            "cubetas_antiguedad",
+            "ultimo_cambio_ticket",
             "historial_por_usuario",
             "conteo_tickets_por_categoria_dia",
             "tickets_por_profesor",
             "historial_ticket",
             "tickets_por_instalacion_fechas",
             "tickets_por_estado",
-            "filtrado_tickets_por_fecha",
+            "tickets_por_dia",
             "tickets_por_usuario_dia",
             "tickets_por_rol",
             "conteo_tickets_por_prioridad",
@@ -292,7 +312,7 @@ def menu_instalaciones():
         if op == 0:
             break
         elif op == 1:
-            instalaciones_con_mas_incidencias()
+            instalaciones_con_mas_incidencias(include_archived=_incluir_archivados)
         elif op == 2:
             print_sugerencias_instalaciones()
             install_id = input("install_id (ej. biblioteca): ").strip()
@@ -325,9 +345,9 @@ def menu_cosas_perdidas():
         if op == 0:
             break
         elif op == 1:
-            resumen_objetos_perdidos()
+            resumen_objetos_perdidos(include_archived=_incluir_archivados)
         elif op == 2:
-            lugares_con_mas_perdidas()
+            lugares_con_mas_perdidas(include_archived=_incluir_archivados)
         else:
             print("Opcion no valida.")
 
@@ -349,9 +369,12 @@ def menu_tickets():
         print("8. Conteo_tickets_por_categoria_dia C")
         print("9. Historial_ticket C")
         print("10. Tickets_por_estado C")
-        print("11. Filtrado_tickets_por_fecha C")
+        print("11. Tickets por rango de fechas C")
         print("12. Conteo_tickets_por_prioridad C")
         print("13. Tickets_por_turno C")
+        print("14. Tickets creados por dia/hora M")
+        print("15. Tickets por turno en una ventana de dias M")
+        print("16. Conteo_tickets_por_categoria en un rango de dias C")
         print("0. Volver al menu principal")
 
         try:
@@ -363,18 +386,18 @@ def menu_tickets():
         if op == 0:
             break
         elif op == 1:
-            filtrar_por_categoria()
+            filtrar_por_categoria(include_archived=_incluir_archivados)
         elif op == 2:
-            resumen_estado()
+            resumen_estado(include_archived=_incluir_archivados)
         elif op == 3:
-            buscar_titulos_falla()
+            buscar_titulos_falla(include_archived=_incluir_archivados)
         elif op == 4:
             buscar_por_texto()
         elif op == 5:
-            tickets_cerrados_por_categoria()
+            tickets_cerrados_por_categoria(include_archived=_incluir_archivados)
         elif op == 6:
             # Distribucion categoria-estado (Mongo)
-            distribucion_categoria_estado()
+            distribucion_categoria_estado(include_archived=_incluir_archivados)
         elif op == 7:
             dias = int(input("Dias inactivos mayores a (ej. 5): ").strip() or "5")
             cass_model.alertas_tickets_vencidos(session, dias)
@@ -396,6 +419,14 @@ def menu_tickets():
             cass_model.conteo_por_prioridad(session)
         elif op == 13:
             cass_model.tickets_por_turno(session)
+        elif op == 14:
+            tickets_por_periodo()
+        elif op == 15:
+            tickets_por_turno_ventana()
+        elif op == 16:
+            f1 = input("Fecha inicio (YYYY-MM-DD): ").strip()
+            f2 = input("Fecha fin (YYYY-MM-DD): ").strip()
+            cass_model.tickets_por_categoria_rango(session, f1, f2)
         else:
             print("Opcion no valida.")
 
@@ -420,19 +451,19 @@ def menu_docentes():
         if op == 0:
             break
         elif op == 1:
-            docentes = list(
-                db.users.find(
-                    {"role": "docente"},
-                    {"_id": 0, "user_id": 1, "expediente": 1, "email": 1},
-                )
+            # Paginas de la consulta cubierta por el indice parcial de docentes
+            hay_docentes = mostrar_paginado(
+                db.users,
+                {"role": "docente"},
+                PROYECCION_DOCENTE,
+                lambda d: f"{d['user_id']} | {d['expediente']} | {d['email']}",
+                "\n=== Docentes registrados (Mongo) ===",
+                "\nNo hay docentes registrados en Mongo.\n",
+                orden=ORDEN_DOCENTES,
+                primera=listar_docentes(),
             )
-            if not docentes:
-                print("\nNo hay docentes registrados en Mongo.\n")
+            if not hay_docentes:
                 continue
-
-            print("\n=== Docentes registrados (Mongo) ===")
-            for d in docentes:
-                print(f"{d['user_id']} | {d['expediente']} | {d['email']}")
             print("====================================")
 
             clave = input(
@@ -442,10 +473,8 @@ def menu_docentes():
                 print("Entrada vacia, regresando al menu de docentes.\n")
                 continue
 
-            docente = db.users.find_one(
-                {"$or": [{"user_id": clave}, {"email": clave}]},
-                {"_id": 0, "user_id": 1, "email": 1},
-            )
+            # Una sola busqueda por indice: user_id o email_norm
+            docente = buscar_usuario(clave, rol="docente")
             if not docente:
                 print("\nNo se encontro ningun docente con ese user_id o email.\n")
                 continue
@@ -507,10 +536,31 @@ def print_menu_principal():
     print("7. Ejecutar populate MCD")
     print("8. Borrar TODOS los datos MCD")
     print("9. Reportes D")
+    print("10. Reconstruir conteos de reportes M")
+    print("11. Exportar tickets y usuarios a Parquet M")
+    print("12. Archivar tickets cerrados antiguos M")
+    print(f"13. Incluir tickets archivados en reportes M (actual: {'SI' if _incluir_archivados else 'NO'})")
+    print("14. Tamano de documentos de tickets (compacto vs anterior) M")
     print("0. Salir")
 
 
 def main():
+    global _incluir_archivados
+
+    # Chequeo de arranque: solo avisa, los indices se crean al poblar
+    try:
+        verificar_indices()
+        if pendientes_de_migrar():
+            print("Aviso: hay tickets en el formato anterior; ejecuta `python -m Mongo.compacto migrar`.")
+        elif compacta(db.tickets).find_one({"title_norm": {"$exists": False}}, {"_id": 1}):
+            print("Aviso: hay tickets sin title_norm; ejecuta `python -m Mongo.normalizar`.")
+        if rollups_desalineados():
+            print("Aviso: los conteos de tickets no cuadran; ejecuta `python -m Mongo.rollups`.")
+        if db.users.find_one({"email_norm": {"$exists": False}}, {"_id": 1}):
+            print("Aviso: hay usuarios sin email_norm; ejecuta `python -m Mongo.usuarios`.")
+    except Exception as e:
+        print("\nNo se pudieron revisar los indices de Mongo:", e)
+
     while True:
         print_menu_principal()
 
@@ -547,6 +597,33 @@ def main():
             borrar_datos()
         elif opcion == 9:
             menu_reportes_dgraph()
+        elif opcion == 10:
+            print(f"\nConteos reconstruidos: {reconstruir_rollups()} grupos.\n")
+
+        elif opcion == 11:
+            directorio = input(f"Directorio (Enter para {EXPORT_PARQUET_DIR}): ").strip()
+            try:
+                exportar_parquet(directorio or EXPORT_PARQUET_DIR)
+            except Exception as e:
+                print("Error al exportar a Parquet:", e)
+
+        elif opcion == 12:
+            dias = input("Dias desde la creacion (Enter para el valor de MONGO_ARCHIVO_DIAS): ").strip()
+            try:
+                movidos = archivar_cerrados(int(dias) if dias else None)
+                print(f"\n{movidos} tickets cerrados movidos a tickets_archivo.\n")
+            except Exception as e:
+                print("Error al archivar tickets:", e)
+
+        elif opcion == 13:
+            _incluir_archivados = not _incluir_archivados
+            print(f"\nReportes con tickets archivados: {'SI' if _incluir_archivados else 'NO'}\n")
+
+        elif opcion == 14:
+            try:
+                imprimir_tamanos()
+            except Exception as e:
+                print("Error al calcular tamanos:", e)
 
         else:
             print("\nOpcion no valida.\n")
@@ -1,9 +1,24 @@
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from collections import deque
 import csv
 from datetime import datetime, timedelta
-from pymongo.errors import DuplicateKeyError
+import glob
+import hashlib
+from itertools import islice
+from pymongo import UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import json
+import os
 import pydgraph
+import queue
 import random
+import threading
+import time
 
 from connect import (
     db,
@@ -12,136 +27,159 @@ from connect import (
     create_client,
     close_client_stub,
 )
+from Cassandra.model import GRUPO_CUBETAS, cubeta_antiguedad
+from Mongo.compacto import (
+    ColeccionCompacta, codificar_actualizacion, codificar_consulta, compacta,
+)
+from Mongo.normalizar import normalizar_email, normalizar_texto
+from Mongo.rollups import aplicar_deltas, reconciliar_rollups, reconstruir_rollups
+from Mongo.serie_tiempo import registrar_eventos
 
 CSV_PATH = "data/data.csv"
 
+# Tamano de lote por defecto para cargas masivas
+CHUNK_SIZE = 1000
+
+
+def _chunks(iterable, size: int):
+    """Parte un iterable en listas de a lo mas `size` elementos."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
 # ---------- Generador de CSV ----------
 
-def generar_csv_simple(archivo: str = CSV_PATH, filas: int = 50):
+ENCABEZADOS_CSV = [
+    "user_id", "expediente", "email", "password", "role",
+    "ticket_id", "title", "description", "category", "status", "priority",
+    "installation_id", "place_name", "object_name", "lost_status", "turno"
+]
+TITULOS = [
+    "Falla en equipo de computo",
+    "Falla en proyector del salon",
+    "Falla en red del edificio",
+    "Falla en sistema de impresion",
+    "Falla en bocinas del aula",
+    "Daño en mobiliario",
+    "Daño en pantalla del laboratorio",
+    "Daño en cableado electrico",
+    "Daño en equipo multimedia",
+    "Daño en puerta del aula",
+    "Reporte de incidencia",
+    "Sistema no responde",
+    "Solicitud de mantenimiento",
+    "Incidente recurrente reportado",
+    "Aviso de comportamiento anormal",
+    "Error al iniciar sesion",
+    "Equipo lento durante el uso",
+    "Solicitud de verificación de red",
+    "Advertencia de seguridad",
+    "Actualización requerida en sistema",
+    "Problema detectado durante la clase",
+    "Revisión solicitada del equipo",
+    "Inconveniente en área de estudio",
+    "Petición de soporte técnico",
+    "Reporte de comportamiento extraño",
+    "Problema en laboratorio de computo",
+    "Incidente en edificio de ingenierias",
+    "Reporte de falla en iluminación",
+    "Problema en red del edificio",
+    "Mal funcionamiento en sala de lectura",
+    "Incidente durante clase",
+    "Profesor solicita revisión del equipo",
+    "Equipo no responde durante sesión",
+    "Interrupción en presentación del docente",
+    "Objeto perdido en biblioteca",
+    "Llaves extraviadas en cafetería",
+    "Se encontró objeto sin dueño",
+    "Reporte de mochila perdida",
+    "Extravio de cartera en instalaciones",
+    "Reporte general de mantenimiento",
+    "Reporte de situación anómala",
+    "Reporte de equipo defectuoso",
+    "Reporte preliminar de incidente",
+]
+
+ROLES = ["docente", "estudiante"]
+CATEGORIAS = ["instalaciones", "docentes", "cosas_perdidas"]
+ESTADOS = ["abierto", "en_proceso", "cerrado"]
+PRIORIDADES = ["alta", "media", "baja"]
+INSTALLATION_IDS = [
+    "biblioteca",
+    "gimnasio",
+    "domo",
+    "lab_quimica",
+    "lab_computo",
+    "banos",
+    "estacionamiento",
+    "ingenierias",
+    "humanidades",
+    "negocios",
+    "apoyo_estudiantil",
+    "cafeteria",
+    "taller_ingenieria",
+    "cancha",
+    "auditorio",
+    "estudios",
+    "administracion",
+    "salon_multi",
+]
+PLACE_NAMES = [
+    "Biblioteca central",
+    "Gimnasio principal",
+    "Domo deportivo",
+    "Laboratorio de quimica",
+    "Laboratorio de computo",
+    "Banos edificio A",
+    "Estacionamiento principal",
+    "Edificio ingenierias",
+    "Edificio humanidades",
+    "Edificio negocios",
+    "Centro de apoyo estudiantil",
+    "Cafeteria central",
+    "Sala de lectura",
+    "Taller de ingenieria",
+    "Cancha techada",
+    "Auditorio principal",
+    "Centro de medios",
+    "Edificio administrativo",
+    "Salon multidisciplinario",
+]
+TURNOS = ["manana", "tarde_noche"]
+DESCRIPCIONES = [
+    "El problema se presenta desde la semana pasada.",
+    "La falla ocurre solo en ciertos horarios.",
+    "Se requiere revision por parte de soporte.",
+    "El incidente afecta a varias personas del area.",
+    "Situacion reportada previamente sin solucion.",
+    "El equipo deja de responder aleatoriamente.",
+    "Se detecto comportamiento inusual en el sistema.",
+    "Se necesita revision fisica del equipo.",
+    "El servicio funciona de forma intermitente.",
+    "Error aparece despues de unos minutos de uso.",
+    "El usuario no puede completar sus actividades.",
+    "Se solicita atencion prioritaria al incidente.",
+    "El problema ocurre en mas de un dispositivo.",
+    "Sistema muestra mensajes de error al iniciar.",
+    "El equipo tarda demasiado en responder.",
+    "Configuracion no se guardo correctamente.",
+    "Se sospecha un problema de conexion.",
+    "El fallo se detecto durante la clase.",
+    "Impide uso normal del espacio.",
+    "Validar posible riesgo de seguridad.",
+]
+OBJETOS_PERDIDOS = ["Cartera", "Llaves", "USB", "Mochila", "Guantes"]
+LOST_STATUS = ["activo", "encontrado"]
 
-    encabezados = [
-        "user_id", "expediente", "email", "password", "role",
-        "ticket_id", "title", "description", "category", "status", "priority",
-        "installation_id", "place_name", "object_name", "lost_status", "turno"
-    ]
-    titulos = [
-        "Falla en equipo de computo",
-        "Falla en proyector del salon",
-        "Falla en red del edificio",
-        "Falla en sistema de impresion",
-        "Falla en bocinas del aula",
-        "Daño en mobiliario",
-        "Daño en pantalla del laboratorio",
-        "Daño en cableado electrico",
-        "Daño en equipo multimedia",
-        "Daño en puerta del aula",
-        "Reporte de incidencia",
-        "Sistema no responde",
-        "Solicitud de mantenimiento",
-        "Incidente recurrente reportado",
-        "Aviso de comportamiento anormal",
-        "Error al iniciar sesion",
-        "Equipo lento durante el uso",
-        "Solicitud de verificación de red",
-        "Advertencia de seguridad",
-        "Actualización requerida en sistema",
-        "Problema detectado durante la clase",
-        "Revisión solicitada del equipo",
-        "Inconveniente en área de estudio",
-        "Petición de soporte técnico",
-        "Reporte de comportamiento extraño",
-        "Problema en laboratorio de computo",
-        "Incidente en edificio de ingenierias",
-        "Reporte de falla en iluminación",
-        "Problema en red del edificio",
-        "Mal funcionamiento en sala de lectura",
-        "Incidente durante clase",
-        "Profesor solicita revisión del equipo",
-        "Equipo no responde durante sesión",
-        "Interrupción en presentación del docente",
-        "Objeto perdido en biblioteca",
-        "Llaves extraviadas en cafetería",
-        "Se encontró objeto sin dueño",
-        "Reporte de mochila perdida",
-        "Extravio de cartera en instalaciones",
-        "Reporte general de mantenimiento",
-        "Reporte de situación anómala",
-        "Reporte de equipo defectuoso",
-        "Reporte preliminar de incidente",
-    ]
 
-    roles = ["docente", "estudiante"]
-    categorias = ["instalaciones", "docentes", "cosas_perdidas"]
-    estados = ["abierto", "en_proceso", "cerrado"]
-    prioridades = ["alta", "media", "baja"]
-    installation_ids = [
-        "biblioteca",
-        "gimnasio",
-        "domo",
-        "lab_quimica",
-        "lab_computo",
-        "banos",
-        "estacionamiento",
-        "ingenierias",
-        "humanidades",
-        "negocios",
-        "apoyo_estudiantil",
-        "cafeteria",
-        "taller_ingenieria",
-        "cancha",
-        "auditorio",
-        "estudios",
-        "administracion",
-        "salon_multi",
-    ]
-    place_names = [
-        "Biblioteca central",
-        "Gimnasio principal",
-        "Domo deportivo",
-        "Laboratorio de quimica",
-        "Laboratorio de computo",
-        "Banos edificio A",
-        "Estacionamiento principal",
-        "Edificio ingenierias",
-        "Edificio humanidades",
-        "Edificio negocios",
-        "Centro de apoyo estudiantil",
-        "Cafeteria central",
-        "Sala de lectura",
-        "Taller de ingenieria",
-        "Cancha techada",
-        "Auditorio principal",
-        "Centro de medios",
-        "Edificio administrativo",
-        "Salon multidisciplinario",
-    ]
-    turnos = ["manana", "tarde_noche"]
-    descripciones = [
-        "El problema se presenta desde la semana pasada.",
-        "La falla ocurre solo en ciertos horarios.",
-        "Se requiere revision por parte de soporte.",
-        "El incidente afecta a varias personas del area.",
-        "Situacion reportada previamente sin solucion.",
-        "El equipo deja de responder aleatoriamente.",
-        "Se detecto comportamiento inusual en el sistema.",
-        "Se necesita revision fisica del equipo.",
-        "El servicio funciona de forma intermitente.",
-        "Error aparece despues de unos minutos de uso.",
-        "El usuario no puede completar sus actividades.",
-        "Se solicita atencion prioritaria al incidente.",
-        "El problema ocurre en mas de un dispositivo.",
-        "Sistema muestra mensajes de error al iniciar.",
-        "El equipo tarda demasiado en responder.",
-        "Configuracion no se guardo correctamente.",
-        "Se sospecha un problema de conexion.",
-        "El fallo se detecto durante la clase.",
-        "Impide uso normal del espacio.",
-        "Validar posible riesgo de seguridad.",
-    ]
+def generar_csv_simple(archivo: str = CSV_PATH, filas: int = 50):
 
     with open(archivo, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(encabezados)
+        writer.writerow(ENCABEZADOS_CSV)
 
         ticket_counter = 0
 
@@ -152,31 +190,31 @@ def generar_csv_simple(archivo: str = CSV_PATH, filas: int = 50):
 
             password = "".join(str(random.randint(0, 9)) for _ in range(8))
 
-            role = random.choice(roles)
+            role = random.choice(ROLES)
 
             # 3 tickets por usuario
             for _ in range(3):
                 ticket_counter += 1
                 ticket_id = f"TK-{3000 + ticket_counter}"
 
-                category = random.choice(categorias)
-                status = random.choice(estados)
-                priority = random.choice(prioridades)
+                category = random.choice(CATEGORIAS)
+                status = random.choice(ESTADOS)
+                priority = random.choice(PRIORIDADES)
 
-                installation_id = random.choice(installation_ids)
-                place_name = random.choice(place_names)
+                installation_id = random.choice(INSTALLATION_IDS)
+                place_name = random.choice(PLACE_NAMES)
 
-                title = random.choice(titulos)
-                description = random.choice(descripciones)
+                title = random.choice(TITULOS)
+                description = random.choice(DESCRIPCIONES)
 
                 if category == "cosas_perdidas":
-                    object_name = random.choice(["Cartera", "Llaves", "USB", "Mochila", "Guantes"])
-                    lost_status = random.choice(["activo", "encontrado"])
+                    object_name = random.choice(OBJETOS_PERDIDOS)
+                    lost_status = random.choice(LOST_STATUS)
                 else:
                     object_name = ""
                     lost_status = ""
 
-                turno = random.choice(turnos)
+                turno = random.choice(TURNOS)
 
                 writer.writerow([
                     user_id, expediente, email, password, role,
@@ -186,27 +224,204 @@ def generar_csv_simple(archivo: str = CSV_PATH, filas: int = 50):
 
     print(f"CSV generado: {archivo}")
 
+
+def _csv_campo(valor: str) -> str:
+    """Escapa un valor para CSV igual que csv.writer (comillas si hace falta)."""
+    if any(c in valor for c in ',"\r\n'):
+        return '"' + valor.replace('"', '""') + '"'
+    return valor
+
+
+def _columnas_masivas(np, seed, bloque: int, inicio: int, fin: int, tickets_por_usuario: int):
+    """
+    Genera con NumPy las columnas de las filas [inicio, fin) como arreglos de
+    texto. Cada bloque usa su propio generador derivado de (seed, bloque),
+    asi el resultado no depende de cuantos procesos se usen.
+    """
+    rng = np.random.default_rng([seed, bloque])
+    n = fin - inicio
+
+    def etiquetas(valores, size):
+        # codigos categoricos -> arreglo de etiquetas
+        tabla = np.array([_csv_campo(v) for v in valores], dtype=object)
+        return tabla[rng.integers(0, len(tabla), size)]
+
+    # Columnas de usuario: un valor por usuario repetido en sus tickets
+    primer_usuario = inicio // tickets_por_usuario + 1
+    n_usuarios = n // tickets_por_usuario
+    nums_usuario = np.arange(primer_usuario, primer_usuario + n_usuarios)
+    user_id = np.char.add("U", np.char.mod("%03d", nums_usuario))
+    expediente = rng.integers(750000, 780001, n_usuarios).astype(str)
+    email = np.char.add(np.char.add("user", nums_usuario.astype(str)), "@iteso.mx")
+    password = np.char.mod("%08d", rng.integers(0, 10**8, n_usuarios))
+    role = etiquetas(ROLES, n_usuarios)
+    usuario = [
+        np.repeat(col.astype(object), tickets_por_usuario)
+        for col in (user_id, expediente, email, password, role)
+    ]
+
+    # Columnas de ticket
+    ticket_id = np.char.add("TK-", (3001 + np.arange(inicio, fin)).astype(str)).astype(object)
+    category_codes = rng.integers(0, len(CATEGORIAS), n)
+    category = np.array(CATEGORIAS, dtype=object)[category_codes]
+    perdido = category == "cosas_perdidas"
+    object_name = np.where(perdido, etiquetas(OBJETOS_PERDIDOS, n), "")
+    lost_status = np.where(perdido, etiquetas(LOST_STATUS, n), "")
+
+    return usuario + [
+        ticket_id,
+        etiquetas(TITULOS, n),
+        etiquetas(DESCRIPCIONES, n),
+        category,
+        etiquetas(ESTADOS, n),
+        etiquetas(PRIORIDADES, n),
+        etiquetas(INSTALLATION_IDS, n),
+        etiquetas(PLACE_NAMES, n),
+        object_name,
+        lost_status,
+        etiquetas(TURNOS, n),
+    ]
+
+
+def _escribir_shard_masivo(archivo: str, inicio: int, fin: int, seed: int,
+                           tickets_por_usuario: int, chunk_size: int) -> int:
+    """Escribe las filas [inicio, fin) en `archivo` por bloques de chunk_size."""
+    import numpy as np
+
+    with open(archivo, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        f.write(",".join(ENCABEZADOS_CSV) + "\r\n")
+        for bloque_ini in range(inicio, fin, chunk_size):
+            bloque_fin = min(bloque_ini + chunk_size, fin)
+            columnas = _columnas_masivas(
+                np, seed, bloque_ini // chunk_size, bloque_ini, bloque_fin,
+                tickets_por_usuario,
+            )
+            f.write("\r\n".join(map(",".join, zip(*columnas))))
+            f.write("\r\n")
+    return fin - inicio
+
+
+def generar_csv_masivo(
+    archivo: str = CSV_PATH,
+    filas: int = 1_000_000,
+    tickets_por_usuario: int = 3,
+    seed: int = 0,
+    chunk_size: int = 100_000,
+    procesos: int = 1,
+) -> list:
+    """
+    Generador vectorizado para datasets grandes (pruebas de capacidad).
+    `filas` es el numero de tickets (filas del CSV). Las columnas se arman
+    con NumPy por bloques de chunk_size filas y se escriben en bloques
+    grandes, asi las filas por segundo no bajan al crecer el archivo.
+    Con la misma seed el contenido es el mismo. Con procesos > 1 la salida
+    se reparte en varios archivos (data-00000.csv, data-00001.csv, ...)
+    generados en paralelo. Regresa la lista de archivos escritos.
+    """
+    # Los bloques deben contener usuarios completos
+    chunk_size = max(tickets_por_usuario, chunk_size - chunk_size % tickets_por_usuario)
+    filas -= filas % tickets_por_usuario
+
+    if procesos <= 1:
+        _escribir_shard_masivo(archivo, 0, filas, seed, tickets_por_usuario, chunk_size)
+        print(f"CSV generado: {archivo} ({filas} filas)")
+        return [archivo]
+
+    # Cada shard recibe un numero entero de bloques
+    bloques = -(-filas // chunk_size)
+    por_shard = -(-bloques // procesos) * chunk_size
+    base, ext = os.path.splitext(archivo)
+    shards = []
+    for n, inicio in enumerate(range(0, filas, por_shard)):
+        shards.append((f"{base}-{n:05d}{ext}", inicio, min(inicio + por_shard, filas)))
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            pool.submit(
+                _escribir_shard_masivo, nombre, inicio, fin, seed,
+                tickets_por_usuario, chunk_size,
+            )
+            for nombre, inicio, fin in shards
+        ]
+        for f in futuros:
+            f.result()
+
+    print(f"CSV generado: {len(shards)} archivos {base}-*{ext} ({filas} filas)")
+    return [nombre for nombre, _, _ in shards]
+
+
 # ---------- Mongo ----------
 
 def ensure_mongo_indexes():
-    db.users.create_index("email", unique=True)
-    # tickets: installation_id + created_at
-    db.tickets.create_index("installation_id")
-    db.tickets.create_index([("created_at", -1)])
+    """
+    Aplica el registro central de indices (Mongo/indices.py); ahi mismo se
+    crea la coleccion time-series si esta activa. Antes de cargar tambien
+    repara ticket_rollups si una carga anterior cayo entre la escritura de
+    los tickets y la de sus conteos (reconciliar_rollups).
+    """
+    from Mongo.archivo import asegurar_archivo
+    from Mongo.compacto import COLECCIONES_COMPACTAS, pendientes_de_migrar, quitar_indices_viejos
+    from Mongo.indices import aplicar_indices
+
+    # Antes de los indices: create_index crearia la coleccion sin compresion
+    asegurar_archivo(db)
+    if pendientes_de_migrar(db):
+        # Sin migrar, los indices sobre nombres largos son los que sirven:
+        # se quedan hasta `python -m Mongo.compacto migrar`, que los rehace
+        print("Aviso: hay tickets en el formato anterior; sus indices se rehacen al migrar "
+              "(`python -m Mongo.compacto migrar`).")
+        aplicar_indices(db, excluir=COLECCIONES_COMPACTAS)
+    else:
+        # Indices sobre los nombres largos de antes del formato compacto
+        quitar_indices_viejos(db)
+        aplicar_indices(db)
+        # Sin migrar no se reconcilia: la migracion ya reconstruye los conteos
+        reconciliar_rollups(db)
 
 
-def insert_user(row):
-    users = db.users
+def tickets_db():
+    """db.tickets en formato compacto (Mongo/compacto.py); se usa con nombres largos."""
+    return compacta(db.tickets)
+
 
-    user_doc = {
+def _user_doc(row) -> dict:
+    return {
         "user_id": row["user_id"],
         "expediente": row["expediente"],
         "email": row["email"],
+        # Email en minusculas para buscar por indice sin importar mayusculas
+        "email_norm": normalizar_email(row["email"]),
         "password": row["password"],
         "role": row["role"],
         "createdAt": datetime.utcnow(),
     }
 
+
+def _ticket_doc(row) -> dict:
+    return {
+        "ticket_id": row["ticket_id"],
+        "title": row["title"],
+        # Titulo sin acentos ni mayusculas para busquedas por prefijo
+        "title_norm": normalizar_texto(row["title"]),
+        "description": row["description"],
+        "category": row["category"],
+        "status": row["status"],
+        "priority": row["priority"],
+        "user_id": row["user_id"],
+        "installation_id": row["installation_id"],
+        "place_name": row.get("place_name"),
+        "object_name": row.get("object_name"),
+        "lost_status": row.get("lost_status"),
+        "turno": row.get("turno"),
+        "created_at": datetime.utcnow(),
+    }
+
+
+def insert_user(row):
+    users = db.users
+
+    user_doc = _user_doc(row)
+
     try:
         result = users.update_one(
             {"email": user_doc["email"]},
@@ -220,29 +435,22 @@ def insert_user(row):
             print(f"Usuario ya existia: {user_doc['email']}")
 
     except DuplicateKeyError:
-        print(f"- Email duplicado, ignorado: {user_doc['email']}")
+        # Mismo user_id o email (sin importar mayusculas) que otro usuario
+        print(f"- Usuario duplicado (user_id o email), ignorado: {user_doc['email']}")
 
 
 def insert_ticket(row):
-    tickets = db.tickets
+    tickets = tickets_db()
 
-    ticket_doc = {
-        "ticket_id": row["ticket_id"],
-        "title": row["title"],
-        "description": row["description"],
-        "category": row["category"],
-        "status": row["status"],
-        "priority": row["priority"],
-        "user_id": row["user_id"],
-        "installation_id": row["installation_id"],
-        "place_name": row.get("place_name"),
-        "object_name": row.get("object_name"), 
-        "lost_status": row.get("lost_status"),
-        "turno": row.get("turno"),
-        "created_at": datetime.utcnow(),
-    }
+    ticket_doc = _ticket_doc(row)
 
-    tickets.insert_one(ticket_doc)
+    try:
+        tickets.insert_one(ticket_doc)
+    except DuplicateKeyError:
+        print(f"- Ticket ya existia, ignorado: {ticket_doc['ticket_id']}")
+        return
+    aplicar_deltas(db.ticket_rollups, [ticket_doc])
+    registrar_eventos(db.tickets_ts, [ticket_doc])
     print(f"Ticket creado: {ticket_doc['ticket_id']} ({ticket_doc['title']})")
 
 
@@ -259,286 +467,725 @@ def populate_mongo(csv_file: str = CSV_PATH):
             insert_ticket(row)
 
 
-# ---------- Cassandra ----------
+# Perfiles de write concern para cargas masivas.
+# "seguro" espera journal en la mayoria, "normal" solo confirma el primario
+# y "sin_ack" no espera confirmacion (no se pueden contar resultados).
+WRITE_CONCERN_PERFILES = {
+    "seguro": WriteConcern(w="majority", j=True),
+    "normal": WriteConcern(w=1),
+    "sin_ack": WriteConcern(w=0),
+}
 
 
-def _get_turno(created_at: datetime) -> str:
-    hour = created_at.hour
-    if 7 <= hour < 15:
-        return "manana"
-    return "tarde_noche"
+def _bulk_upsert_usuarios(users, docs, resumen) -> None:
+    """Upsert no ordenado de usuarios (por email) en un solo bulk_write."""
+    if not docs:
+        return
+    ops = [
+        UpdateOne({"email": d["email"]}, {"$setOnInsert": d}, upsert=True)
+        for d in docs
+    ]
+    try:
+        result = users.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        # Otro proceso pudo insertar el mismo email entre el match y el upsert,
+        # o el user_id ya esta con otro email (indice unico de user_id)
+        errores = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errores):
+            raise
+        # Los que si llegaron cuentan igual que sin error
+        resumen["usuarios_existentes"] += len(errores) + e.details.get("nMatched", 0)
+        resumen["usuarios_nuevos"] += e.details.get("nUpserted", 0)
+        return
+
+    if result.acknowledged:
+        resumen["usuarios_nuevos"] += result.upserted_count
+        resumen["usuarios_existentes"] += result.matched_count
+    else:
+        resumen["usuarios_sin_confirmar"] += len(ops)
 
 
-def populate_cassandra():
+def _insert_many_tickets(tickets, docs, resumen, rollups=None, ts=None) -> None:
     """
-    Llena las tablas de Cassandra usando los tickets que ya estan en Mongo.
-    Usa db.tickets y db.users como fuente de verdad.
+    insert_many no ordenado; los ticket_id que ya estaban (indice unico
+    tickets.ticket_id) fallan con 11000 y se cuentan como duplicados.
+    Los tickets que si entraron se suman a `rollups` (ticket_rollups) y se
+    registran en `ts` (tickets_ts) si se dan.
     """
-    from Cassandra import model as cass_model
+    if not docs:
+        return
+    insertados = docs
+    try:
+        result = tickets.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errores = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errores):
+            raise
+        resumen["insertados"] += e.details.get("nInserted", 0)
+        resumen["duplicados"] += len(errores)
+        fallidos = {err["index"] for err in errores}
+        insertados = [d for i, d in enumerate(docs) if i not in fallidos]
+    else:
+        if result.acknowledged:
+            resumen["insertados"] += len(result.inserted_ids)
+        else:
+            resumen["tickets_sin_confirmar"] += len(docs)
 
-    print("=== Populate Cassandra ===")
-    session = get_cassandra_session()
+    if rollups is not None:
+        aplicar_deltas(rollups, insertados)
+    if ts is not None:
+        registrar_eventos(ts, insertados)
 
-    # Asegurar esquema
-    cass_model.create_schema(session)
 
-    # Limpiar datos previos para evitar duplicados
-    tablas = [
-        "alertas_tickets_vencidos",
-        "historial_por_usuario",
-        "conteo_tickets_por_categoria_dia",
-        "tickets_por_profesor",
-        "historial_ticket",
-        "tickets_por_instalacion_fechas",
-        "tickets_por_estado",
-        "filtrado_tickets_por_fecha",
-        "tickets_por_usuario_dia",
-        "tickets_por_rol",
-        "conteo_tickets_por_prioridad",
-        "tickets_por_instalaciones",
-        "tickets_por_turno",
-    ]
-    for nombre in tablas:
-        session.execute(f"TRUNCATE {nombre}")
+def populate_mongo_bulk(
+    csv_file: str = CSV_PATH,
+    chunk_size: int = CHUNK_SIZE,
+    write_concern: str = "normal",
+) -> dict:
+    """
+    Version por lotes de populate_mongo.
+    - Usuarios deduplicados en memoria por email y escritos con bulk_write
+      (UpdateOne upsert, ordered=False).
+    - Tickets escritos con insert_many(ordered=False) en lotes de chunk_size.
+    - write_concern es uno de WRITE_CONCERN_PERFILES.
+    No imprime por fila; regresa un resumen con los conteos.
+    """
+    if write_concern not in WRITE_CONCERN_PERFILES:
+        raise ValueError(
+            f"write_concern desconocido: {write_concern} "
+            f"(opciones: {', '.join(WRITE_CONCERN_PERFILES)})"
+        )
 
-    insert_alerta = session.prepare(
-        """
-        INSERT INTO alertas_tickets_vencidos
-        (dias_inactivos, ticket_id, fecha_ultimo_cambio, estado_actual)
-        VALUES (?, ?, ?, ?)
-        """
+    print("=== Populate Mongo (bulk) ===")
+    ensure_mongo_indexes()
+
+    wc = WRITE_CONCERN_PERFILES[write_concern]
+    users = db.users.with_options(write_concern=wc)
+    tickets = tickets_db().with_options(write_concern=wc)
+    rollups = db.ticket_rollups.with_options(write_concern=wc)
+    ts = db.tickets_ts.with_options(write_concern=wc)
+
+    resumen = {
+        "filas": 0,
+        "insertados": 0,
+        "omitidos": 0,
+        "duplicados": 0,
+        "tickets_sin_confirmar": 0,
+        "usuarios_nuevos": 0,
+        "usuarios_existentes": 0,
+        "usuarios_sin_confirmar": 0,
+    }
+
+    emails_vistos = set()
+    tickets_vistos = set()
+    usuarios_pendientes = []
+    tickets_pendientes = []
+
+    def flush():
+        # Usuarios primero para que cada ticket tenga a su usuario escrito
+        _bulk_upsert_usuarios(users, usuarios_pendientes, resumen)
+        _insert_many_tickets(tickets, tickets_pendientes, resumen, rollups, ts)
+        usuarios_pendientes.clear()
+        tickets_pendientes.clear()
+
+    with open(csv_file, newline="", encoding="utf-8") as fd:
+        reader = csv.DictReader(fd)
+
+        for row in reader:
+            resumen["filas"] += 1
+
+            if not row.get("ticket_id") or not row.get("email"):
+                resumen["omitidos"] += 1
+                continue
+
+            if row["ticket_id"] in tickets_vistos:
+                resumen["duplicados"] += 1
+                continue
+            tickets_vistos.add(row["ticket_id"])
+
+            if row["email"] not in emails_vistos:
+                emails_vistos.add(row["email"])
+                usuarios_pendientes.append(_user_doc(row))
+
+            tickets_pendientes.append(_ticket_doc(row))
+            if len(tickets_pendientes) >= chunk_size:
+                flush()
+
+    flush()
+
+    print(
+        f"Populate Mongo: {resumen['filas']} filas | "
+        f"insertados={resumen['insertados']} "
+        f"omitidos={resumen['omitidos']} "
+        f"duplicados={resumen['duplicados']} | "
+        f"usuarios nuevos={resumen['usuarios_nuevos']} "
+        f"existentes={resumen['usuarios_existentes']}"
     )
-    insert_hist_usuario = session.prepare(
-        """
+    return resumen
+
+
+# Documentos que el servidor manda por cada getMore al leer en streaming
+MONGO_BATCH_SIZE = 2000
+
+
+def leer_mongo(coleccion, filtro=None, proyeccion=None,
+               batch_size: int = MONGO_BATCH_SIZE, crudo: bool = False):
+    """
+    Itera una coleccion sin cargarla completa: el cursor trae `batch_size`
+    documentos por viaje y solo con los campos de `proyeccion`.
+    Con crudo=True usa find_raw_batches y regresa RawBSONDocument, que se
+    decodifica hasta que se lee. En las colecciones compactas cada uno va
+    envuelto en un TicketCrudo, que traduce solo los campos que se piden.
+    """
+    if not crudo:
+        yield from coleccion.find(filtro or {}, proyeccion).batch_size(batch_size)
+        return
+
+    from bson import decode_all
+    from bson.codec_options import CodecOptions
+    from bson.raw_bson import RawBSONDocument
+
+    opciones = CodecOptions(document_class=RawBSONDocument)
+    # Las colecciones compactas regresan los bytes con nombres cortos. Con
+    # isinstance y no getattr: en pymongo coleccion.x es una subcoleccion
+    vista = coleccion.vista_cruda if isinstance(coleccion, ColeccionCompacta) else None
+    for bloque in coleccion.find_raw_batches(filtro or {}, proyeccion, batch_size=batch_size):
+        docs = decode_all(bloque, opciones)
+        yield from (map(vista, docs) if vista else docs)
+
+
+def _usuarios_por_id(user_ids, proyeccion, crudo: bool = False) -> dict:
+    """Solo los usuarios de un lote, para no tener a todos en memoria."""
+    ids = list({uid for uid in user_ids if uid})
+    if not ids:
+        return {}
+    return {
+        u["user_id"]: u
+        for u in leer_mongo(db.users, {"user_id": {"$in": ids}}, proyeccion, crudo=crudo)
+    }
+
+
+# ---------- Cassandra ----------
+
+
+# Tablas que llena populate_cassandra (tambien se truncan antes de cargar)
+TABLAS_CASSANDRA = [
+    "tickets_por_antiguedad",
+    "cubetas_antiguedad",
+    "ultimo_cambio_ticket",
+    "historial_por_usuario",
+    "conteo_tickets_por_categoria_dia",
+    "tickets_por_profesor",
+    "historial_ticket",
+    "tickets_por_instalacion_fechas",
+    "tickets_por_estado",
+    "tickets_por_dia",
+    "tickets_por_usuario_dia",
+    "tickets_por_rol",
+    "conteo_tickets_por_prioridad",
+    "tickets_por_instalaciones",
+    "tickets_por_turno",
+]
+
+# Sentencia de escritura por tabla (INSERT o UPDATE de contador)
+CQL_POPULATE = {
+    "tickets_por_antiguedad": """
+        INSERT INTO tickets_por_antiguedad
+        (cubeta, fecha_ultimo_cambio, ticket_id, estado_actual)
+        VALUES (?, ?, ?, ?)
+        """,
+    "cubetas_antiguedad": """
+        INSERT INTO cubetas_antiguedad (grupo, cubeta)
+        VALUES (?, ?)
+        """,
+    "ultimo_cambio_ticket": """
+        INSERT INTO ultimo_cambio_ticket
+        (ticket_id, cubeta, fecha_ultimo_cambio, estado_actual)
+        VALUES (?, ?, ?, ?)
+        """,
+    "historial_por_usuario": """
         INSERT INTO historial_por_usuario
         (user_id, fecha, ticket_id, categoria, estado)
         VALUES (?, ?, ?, ?, ?)
-        """
-    )
-    insert_profesor = session.prepare(
-        """
+        """,
+    "conteo_tickets_por_categoria_dia": """
+        UPDATE conteo_tickets_por_categoria_dia
+        SET total = total + 1
+        WHERE fecha = ? AND categoria = ?
+        """,
+    "tickets_por_profesor": """
         INSERT INTO tickets_por_profesor
         (profesor_id, fecha_creacion, ticket_id, categoria, estado, descripcion)
         VALUES (?, ?, ?, ?, ?, ?)
-        """
-    )
-    insert_hist_ticket = session.prepare(
-        """
+        """,
+    "historial_ticket": """
         INSERT INTO historial_ticket
         (ticket_id, fecha, evento, usuario, estado_anterior, estado_nuevo)
         VALUES (?, ?, ?, ?, ?, ?)
-        """
-    )
-    insert_instalacion = session.prepare(
-        """
+        """,
+    "tickets_por_instalacion_fechas": """
         INSERT INTO tickets_por_instalacion_fechas
         (install_id, fecha, ticket_id, categoria, estado, prioridad, descripcion)
         VALUES (?, ?, ?, ?, ?, ?, ?)
-        """
-    )
-    insert_estado = session.prepare(
-        """
+        """,
+    "tickets_por_estado": """
         INSERT INTO tickets_por_estado
         (estado, fecha, ticket_id, categoria, user_id)
         VALUES (?, ?, ?, ?, ?)
-        """
-    )
-    insert_tickets = session.prepare(
-        """
-        INSERT INTO filtrado_tickets_por_fecha
-        (fecha, ticket_id, user_id, categoria, estado, prioridad)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """
-    )
-    insert_usuario_dia = session.prepare(
-        """
+        """,
+    "tickets_por_dia": """
+        INSERT INTO tickets_por_dia
+        (fecha, hora, ticket_id, user_id, categoria, estado, prioridad)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+    "tickets_por_usuario_dia": """
         INSERT INTO tickets_por_usuario_dia
         (user_id, fecha, hora, ticket_id, categoria, estado, descripcion)
         VALUES (?, ?, ?, ?, ?, ?, ?)
-        """
-    )
-    insert_rol = session.prepare(
-        """
+        """,
+    "tickets_por_rol": """
         INSERT INTO tickets_por_rol
         (rol, fecha_creacion, ticket_id, user_id, categoria, estado)
         VALUES (?, ?, ?, ?, ?, ?)
-        """
-    )
-    insert_instalaciones = session.prepare(
-        """
+        """,
+    "conteo_tickets_por_prioridad": """
+        UPDATE conteo_tickets_por_prioridad
+        SET total = total + 1
+        WHERE prioridad = ?
+        """,
+    "tickets_por_instalaciones": """
         INSERT INTO tickets_por_instalaciones
         (instalacion, fecha, ticket_id, estado, categoria)
         VALUES (?, ?, ?, ?, ?)
-        """
-    )
+        """,
+    "tickets_por_turno": """
+        UPDATE tickets_por_turno
+        SET total_tickets = total_tickets + 1
+        WHERE turno = ?
+        """,
+}
 
-    update_cat_dia = session.prepare(
-        """
+# Contadores con su version "+ N": en vez de un UPDATE por ticket se suma en
+# memoria por llave y se aplica un solo UPDATE por llave distinta.
+CQL_CONTADOR_DELTA = {
+    "conteo_tickets_por_categoria_dia": """
         UPDATE conteo_tickets_por_categoria_dia
-        SET total = total + 1
+        SET total = total + ?
         WHERE fecha = ? AND categoria = ?
-        """
-    )
-    update_prioridad = session.prepare(
-        """
+        """,
+    "conteo_tickets_por_prioridad": """
         UPDATE conteo_tickets_por_prioridad
-        SET total = total + 1
+        SET total = total + ?
         WHERE prioridad = ?
-        """
-    )
-    update_turno = session.prepare(
-        """
+        """,
+    "tickets_por_turno": """
         UPDATE tickets_por_turno
-        SET total_tickets = total_tickets + 1
+        SET total_tickets = total_tickets + ?
         WHERE turno = ?
-        """
-    )
+        """,
+}
+
+# Cuando se aplican los contadores en populate_cassandra_async:
+# "por_ticket" (un +1 por ticket), "checkpoint" (al terminar cada lote)
+# o "final" (una sola vez al terminar la carga).
+MODOS_CONTADORES = ("por_ticket", "checkpoint", "final")
+
+# Posicion de la llave de particion dentro de los parametros de cada tabla.
+# Solo estas tablas se agrupan en batches UNLOGGED (todas las filas de un
+# batch caen en la misma particion, asi que el batch no reparte trabajo
+# entre nodos).
+PARTICION_CASSANDRA = {
+    "tickets_por_antiguedad": (0,),
+    "historial_por_usuario": (0,),
+    "tickets_por_profesor": (0,),
+    "tickets_por_instalacion_fechas": (0,),
+    "tickets_por_estado": (0,),
+    "tickets_por_dia": (0,),
+    "tickets_por_usuario_dia": (0, 1),
+    "tickets_por_rol": (0,),
+    "tickets_por_instalaciones": (0,),
+}
+
+# Tablas de antiguedad del backlog (ver Cassandra/model.py). Su llave lleva
+# la fecha del ultimo cambio, asi que en modo delta no se borran por llave:
+# se mueven con sentencias_cambio_ticket.
+TABLAS_ANTIGUEDAD = ("tickets_por_antiguedad", "cubetas_antiguedad", "ultimo_cambio_ticket")
+
+# Filas que muchos tickets repiten igual (la lista de cubetas): basta con
+# escribir cada una una vez por lote.
+UNA_VEZ_POR_LOTE = ("cubetas_antiguedad",)
+
+# Columnas de la llave primaria de cada tabla (no contador). En todas son
+# los primeros parametros del INSERT, asi que params[:n] es la llave.
+CLAVE_PRIMARIA_CASSANDRA = {
+    "historial_por_usuario": ("user_id", "fecha", "ticket_id"),
+    "tickets_por_profesor": ("profesor_id", "fecha_creacion", "ticket_id"),
+    "historial_ticket": ("ticket_id", "fecha"),
+    "tickets_por_instalacion_fechas": ("install_id", "fecha", "ticket_id"),
+    "tickets_por_estado": ("estado", "fecha", "ticket_id"),
+    "tickets_por_dia": ("fecha", "hora", "ticket_id"),
+    "tickets_por_usuario_dia": ("user_id", "fecha", "hora", "ticket_id"),
+    "tickets_por_rol": ("rol", "fecha_creacion", "ticket_id"),
+    "tickets_por_instalaciones": ("instalacion", "fecha", "ticket_id"),
+}
+
+
+# Campos de Mongo que usa _sentencias_ticket; lo demas no se lee
+PROYECCION_TICKETS_CASSANDRA = {
+    "_id": 0, "ticket_id": 1, "user_id": 1, "category": 1, "status": 1,
+    "priority": 1, "installation_id": 1, "description": 1, "turno": 1,
+}
+PROYECCION_USUARIOS_CASSANDRA = {"_id": 0, "user_id": 1, "role": 1, "email": 1}
 
-    # Cache de usuarios por user_id
-    usuarios = {u["user_id"]: u for u in db.users.find()}
 
-    now = datetime.utcnow()
-    tickets_cursor = db.tickets.find()
+def _get_turno(created_at: datetime) -> str:
+    hour = created_at.hour
+    if 7 <= hour < 15:
+        return "manana"
+    return "tarde_noche"
+
 
-    for ticket in tickets_cursor:
-        ticket_id = ticket["ticket_id"]
-        user_id = ticket["user_id"]
-        categoria = ticket["category"]
-        estado = ticket["status"]
-        prioridad = ticket["priority"]
-        install_id = ticket["installation_id"]
+def _fecha_simulada(ticket_id: str) -> datetime:
+    """
+    Repartimos tickets en septiembre, octubre y noviembre de 2025
+    segun el numero del ticket_id.
+    """
+    try:
+        num = int(ticket_id.split("-")[1])
+    except (IndexError, ValueError):
+        num = 0
+
+    mod = num % 3
+    if mod == 0:
+        month = 9   # septiembre
+    elif mod == 1:
+        month = 10  # octubre
+    else:
+        month = 11  # noviembre
 
-        #Fecha real de creacion en Mongo 
-        _ = ticket.get("created_at") or now
+    # Dia entre 1 y 28 para evitar problemas de fin de mes
+    day = (num % 28) + 1
+    #Hora simulada 
+    hour = 8 + (num % 10)
 
-        # Repartimos tickets en septiembre, octubre y noviembre de 2025
-        try:
-            num = int(ticket_id.split("-")[1])  
-        except (IndexError, ValueError):
-            num = 0
-
-        mod = num % 3
-        if mod == 0:
-            month = 9   # septiembre
-        elif mod == 1:
-            month = 10  # octubre
-        else:
-            month = 11  # noviembre
-
-        # Dia entre 1 y 28 para evitar problemas de fin de mes
-        day = (num % 28) + 1
-        #Hora simulada 
-        hour = 8 + (num % 10)  
-
-        created_at = datetime(2025, month, day, hour, 0, 0)
-        fecha_dia = created_at.date()
-
-        user = usuarios.get(user_id, {})
-        rol = user.get("role")
-        email = user.get("email", user_id)
-        descripcion = ticket.get("description", "")
-
-        #simulamos dias inactivos segun prioridad/estado
-        base_por_prioridad = {"alta": 10, "media": 5, "baja": 2}
-        dias_inactivos = base_por_prioridad.get(prioridad, 3)
-        if estado == "cerrado":
-            dias_inactivos += 2
-        elif estado == "en_proceso":
-            dias_inactivos = max(dias_inactivos - 1, 0)
-
-        fecha_ultimo_cambio = now - timedelta(days=dias_inactivos)
-        session.execute(
-            insert_alerta,
-            (dias_inactivos, ticket_id, fecha_ultimo_cambio, estado),
-        )
+    return datetime(2025, month, day, hour, 0, 0)
 
-        # 2) historial_por_usuario: un evento de creacion por ticket
-        session.execute(
-            insert_hist_usuario,
-            (user_id, created_at, ticket_id, categoria, estado),
-        )
 
-        # 3) tickets_por_categoria_dia 
-        session.execute(update_cat_dia, (fecha_dia, categoria))
+def _preparar_cassandra(session) -> dict:
+    """Prepara una sola vez la sentencia de escritura de cada tabla."""
+    return {tabla: session.prepare(cql) for tabla, cql in CQL_POPULATE.items()}
 
-        # 4) tickets_por_profesor: solo si es docente
-        if rol == "docente":
-            session.execute(
-                insert_profesor,
-                (user_id, created_at, ticket_id, categoria, estado, descripcion),
-            )
 
-        # 5) historial_ticket: solo un evento "creacion"
-        session.execute(
-            insert_hist_ticket,
-            (ticket_id, created_at, "creacion", email, "N/A", estado),
-        )
+def _sentencias_ticket(ticket, usuarios: dict, now: datetime) -> list:
+    """
+    Regresa las escrituras (tabla, parametros) que genera un ticket de Mongo,
+    en el mismo orden en que las hacia populate_cassandra.
+    """
+    ticket_id = ticket["ticket_id"]
+    user_id = ticket["user_id"]
+    categoria = ticket["category"]
+    estado = ticket["status"]
+    prioridad = ticket["priority"]
+    install_id = ticket["installation_id"]
+
+    created_at = _fecha_simulada(ticket_id)
+    fecha_dia = created_at.date()
+
+    user = usuarios.get(user_id, {})
+    rol = user.get("role")
+    email = user.get("email", user_id)
+    descripcion = ticket.get("description", "")
+
+    #simulamos dias inactivos segun prioridad/estado
+    base_por_prioridad = {"alta": 10, "media": 5, "baja": 2}
+    dias_inactivos = base_por_prioridad.get(prioridad, 3)
+    if estado == "cerrado":
+        dias_inactivos += 2
+    elif estado == "en_proceso":
+        dias_inactivos = max(dias_inactivos - 1, 0)
+
+    fecha_ultimo_cambio = now - timedelta(days=dias_inactivos)
+
+    # 1) antiguedad del backlog: solo los tickets que siguen abiertos
+    sentencias = []
+    if estado != "cerrado":
+        cubeta = cubeta_antiguedad(fecha_ultimo_cambio)
+        sentencias += [
+            ("tickets_por_antiguedad", (cubeta, fecha_ultimo_cambio, ticket_id, estado)),
+            ("cubetas_antiguedad", (GRUPO_CUBETAS, cubeta)),
+            ("ultimo_cambio_ticket", (ticket_id, cubeta, fecha_ultimo_cambio, estado)),
+        ]
+
+    sentencias += [
+        # 2) historial_por_usuario: un evento de creacion por ticket
+        ("historial_por_usuario",
+         (user_id, created_at, ticket_id, categoria, estado)),
+        # 3) tickets_por_categoria_dia 
+        ("conteo_tickets_por_categoria_dia", (fecha_dia, categoria)),
+    ]
 
-        # 6) tickets_por_instalacion_fechas
-        session.execute(
-            insert_instalacion,
-            (install_id, created_at, ticket_id, categoria, estado, prioridad, descripcion),
+    # 4) tickets_por_profesor: solo si es docente
+    if rol == "docente":
+        sentencias.append(
+            ("tickets_por_profesor",
+             (user_id, created_at, ticket_id, categoria, estado, descripcion))
         )
 
+    sentencias += [
+        # 5) historial_ticket: solo un evento "creacion"
+        ("historial_ticket",
+         (ticket_id, created_at, "creacion", email, "N/A", estado)),
+        # 6) tickets_por_instalacion_fechas
+        ("tickets_por_instalacion_fechas",
+         (install_id, created_at, ticket_id, categoria, estado, prioridad, descripcion)),
         # 7) tickets_por_estado
-        session.execute(
-            insert_estado,
-            (estado, created_at, ticket_id, categoria, user_id),
-        )
+        ("tickets_por_estado",
+         (estado, created_at, ticket_id, categoria, user_id)),
+        # 8) tickets (timeline global, particionada por dia)
+        ("tickets_por_dia",
+         (fecha_dia, created_at, ticket_id, user_id, categoria, estado, prioridad)),
+        # 9) tickets_por_usuario_dia
+        ("tickets_por_usuario_dia",
+         (user_id, fecha_dia, created_at, ticket_id, categoria, estado, descripcion)),
+    ]
 
-        # 8) tickets (timeline global)
-        session.execute(
-            insert_tickets,
-            (created_at, ticket_id, user_id, categoria, estado, prioridad),
+    # 10) tickets_por_rol
+    if rol is not None:
+        sentencias.append(
+            ("tickets_por_rol",
+             (rol, created_at, ticket_id, user_id, categoria, estado))
         )
 
-        # 9) tickets_por_usuario_dia
-        session.execute(
-            insert_usuario_dia,
-            (user_id, fecha_dia, created_at, ticket_id, categoria, estado, descripcion),
-        )
+    turno = ticket.get("turno") or _get_turno(created_at)
+    sentencias += [
+        # 11) tickets_por_prioridad 
+        ("conteo_tickets_por_prioridad", (prioridad,)),
+        # 12) tickets_por_instalaciones 
+        ("tickets_por_instalaciones",
+         (install_id, created_at, ticket_id, estado, categoria)),
+        # 13) tickets_por_turno 
+        ("tickets_por_turno", (turno,)),
+    ]
+    return sentencias
 
-        # 10) tickets_por_rol
-        if rol is not None:
-            session.execute(
-                insert_rol,
-                (rol, created_at, ticket_id, user_id, categoria, estado),
-            )
 
-        # 11) tickets_por_prioridad 
-        session.execute(update_prioridad, (prioridad,))
+def _preparar_carga_cassandra(session, truncar: bool = True):
+    from Cassandra import model as cass_model
 
-        # 12) tickets_por_instalaciones 
-        instalacion = install_id
-        session.execute(
-            insert_instalaciones,
-            (instalacion, created_at, ticket_id, estado, categoria),
-        )
+    # Asegurar esquema
+    cass_model.create_schema(session)
 
-        # 13) tickets_por_turno 
-        turno = ticket.get("turno") or _get_turno(created_at)
-        session.execute(update_turno, (turno,))
+    # Limpiar datos previos para evitar duplicados
+    if truncar:
+        for nombre in TABLAS_CASSANDRA:
+            session.execute(f"TRUNCATE {nombre}")
+
+    return _preparar_cassandra(session)
+
+
+def populate_cassandra(chunk_size: int = CHUNK_SIZE, crudo: bool = False):
+    """
+    Llena las tablas de Cassandra usando los tickets que ya estan en Mongo.
+    Usa db.tickets y db.users como fuente de verdad; los lee en streaming,
+    proyectados, y por cada lote de tickets solo busca sus usuarios.
+    """
+    print("=== Populate Cassandra ===")
+    session = get_cassandra_session()
+    stmts = _preparar_carga_cassandra(session)
+
+    now = datetime.utcnow()
+    tickets = leer_mongo(tickets_db(), proyeccion=PROYECCION_TICKETS_CASSANDRA, crudo=crudo)
+
+    for lote in _chunks(tickets, chunk_size):
+        usuarios = _usuarios_por_id(
+            (t["user_id"] for t in lote), PROYECCION_USUARIOS_CASSANDRA, crudo
+        )
+        escritas = set()
+        for ticket in lote:
+            for tabla, params in _sentencias_ticket(ticket, usuarios, now):
+                if tabla in UNA_VEZ_POR_LOTE:
+                    if (tabla, params) in escritas:
+                        continue
+                    escritas.add((tabla, params))
+                session.execute(stmts[tabla], params)
 
     print("Populate Cassandra: inserciones completadas.")
 
 
-# ---------- Dgraph ----------
+def _agrupar_por_particion(stmts: dict, sentencias: list, batch_size: int) -> list:
+    """
+    Convierte escrituras (tabla, parametros) en trabajos (tabla, n, statement,
+    parametros). Las tablas de PARTICION_CASSANDRA se agrupan por llave de
+    particion en BatchStatement UNLOGGED de a lo mas batch_size filas; las
+    de UNA_VEZ_POR_LOTE se escriben una vez aunque se repitan.
+    """
+    from cassandra.query import BatchStatement, BatchType
+
+    trabajos = []
+    por_particion = {}
+    escritas = set()
+    for tabla, params in sentencias:
+        if tabla in UNA_VEZ_POR_LOTE:
+            if (tabla, params) in escritas:
+                continue
+            escritas.add((tabla, params))
+        posiciones = PARTICION_CASSANDRA.get(tabla)
+        if posiciones is None:
+            trabajos.append((tabla, 1, stmts[tabla], params))
+            continue
+        llave = (tabla,) + tuple(params[i] for i in posiciones)
+        por_particion.setdefault(llave, []).append(params)
+
+    for llave, filas in por_particion.items():
+        tabla = llave[0]
+        for grupo in _chunks(filas, batch_size):
+            if len(grupo) == 1:
+                trabajos.append((tabla, 1, stmts[tabla], grupo[0]))
+                continue
+            batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+            for params in grupo:
+                batch.add(stmts[tabla], params)
+            trabajos.append((tabla, len(grupo), batch, None))
+
+    return trabajos
 
 
-def populate_dgraph():
+def _ejecutar_trabajos(session, trabajos: list, concurrency: int, resumen: dict) -> None:
     """
-    Llena Dgraph usando los tickets que ya estan en Mongo
-    Crea nodos/relaciones segun el esquema RDF del doc.
+    Ejecuta los trabajos con execute_concurrent (a lo mas `concurrency`
+    peticiones en vuelo) y cuenta filas escritas y con error por tabla.
     """
-   
-    print("=== Populate Dgraph ===")
+    from cassandra.concurrent import execute_concurrent
+
+    resultados = execute_concurrent(
+        session,
+        ((stmt, params) for _, _, stmt, params in trabajos),
+        concurrency=concurrency,
+        raise_on_first_error=False,
+        results_generator=True,
+    )
+    for (tabla, n, _, _), (ok, resultado) in zip(trabajos, resultados):
+        if ok:
+            resumen["escritas"][tabla] = resumen["escritas"].get(tabla, 0) + n
+            continue
+        resumen["errores"][tabla] = resumen["errores"].get(tabla, 0) + n
+        # Guardamos el primer error de cada tabla para poder diagnosticarlo
+        resumen["primer_error"].setdefault(tabla, repr(resultado))
 
-    # Crear cliente de Dgraph
-    stub = create_client_stub()
-    client = create_client(stub)
 
-  # Esquema RDF
-    schema = """
+def _leer_concurrente(session, stmt, parametros: list, concurrency: int) -> list:
+    """Primera fila (o None) de cada lectura, en el orden de `parametros`."""
+    from cassandra.concurrent import execute_concurrent
+
+    resultados = execute_concurrent(
+        session, ((stmt, p) for p in parametros),
+        concurrency=concurrency, raise_on_first_error=True,
+    )
+    return [filas.one() for _, filas in resultados]
+
+
+def _trabajos_contadores(stmts_delta: dict, deltas: dict) -> list:
+    """
+    Convierte los deltas acumulados {(tabla, llave): n} en trabajos con un
+    solo UPDATE "+ n" por llave distinta (los deltas en cero se omiten).
+    """
+    return [
+        (tabla, n, stmts_delta[tabla], (n,) + llave)
+        for (tabla, llave), n in deltas.items()
+        if n
+    ]
+
+
+def populate_cassandra_async(
+    concurrency: int = 64,
+    batch_size: int = 20,
+    chunk_size: int = CHUNK_SIZE,
+    modo_contadores: str = "checkpoint",
+    crudo: bool = False,
+) -> dict:
+    """
+    Version concurrente de populate_cassandra.
+    Lee los tickets de Mongo en lotes de chunk_size, agrupa las escrituras
+    por particion en batches UNLOGGED y las manda con execute_concurrent
+    con a lo mas `concurrency` peticiones en vuelo.
+    Los contadores se suman en memoria y se aplican segun modo_contadores
+    (ver MODOS_CONTADORES), asi se hacen O(llaves distintas) UPDATEs en
+    vez de O(tickets). Mongo se lee en streaming igual que en
+    populate_cassandra (crudo=True decodifica con RawBSON).
+    Regresa un resumen con filas escritas y errores por tabla; si alguna
+    escritura falla se reporta, nunca se descarta en silencio.
+    """
+    if modo_contadores not in MODOS_CONTADORES:
+        raise ValueError(
+            f"modo_contadores desconocido: {modo_contadores} "
+            f"(opciones: {', '.join(MODOS_CONTADORES)})"
+        )
+
+    print("=== Populate Cassandra (async) ===")
+    session = get_cassandra_session()
+    stmts = _preparar_carga_cassandra(session)
+    stmts_delta = {
+        tabla: session.prepare(cql) for tabla, cql in CQL_CONTADOR_DELTA.items()
+    }
+
+    now = datetime.utcnow()
+    resumen = {
+        "tickets": 0,
+        "escritas": {},
+        "errores": {},
+        "primer_error": {},
+        "updates_contadores": 0,
+    }
+    deltas = {}
+
+    def aplicar_contadores():
+        trabajos = _trabajos_contadores(stmts_delta, deltas)
+        _ejecutar_trabajos(session, trabajos, concurrency, resumen)
+        resumen["updates_contadores"] += len(trabajos)
+        deltas.clear()
+
+    tickets = leer_mongo(tickets_db(), proyeccion=PROYECCION_TICKETS_CASSANDRA, crudo=crudo)
+    for lote in _chunks(tickets, chunk_size):
+        usuarios = _usuarios_por_id(
+            (t["user_id"] for t in lote), PROYECCION_USUARIOS_CASSANDRA, crudo
+        )
+        sentencias = []
+        for ticket in lote:
+            for tabla, params in _sentencias_ticket(ticket, usuarios, now):
+                if modo_contadores != "por_ticket" and tabla in CQL_CONTADOR_DELTA:
+                    llave = (tabla, params)
+                    deltas[llave] = deltas.get(llave, 0) + 1
+                else:
+                    sentencias.append((tabla, params))
+        trabajos = _agrupar_por_particion(stmts, sentencias, batch_size)
+        _ejecutar_trabajos(session, trabajos, concurrency, resumen)
+        resumen["tickets"] += len(lote)
+
+        if modo_contadores == "checkpoint":
+            aplicar_contadores()
+
+    if deltas:
+        aplicar_contadores()
+
+    total = sum(resumen["escritas"].values())
+    print(f"Populate Cassandra: {resumen['tickets']} tickets, {total} filas escritas.")
+    if modo_contadores != "por_ticket":
+        print(
+            f"Populate Cassandra: contadores aplicados con "
+            f"{resumen['updates_contadores']} updates ({modo_contadores})."
+        )
+    if resumen["errores"]:
+        print("Populate Cassandra: escrituras con error por tabla:")
+        for tabla, n in sorted(resumen["errores"].items()):
+            print(f"- {tabla}: {n} ({resumen['primer_error'][tabla]})")
+
+    return resumen
+
+
+# ---------- Dgraph ----------
+
+# Esquema RDF
+DGRAPH_SCHEMA = """
     user_id: string @index(exact) .
     nombre: string @index(term) .
     email: string @index(exact) .
@@ -652,28 +1299,167 @@ def populate_dgraph():
       hora_fin
       periodo
     }
-    """
+"""
+
+AGENTES_DGRAPH = [
+    {"agente_id": "AG-001", "nombre": "Agente Soporte 1", "email": "agente1@iteso.mx", "dept_id": "DESI"},
+    {"agente_id": "AG-002", "nombre": "Agente Soporte 2", "email": "agente2@iteso.mx", "dept_id": "DESI"},
+    {"agente_id": "AG-003", "nombre": "Agente Soporte 3", "email": "agente3@iteso.mx", "dept_id": "DEGN"},
+]
+
+PERIODOS_DGRAPH = {
+    9: {
+        "periodo_id": "P-2025-09",
+        "descripcion": "Septiembre 2025",
+        "fecha_inicio": datetime(2025, 9, 1),
+        "fecha_fin": datetime(2025, 9, 30),
+    },
+    10: {
+        "periodo_id": "P-2025-10",
+        "descripcion": "Octubre 2025",
+        "fecha_inicio": datetime(2025, 10, 1),
+        "fecha_fin": datetime(2025, 10, 31),
+    },
+    11: {
+        "periodo_id": "P-2025-11",
+        "descripcion": "Noviembre 2025",
+        "fecha_inicio": datetime(2025, 11, 1),
+        "fecha_fin": datetime(2025, 11, 30),
+    },
+}
+
+HORARIOS_DGRAPH = {
+    "manana": {
+        "horario_id": "H-MANANA",
+        "hora_inicio": "07:00",
+        "hora_fin": "14:59",
+        "periodo": "manana",
+    },
+    "tarde_noche": {
+        "horario_id": "H-TARDE-NOCHE",
+        "hora_inicio": "15:00",
+        "hora_fin": "22:00",
+        "periodo": "tarde_noche",
+    },
+}
+
+TIPOS_PROBLEMA_DGRAPH = [
+    {"tipo_id": "TP-01", "descripcion": "Falla electrica"},
+    {"tipo_id": "TP-02", "descripcion": "Problema con equipo/docente"},
+    {"tipo_id": "TP-03", "descripcion": "Perdida de objeto"},
+]
+
+# Campos de Mongo que usan _usuario_obj / _ticket_obj
+PROYECCION_USUARIOS_DGRAPH = {"_id": 0, "user_id": 1, "email": 1, "role": 1, "expediente": 1}
+PROYECCION_TICKETS_DGRAPH = {
+    "_id": 0, "ticket_id": 1, "user_id": 1, "title": 1, "description": 1,
+    "status": 1, "priority": 1, "category": 1, "installation_id": 1,
+    "place_name": 1, "turno": 1,
+}
+
+STOPWORDS = frozenset({
+    "el", "la", "los", "las", "un", "una", "unos", "unas",
+    "de", "del", "en", "y", "o", "por", "para", "con", "al",
+    "se", "lo", "que", "es", "esta", "este", "son",
+})
+
+# Puntuacion que se quita de los extremos de cada palabra
+_PUNTUACION = ".,;:¡!¿?()[]{}\"'"
+
+# Palabras clave que se guardan por ticket
+MAX_PALABRAS_CLAVE = 5
+
+
+def normalizar_palabra(w: str) -> str:
+    return w.lower().strip(_PUNTUACION)
+
+
+def palabras_clave(titulo: str, descripcion: str) -> list:
+    """Primeras 5 palabras clave distintas del titulo + descripcion."""
+    # lower() una sola vez sobre todo el texto y corte al llegar a 5
+    vistas = {}
+    for raw in f"{titulo} {descripcion}".lower().split():
+        w = raw.strip(_PUNTUACION)
+        if len(w) < 4 or w in STOPWORDS or w in vistas:
+            continue
+        vistas[w] = None
+        if len(vistas) == MAX_PALABRAS_CLAVE:
+            break
+    return list(vistas)
 
-    op = pydgraph.Operation(schema=schema)
-    client.alter(op)
 
-    # Datos desde Mongo
-    usuarios_db = list(db.users.find())
-    tickets_db = list(db.tickets.find())
+def _tokenizar_lote(tickets) -> dict:
+    """
+    Tokeniza un lote de tickets (dicts con ticket_id, title, description).
+    Regresa palabra -> [ticket_id], en orden de aparicion.
+    """
+    por_palabra = {}
+    for t in tickets:
+        for w in palabras_clave(t.get("title", ""), t.get("description", "")):
+            por_palabra.setdefault(w, []).append(t.get("ticket_id"))
+    return por_palabra
+
 
+def extraer_palabras_clave(lotes, procesos: int = 4):
+    """
+    Etapa de tokenizacion: por cada lote de tickets regresa, en el mismo
+    orden, (lote, palabra -> [ticket_id]). Los lotes se tokenizan en un
+    pool de procesos con a lo mas procesos*2 lotes en vuelo; con
+    procesos <= 1 se tokeniza en el proceso actual.
+    """
+    if procesos <= 1:
+        for lote in lotes:
+            yield lote, _tokenizar_lote(lote)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = deque()
+        for lote in lotes:
+            textos = [
+                {"ticket_id": t.get("ticket_id"), "title": t.get("title", ""),
+                 "description": t.get("description", "")}
+                for t in lote
+            ]
+            en_vuelo.append((lote, pool.submit(_tokenizar_lote, textos)))
+            if len(en_vuelo) >= procesos * 2:
+                lote_listo, futuro = en_vuelo.popleft()
+                yield lote_listo, futuro.result()
+        while en_vuelo:
+            lote_listo, futuro = en_vuelo.popleft()
+            yield lote_listo, futuro.result()
+
+
+def _palabras_por_ticket(por_palabra: dict, destino=None) -> dict:
+    """Invierte palabra -> [ticket_id] a ticket_id -> [palabra] (sobre destino si se da)."""
+    destino = {} if destino is None else destino
+    for w, ticket_ids in por_palabra.items():
+        for ticket_id in ticket_ids:
+            destino.setdefault(ticket_id, []).append(w)
+    return destino
+
+
+def _nodos_fijos() -> tuple:
+    """
+    Construye los nodos fijos del grafo (agentes, periodos, horarios, tipos).
+    Regresa (objetos, refs) donde refs[grupo][llave] es el blank node
+    ("_:...") de cada nodo; los grupos de datos empiezan vacios.
+    """
     objetos = []
+    refs = {
+        "agente": {},
+        "periodo": {},
+        "horario": {},
+        "tipo": {},
+        "categoria": {},
+        "instalacion": {},
+        "palabra": {},
+        "usuario": {},
+    }
 
     # ---------- Agentes ----------
-    agentes_info = [
-        {"agente_id": "AG-001", "nombre": "Agente Soporte 1", "email": "agente1@iteso.mx", "dept_id": "DESI"},
-        {"agente_id": "AG-002", "nombre": "Agente Soporte 2", "email": "agente2@iteso.mx", "dept_id": "DESI"},
-        {"agente_id": "AG-003", "nombre": "Agente Soporte 3", "email": "agente3@iteso.mx", "dept_id": "DEGN"},
-    ]
-
-    agente_map = {}
-    for a in agentes_info:
+    for a in AGENTES_DGRAPH:
         uid = f"_:ag_{a['agente_id']}"
-        agente_map[a["agente_id"]] = uid
+        refs["agente"][a["agente_id"]] = uid
         objetos.append(
             {
                 "uid": uid,
@@ -685,31 +1471,9 @@ def populate_dgraph():
         )
 
     # ---------- Periodos temporales ----------
-    periodos_info = {
-        9: {
-            "periodo_id": "P-2025-09",
-            "descripcion": "Septiembre 2025",
-            "fecha_inicio": datetime(2025, 9, 1),
-            "fecha_fin": datetime(2025, 9, 30),
-        },
-        10: {
-            "periodo_id": "P-2025-10",
-            "descripcion": "Octubre 2025",
-            "fecha_inicio": datetime(2025, 10, 1),
-            "fecha_fin": datetime(2025, 10, 31),
-        },
-        11: {
-            "periodo_id": "P-2025-11",
-            "descripcion": "Noviembre 2025",
-            "fecha_inicio": datetime(2025, 11, 1),
-            "fecha_fin": datetime(2025, 11, 30),
-        },
-    }
-
-    periodo_map = {}
-    for month, info in periodos_info.items():
+    for month, info in PERIODOS_DGRAPH.items():
         uid = f"_:per_{info['periodo_id']}"
-        periodo_map[month] = uid
+        refs["periodo"][month] = uid
         objetos.append(
             {
                 "uid": uid,
@@ -722,25 +1486,9 @@ def populate_dgraph():
         )
 
     # ---------- Horarios ----------
-    horarios_info = {
-        "manana": {
-            "horario_id": "H-MANANA",
-            "hora_inicio": "07:00",
-            "hora_fin": "14:59",
-            "periodo": "manana",
-        },
-        "tarde_noche": {
-            "horario_id": "H-TARDE-NOCHE",
-            "hora_inicio": "15:00",
-            "hora_fin": "22:00",
-            "periodo": "tarde_noche",
-        },
-    }
-
-    horario_map = {}
-    for key, info in horarios_info.items():
+    for key, info in HORARIOS_DGRAPH.items():
         uid = f"_:hor_{key}"
-        horario_map[key] = uid
+        refs["horario"][key] = uid
         objetos.append(
             {
                 "uid": uid,
@@ -753,16 +1501,9 @@ def populate_dgraph():
         )
 
     # ---------- Tipos de problema ----------
-    tipos_info = [
-        {"tipo_id": "TP-01", "descripcion": "Falla electrica"},
-        {"tipo_id": "TP-02", "descripcion": "Problema con equipo/docente"},
-        {"tipo_id": "TP-03", "descripcion": "Perdida de objeto"},
-    ]
-
-    tipo_map = {}
-    for tinfo in tipos_info:
+    for tinfo in TIPOS_PROBLEMA_DGRAPH:
         uid = f"_:tp_{tinfo['tipo_id']}"
-        tipo_map[tinfo["tipo_id"]] = uid
+        refs["tipo"][tinfo["tipo_id"]] = uid
         objetos.append(
             {
                 "uid": uid,
@@ -772,39 +1513,39 @@ def populate_dgraph():
             }
         )
 
+    return objetos, refs
+
+
+def _nodos_nuevos(refs: dict, categorias_nombres, instalaciones: dict, palabras) -> list:
+    """
+    Construye los nodos de categorias, instalaciones y palabras clave que
+    aun no estan en refs y los registra en refs con su blank node.
+    """
+    objetos = []
+
     # ---------- Categorias ----------
-    categorias_nombres = sorted(
-        {t.get("category") for t in tickets_db if t.get("category")}
-    )
-    categoria_map = {}
-    cat_index = 1
     for nombre_cat in categorias_nombres:
-        cat_id = f"CAT-{cat_index:02d}"
+        if nombre_cat in refs["categoria"]:
+            continue
+        cat_index = len(refs["categoria"]) + 1
         uid = f"_:cat_{nombre_cat}"
-        categoria_map[nombre_cat] = uid
+        refs["categoria"][nombre_cat] = uid
         objetos.append(
             {
                 "uid": uid,
                 "dgraph.type": "Categoria",
-                "categoria_id": cat_id,
+                "categoria_id": f"CAT-{cat_index:02d}",
                 "nombre": nombre_cat,
                 "descripcion": f"Tickets de categoria {nombre_cat}",
             }
         )
-        cat_index += 1
 
     # ---------- Instalaciones ----------
-    instalaciones_vistas = {}
-    for t in tickets_db:
-        inst_id = t.get("installation_id")
-        nombre = t.get("place_name") or inst_id
-        if inst_id and inst_id not in instalaciones_vistas:
-            instalaciones_vistas[inst_id] = nombre
-
-    instal_map = {}
-    for inst_id, nombre in instalaciones_vistas.items():
+    for inst_id, nombre in instalaciones.items():
+        if inst_id in refs["instalacion"]:
+            continue
         uid = f"_:inst_{inst_id}"
-        instal_map[inst_id] = uid
+        refs["instalacion"][inst_id] = uid
         objetos.append(
             {
                 "uid": uid,
@@ -816,160 +1557,189 @@ def populate_dgraph():
             }
         )
 
+    # ---------- Palabras clave ----------
+    for w in palabras:
+        if w in refs["palabra"]:
+            continue
+        uid = f"_:pal_{w}"
+        refs["palabra"][w] = uid
+        objetos.append({"uid": uid, "dgraph.type": "PalabraClave", "palabra": w})
+
+    return objetos
+
+
+def _nodos_compartidos(categorias_nombres, instalaciones: dict, palabras) -> tuple:
+    """
+    Construye los nodos que comparten todos los tickets (agentes, periodos,
+    horarios, tipos, categorias, instalaciones y palabras clave).
+    Regresa (objetos, refs) como _nodos_fijos.
+    """
+    objetos, refs = _nodos_fijos()
+    objetos += _nodos_nuevos(refs, sorted(categorias_nombres), instalaciones, palabras)
+    return objetos, refs
+
+
+def _usuario_obj(u, uid: str) -> dict:
+    user_id = u.get("user_id")
+    return {
+        "uid": uid,
+        "dgraph.type": "Usuario",
+        "user_id": user_id,
+        "nombre": f"Usuario {user_id}",
+        "email": u.get("email", ""),
+        "rol": u.get("role", ""),
+        "expediente": str(u.get("expediente", "")),
+    }
+
+
+def _ticket_obj(t, refs: dict, palabras=None) -> dict:
+    """
+    Construye el nodo Ticket con sus aristas hacia los nodos de refs
+    (blank nodes o UIDs ya resueltos). `palabras` permite pasar las
+    palabras clave ya calculadas; si es None se calculan aqui.
+    """
+    ticket_id = t.get("ticket_id")
+    created_at = _fecha_simulada(ticket_id)
+    hour = created_at.hour
+
+    ticket_obj = {
+        "uid": f"_:t_{ticket_id}",
+        "dgraph.type": "Ticket",
+        "ticket_id": ticket_id,
+        "titulo": t.get("title", ""),
+        "descripcion": t.get("description", ""),
+        "estado": t.get("status", ""),
+        "prioridad": t.get("priority", ""),
+        "fecha_creacion": created_at.isoformat(),
+    }
+
+    # afecta -> Instalacion
+    inst_id = t.get("installation_id")
+    if inst_id and inst_id in refs["instalacion"]:
+        ticket_obj["afecta"] = {"uid": refs["instalacion"][inst_id]}
+
+    # categoria (string simple)
+    categoria_nombre = t.get("category")
+    if categoria_nombre:
+        ticket_obj["categoria"] = categoria_nombre
+
+    # pertenece_a_categoria
+    if categoria_nombre and categoria_nombre in refs["categoria"]:
+        ticket_obj["pertenece_a_categoria"] = {"uid": refs["categoria"][categoria_nombre]}
+
+    # tipo -> TipoProblema
+    if categoria_nombre == "instalaciones":
+        tipo_id = "TP-01"
+    elif categoria_nombre == "docentes":
+        tipo_id = "TP-02"
+    else:
+        tipo_id = "TP-03"
+    ticket_obj["tipo"] = {"uid": refs["tipo"][tipo_id]}
+
+    # asignado_a -> Agente
+    agente_map = refs["agente"]
+    agente_id = random.choice(list(agente_map.keys()))
+    ticket_obj["asignado_a"] = {"uid": agente_map[agente_id]}
+
+    # escalado_a -> Agente (algunos)
+    if random.random() < 0.4:
+        agentes_posibles = [aid for aid in agente_map.keys() if aid != agente_id]
+        if agentes_posibles:
+            agente_id_esc = random.choice(agentes_posibles)
+            ticket_obj["escalado_a"] = {"uid": agente_map[agente_id_esc]}
+
+    # ocurre_en -> PeriodoTemporal
+    periodo_uid = refs["periodo"].get(created_at.month)
+    if periodo_uid:
+        ticket_obj["ocurre_en"] = {"uid": periodo_uid}
+
+    # reporta_en -> Horario
+    turno = t.get("turno")
+    if not turno:
+        turno = "manana" if hour < 15 else "tarde_noche"
+    if turno not in refs["horario"]:
+        turno = "manana"
+    ticket_obj["reporta_en"] = {"uid": refs["horario"][turno]}
+
+    # contiene -> PalabraClave
+    if palabras is None:
+        palabras = palabras_clave(t.get("title", ""), t.get("description", ""))
+    contiene_uids = [
+        {"uid": refs["palabra"][w]} for w in palabras if w in refs["palabra"]
+    ]
+    if contiene_uids:
+        ticket_obj["contiene"] = contiene_uids
+
+    return ticket_obj
+
+
+def populate_dgraph(crudo: bool = False, procesos: int = 4):
+    """
+    Llena Dgraph usando los tickets que ya estan en Mongo
+    Crea nodos/relaciones segun el esquema RDF del doc.
+    Mongo se lee en streaming y proyectado (dos pasadas sobre tickets);
+    la mutacion sigue siendo una sola transaccion. Las palabras clave se
+    extraen una sola vez, en `procesos` procesos (extraer_palabras_clave).
+    """
+   
+    print("=== Populate Dgraph ===")
+
+    # Crear cliente de Dgraph
+    stub = create_client_stub()
+    client = create_client(stub)
+
+    op = pydgraph.Operation(schema=DGRAPH_SCHEMA)
+    client.alter(op)
+
+    # Primera pasada: solo los valores distintos para los nodos compartidos
+    categorias_nombres = set()
+    instalaciones_vistas = {}
+    palabras = {}
+    palabras_por_ticket = {}
+    proyeccion_compartidos = {
+        "_id": 0, "ticket_id": 1, "category": 1, "installation_id": 1,
+        "place_name": 1, "title": 1, "description": 1,
+    }
+    tickets = leer_mongo(tickets_db(), proyeccion=proyeccion_compartidos, crudo=crudo)
+    for lote, por_palabra in extraer_palabras_clave(_chunks(tickets, CHUNK_SIZE), procesos):
+        for t in lote:
+            if t.get("category"):
+                categorias_nombres.add(t.get("category"))
+
+            inst_id = t.get("installation_id")
+            nombre = t.get("place_name") or inst_id
+            if inst_id and inst_id not in instalaciones_vistas:
+                instalaciones_vistas[inst_id] = nombre
+
+        palabras.update(dict.fromkeys(por_palabra))
+        _palabras_por_ticket(por_palabra, palabras_por_ticket)
+
+    objetos, refs = _nodos_compartidos(categorias_nombres, instalaciones_vistas, palabras)
+
     # ---------- Usuarios ----------
     usuarios_map = {}
-    for u in usuarios_db:
+    for u in leer_mongo(db.users, proyeccion=PROYECCION_USUARIOS_DGRAPH, crudo=crudo):
         user_id = u.get("user_id")
         if not user_id:
             continue
 
-        uid = f"_:u_{user_id}"
-        expediente = str(u.get("expediente", ""))
-        rol = u.get("role", "")
-        email = u.get("email", "")
-
-        user_obj = {
-            "uid": uid,
-            "dgraph.type": "Usuario",
-            "user_id": user_id,
-            "nombre": f"Usuario {user_id}",
-            "email": email,
-            "rol": rol,
-            "expediente": expediente,
-            "creo": [],
-        }
-
+        user_obj = _usuario_obj(u, f"_:u_{user_id}")
+        user_obj["creo"] = []
         usuarios_map[user_id] = user_obj
         objetos.append(user_obj)
 
-    # ---------- Palabras clave ----------
-    palabra_map = {}
-
-    def normalizar_palabra(w: str) -> str:
-        return w.lower().strip(".,;:¡!¿?()[]{}\"'")
-
-    stopwords = {
-        "el", "la", "los", "las", "un", "una", "unos", "unas",
-        "de", "del", "en", "y", "o", "por", "para", "con", "al",
-        "se", "lo", "que", "es", "esta", "este", "son",
-    }
-
     # ---------- Tickets ----------
-    for t in tickets_db:
+    for t in leer_mongo(tickets_db(), proyeccion=PROYECCION_TICKETS_DGRAPH, crudo=crudo):
         ticket_id = t.get("ticket_id")
         if not ticket_id:
             continue
 
-        try:
-            num = int(ticket_id.split("-")[1])
-        except (IndexError, ValueError):
-            num = random.randint(3000, 4000)
-
-        mod = num % 3
-        if mod == 0:
-            month = 9
-        elif mod == 1:
-            month = 10
-        else:
-            month = 11
-
-        day = (num % 28) + 1
-        hour = 8 + (num % 10)
-        created_at = datetime(2025, month, day, hour, 0, 0)
-        fecha_str = created_at.isoformat()
-
-        ticket_uid = f"_:t_{ticket_id}"
-
-        ticket_obj = {
-            "uid": ticket_uid,
-            "dgraph.type": "Ticket",
-            "ticket_id": ticket_id,
-            "titulo": t.get("title", ""),
-            "descripcion": t.get("description", ""),
-            "estado": t.get("status", ""),
-            "prioridad": t.get("priority", ""),
-            "fecha_creacion": fecha_str,
-        }
-
-        # afecta -> Instalacion
-        inst_id = t.get("installation_id")
-        if inst_id and inst_id in instal_map:
-            ticket_obj["afecta"] = {"uid": instal_map[inst_id]}
-
-        # categoria (string simple)
-        categoria_nombre = t.get("category")
-        if categoria_nombre:
-            ticket_obj["categoria"] = categoria_nombre
-
-        # pertenece_a_categoria
-        if categoria_nombre and categoria_nombre in categoria_map:
-            ticket_obj["pertenece_a_categoria"] = {"uid": categoria_map[categoria_nombre]}
-
-        # tipo -> TipoProblema
-        if categoria_nombre == "instalaciones":
-            tipo_id = "TP-01"
-        elif categoria_nombre == "docentes":
-            tipo_id = "TP-02"
-        else:
-            tipo_id = "TP-03"
-        ticket_obj["tipo"] = {"uid": tipo_map[tipo_id]}
-
-        # asignado_a -> Agente
-        agente_id = random.choice(list(agente_map.keys()))
-        ticket_obj["asignado_a"] = {"uid": agente_map[agente_id]}
-
-        # escalado_a -> Agente (algunos)
-        if random.random() < 0.4:
-            agentes_posibles = [aid for aid in agente_map.keys() if aid != agente_id]
-            if agentes_posibles:
-                agente_id_esc = random.choice(agentes_posibles)
-                ticket_obj["escalado_a"] = {"uid": agente_map[agente_id_esc]}
-
-        # ocurre_en -> PeriodoTemporal
-        periodo_uid = periodo_map.get(month)
-        if periodo_uid:
-            ticket_obj["ocurre_en"] = {"uid": periodo_uid}
-
-        # reporta_en -> Horario
-        turno = t.get("turno")
-        if not turno:
-            turno = "manana" if hour < 15 else "tarde_noche"
-        if turno not in horario_map:
-            turno = "manana"
-        ticket_obj["reporta_en"] = {"uid": horario_map[turno]}
-
-        # contiene -> PalabraClave
-        palabras_ticket = []
-        texto = (t.get("title", "") + " " + t.get("description", "")).split()
-        for raw in texto:
-            w = normalizar_palabra(raw)
-            if not w or len(w) < 4 or w in stopwords:
-                continue
-            palabras_ticket.append(w)
-
-        palabras_ticket = list(dict.fromkeys(palabras_ticket))[:5]
-
-        contiene_uids = []
-        for w in palabras_ticket:
-            if w not in palabra_map:
-                p_uid = f"_:pal_{w}"
-                palabra_map[w] = p_uid
-                objetos.append(
-                    {
-                        "uid": p_uid,
-                        "dgraph.type": "PalabraClave",
-                        "palabra": w,
-                    }
-                )
-            contiene_uids.append({"uid": palabra_map[w]})
-
-        if contiene_uids:
-            ticket_obj["contiene"] = contiene_uids
+        ticket_obj = _ticket_obj(t, refs, palabras_por_ticket.get(ticket_id, []))
 
         # relacion creo: Usuario -> Ticket
         user_id = t.get("user_id")
         if user_id and user_id in usuarios_map:
-            usuarios_map[user_id].setdefault("creo", []).append({"uid": ticket_uid})
+            usuarios_map[user_id]["creo"].append({"uid": ticket_obj["uid"]})
 
         objetos.append(ticket_obj)
 
@@ -992,30 +1762,1090 @@ def populate_dgraph():
     print("Populate Dgraph: completado.")
 
 
-# ---------- MAIN GLOBAL ----------
+def _commit_dgraph(client, objetos: list, intentos: int = 3, borrar=None,
+                   espera: float = 0.05) -> dict:
+    """
+    Manda `objetos` en una transaccion propia y regresa el mapa
+    blank node -> UID. Si la transaccion aborta por conflicto reintenta
+    despues de `espera` segundos, el doble en cada intento y con un poco de
+    azar para que dos lotes que chocaron no vuelvan a chocar.
+    `borrar` son objetos JSON a eliminar en la misma mutacion (Dgraph
+    aplica el borrado antes de escribir).
+    """
+    for intento in range(1, intentos + 1):
+        txn = client.txn()
+        try:
+            mutation = pydgraph.Mutation()
+            mutation.set_json = json.dumps(objetos).encode("utf-8")
+            if borrar:
+                mutation.delete_json = json.dumps(borrar).encode("utf-8")
+            response = txn.mutate(mutation)
+            txn.commit()
+            return dict(response.uids)
+        except pydgraph.AbortedError:
+            if intento == intentos:
+                raise
+        finally:
+            txn.discard()
+        time.sleep(espera * 2 ** (intento - 1) * (1 + random.random()))
 
-def main():
-    print("=== Populate: Mongo + Cassandra + Dgraph ===")
 
-    generar_csv_simple(archivo=CSV_PATH, filas=100)
-    populate_mongo()
-    populate_cassandra()
-    populate_dgraph()
+def _resolver_refs(refs: dict, uids: dict) -> None:
+    """Reemplaza en refs cada blank node "_:x" por el UID asignado."""
+    for grupo in refs.values():
+        for llave, blank in grupo.items():
+            if blank.startswith("_:"):
+                grupo[llave] = uids[blank[2:]]
 
-    print("=== Populate completado ===")
 
+def _descartar_blanks(refs: dict) -> None:
+    """
+    Quita de refs los blank nodes sin resolver: si la transaccion que los
+    creaba fallo, esos nodos no existen y no deben usarse en otro lote.
+    """
+    for grupo in refs.values():
+        for llave in [k for k, v in grupo.items() if v.startswith("_:")]:
+            del grupo[llave]
 
-if __name__ == "__main__":
-    main()
+
+def _lote_tickets_dgraph(lote, refs: dict, por_palabra=None) -> list:
+    """
+    Objetos de un lote de tickets: los Ticket y las aristas creo de sus usuarios.
+    `por_palabra` (palabra -> [ticket_id], de extraer_palabras_clave) evita
+    volver a tokenizar.
+    """
+    palabras = _palabras_por_ticket(por_palabra) if por_palabra is not None else {}
+    objetos = []
+    creo = {}
+    for t in lote:
+        ticket_id = t.get("ticket_id")
+        if not ticket_id:
+            continue
+        ticket_obj = _ticket_obj(
+            t, refs, palabras.get(ticket_id, []) if por_palabra is not None else None
+        )
+        objetos.append(ticket_obj)
+
+        user_uid = refs["usuario"].get(t.get("user_id"))
+        if user_uid:
+            creo.setdefault(user_uid, []).append({"uid": ticket_obj["uid"]})
+
+    for user_uid, tickets in creo.items():
+        objetos.append({"uid": user_uid, "creo": tickets})
+    return objetos
+
+
+# Lotes en paralelo: mas intentos que el default por los choques en creo
+INTENTOS_LOTE_DGRAPH = 6
+
+
+def populate_dgraph_chunked(chunk_size: int = 500, workers: int = 4,
+                            crudo: bool = False, procesos: int = 4) -> dict:
+    """
+    Version por lotes de populate_dgraph.
+    1) Crea una sola vez los nodos compartidos (agentes, periodos, horarios,
+       tipos, categorias, instalaciones) y los usuarios, y guarda sus UIDs
+       resueltos.
+    2) Lee los tickets de Mongo en streaming, los tokeniza en `procesos`
+       procesos (extraer_palabras_clave), crea las palabras clave nuevas de
+       cada lote y manda el lote en su propia transaccion, con `workers`
+       commits en paralelo.
+    Lotes en paralelo con tickets del mismo usuario chocan en sus aristas
+    creo: el commit se reintenta con espera creciente (_commit_dgraph).
+    Un lote que falla no tira la carga completa: se cuenta en el resumen.
+    """
+    print("=== Populate Dgraph (por lotes) ===")
+
+    stub = create_client_stub()
+    client = create_client(stub)
+    resumen = {"tickets": 0, "lotes": 0, "lotes_con_error": 0, "tickets_con_error": 0}
+
+    try:
+        client.alter(pydgraph.Operation(schema=DGRAPH_SCHEMA))
+
+        # Valores distintos para los nodos compartidos, sin cargar los tickets
+        categorias_nombres = [c for c in tickets_db().distinct("category") if c]
+        instalaciones = {}
+        for doc in tickets_db().aggregate([
+            {"$group": {"_id": "$installation_id", "nombre": {"$first": "$place_name"}}},
+        ]):
+            if doc["_id"]:
+                instalaciones[doc["_id"]] = doc.get("nombre") or doc["_id"]
+
+        objetos, refs = _nodos_compartidos(categorias_nombres, instalaciones, ())
+        _resolver_refs(refs, _commit_dgraph(client, objetos))
+        print(f"Populate Dgraph: {len(objetos)} nodos compartidos creados.")
+
+        # ---------- Usuarios ----------
+        usuarios = leer_mongo(db.users, proyeccion=PROYECCION_USUARIOS_DGRAPH, crudo=crudo)
+        for lote in _chunks(usuarios, chunk_size):
+            blanks = {}
+            objetos = []
+            for u in lote:
+                user_id = u.get("user_id")
+                if not user_id:
+                    continue
+                blanks[user_id] = f"u_{user_id}"
+                objetos.append(_usuario_obj(u, f"_:u_{user_id}"))
+            uids = _commit_dgraph(client, objetos) if objetos else {}
+            for user_id, blank in blanks.items():
+                refs["usuario"][user_id] = uids[blank]
+
+        # ---------- Tickets ----------
+        def commit_lote(objetos, n):
+            try:
+                _commit_dgraph(client, objetos, intentos=INTENTOS_LOTE_DGRAPH)
+                return 0
+            except Exception as e:
+                print(f"Populate Dgraph: lote de {n} tickets fallo: {e}")
+                return n
+
+        def contar(hechos):
+            for f in hechos:
+                fallidos = f.result()
+                if fallidos:
+                    resumen["lotes_con_error"] += 1
+                    resumen["tickets_con_error"] += fallidos
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pendientes = set()
+            tickets = leer_mongo(tickets_db(), proyeccion=PROYECCION_TICKETS_DGRAPH, crudo=crudo)
+            for lote, por_palabra in extraer_palabras_clave(_chunks(tickets, chunk_size), procesos):
+                # Las palabras nuevas se crean aqui, en orden, antes de usarlas
+                nuevas = _nodos_nuevos(refs, (), {}, por_palabra)
+                if nuevas:
+                    _resolver_refs(refs, _commit_dgraph(client, nuevas))
+                objetos = _lote_tickets_dgraph(lote, refs, por_palabra)
+                # Los tickets sin ticket_id no se mandan
+                n = sum(1 for t in lote if t.get("ticket_id"))
+                pendientes.add(pool.submit(commit_lote, objetos, n))
+                resumen["tickets"] += n
+                resumen["lotes"] += 1
+
+                # Ventana acotada: no construimos lotes mas rapido de lo que se confirman
+                if len(pendientes) >= workers * 2:
+                    hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    contar(hechos)
+            contar(wait(pendientes).done)
+    finally:
+        close_client_stub(stub)
+
+    print(
+        f"Populate Dgraph: {resumen['tickets']} tickets en {resumen['lotes']} lotes "
+        f"({resumen['lotes_con_error']} lotes con error)."
+    )
+    return resumen
+
+
+# ---------- Export RDF para el bulk loader ----------
+
+EXPORT_DGRAPH_DIR = "data/dgraph_export"
+
+# Predicados datetime del esquema: en RDF llevan tipo explicito
+PREDICADOS_FECHA = {"fecha_creacion", "fecha_inicio", "fecha_fin"}
+
+
+def _nodo_rdf(uid: str) -> str:
+    """Blank node "_:x" -> _:x (solo caracteres validos); UID "0x.." -> <0x..>."""
+    if not uid.startswith("_:"):
+        return f"<{uid}>"
+    etiqueta = "".join(
+        c if c.isalnum() or c in "_-" else f"_{ord(c):x}_" for c in uid[2:]
+    )
+    return f"_:{etiqueta}"
+
+
+def _nquads(obj: dict):
+    """Convierte un objeto JSON de mutacion (como los de _ticket_obj) a lineas N-Quad."""
+    sujeto = _nodo_rdf(obj["uid"])
+    for predicado, valor in obj.items():
+        if predicado == "uid":
+            continue
+        valores = valor if isinstance(valor, list) else [valor]
+        for v in valores:
+            if isinstance(v, dict):
+                yield f"{sujeto} <{predicado}> {_nodo_rdf(v['uid'])} .\n"
+            elif predicado in PREDICADOS_FECHA:
+                yield f'{sujeto} <{predicado}> "{v}"^^<xs:dateTime> .\n'
+            else:
+                literal = json.dumps(v if isinstance(v, str) else str(v), ensure_ascii=False)
+                yield f"{sujeto} <{predicado}> {literal} .\n"
+
+
+def exportar_dgraph_rdf(
+    directorio: str = EXPORT_DGRAPH_DIR,
+    chunk_size: int = CHUNK_SIZE,
+    crudo: bool = False,
+    procesos: int = 4,
+) -> dict:
+    """
+    Escribe el mismo grafo que populate_dgraph como N-Quads comprimidos
+    (tickets.rdf.gz) mas su esquema (tickets.schema), para cargarlo con
+    `dgraph bulk -f tickets.rdf.gz -s tickets.schema`.
+    Los tickets se leen en streaming y cada lote se escribe en cuanto se
+    arma: en memoria solo quedan los nodos compartidos ya emitidos.
+    """
+    import gzip
+    import textwrap
+
+    print("=== Export Dgraph (RDF) ===")
+    os.makedirs(directorio, exist_ok=True)
+    ruta_rdf = os.path.join(directorio, "tickets.rdf.gz")
+    ruta_schema = os.path.join(directorio, "tickets.schema")
+
+    with open(ruta_schema, "w", encoding="utf-8") as fd:
+        fd.write(textwrap.dedent(DGRAPH_SCHEMA).strip() + "\n")
+
+    resumen = {"usuarios": 0, "tickets": 0, "nodos_compartidos": 0, "nquads": 0}
+
+    with gzip.open(ruta_rdf, "wt", encoding="utf-8", compresslevel=6) as out:
+
+        def escribir(objetos):
+            lineas = [linea for o in objetos for linea in _nquads(o)]
+            out.writelines(lineas)
+            resumen["nquads"] += len(lineas)
+
+        # Nodos fijos y categorias (pocas: se piden a Mongo ya distintas)
+        objetos, refs = _nodos_fijos()
+        categorias = sorted(c for c in tickets_db().distinct("category") if c)
+        objetos += _nodos_nuevos(refs, categorias, {}, ())
+        escribir(objetos)
+        resumen["nodos_compartidos"] += len(objetos)
+
+        # ---------- Usuarios ----------
+        usuarios = leer_mongo(db.users, proyeccion=PROYECCION_USUARIOS_DGRAPH, crudo=crudo)
+        for lote in _chunks(usuarios, chunk_size):
+            objetos = [_usuario_obj(u, f"_:u_{u['user_id']}") for u in lote if u.get("user_id")]
+            escribir(objetos)
+            resumen["usuarios"] += len(objetos)
+
+        # ---------- Tickets ----------
+        tickets = leer_mongo(tickets_db(), proyeccion=PROYECCION_TICKETS_DGRAPH, crudo=crudo)
+        for lote, por_palabra in extraer_palabras_clave(_chunks(tickets, chunk_size), procesos):
+            instalaciones = {}
+            for t in lote:
+                inst_id = t.get("installation_id")
+                if inst_id and inst_id not in instalaciones:
+                    instalaciones[inst_id] = t.get("place_name") or inst_id
+            objetos = _nodos_nuevos(refs, (), instalaciones, por_palabra)
+            resumen["nodos_compartidos"] += len(objetos)
+
+            # creo solo hacia usuarios que existen, como en populate_dgraph
+            existentes = _usuarios_por_id(
+                (t.get("user_id") for t in lote), {"_id": 0, "user_id": 1}, crudo
+            )
+            refs["usuario"] = {uid: f"_:u_{uid}" for uid in existentes}
+
+            objetos += _lote_tickets_dgraph(lote, refs, por_palabra)
+            escribir(objetos)
+            # Los tickets sin ticket_id no generan N-Quads
+            resumen["tickets"] += sum(1 for t in lote if t.get("ticket_id"))
+
+    print(
+        f"Export Dgraph: {resumen['nquads']} N-Quads ({resumen['usuarios']} usuarios, "
+        f"{resumen['tickets']} tickets) en {ruta_rdf}; esquema en {ruta_schema}"
+    )
+    return resumen
+
+
+# ---------- Pipeline de una sola pasada ----------
+
+# Marca de fin de datos en las colas de los sinks
+_FIN = object()
+
+
+def leer_registros(csv_file: str = CSV_PATH):
+    """
+    Lee el CSV una sola vez y produce registros canonicos (user_doc, ticket_doc)
+    con la misma forma que se guarda en Mongo.
+    """
+    with open(csv_file, newline="", encoding="utf-8") as fd:
+        for row in csv.DictReader(fd):
+            if not row.get("ticket_id") or not row.get("email"):
+                continue
+            yield _user_doc(row), _ticket_doc(row)
+
+
+# ---------- Lectura columnar (pyarrow) ----------
+
+
+def _batches_csv_arrow(ruta: str, block_size: int):
+    """
+    Lee un CSV (plano, .gz o .zst) en streaming como RecordBatches de Arrow.
+    Todas las columnas se leen como texto, igual que csv.DictReader.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    # compression="detect" usa la extension (.gz, .zst, ...)
+    stream = pa.input_stream(ruta, compression="detect")
+    reader = pacsv.open_csv(
+        stream,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            column_types={c: pa.string() for c in ENCABEZADOS_CSV},
+            strings_can_be_null=False,
+        ),
+    )
+    try:
+        for batch in reader:
+            yield batch
+    finally:
+        stream.close()
+
+
+def leer_lotes_csv(patron: str = CSV_PATH, block_size: int = 1 << 22, hilos: int = 4):
+    """
+    Fuente columnar: produce RecordBatches de todos los archivos que
+    coinciden con `patron` (glob). Hasta `hilos` archivos se leen y
+    descomprimen en paralelo por adelantado, pero los lotes salen en el
+    orden de los archivos, asi el orden de las filas es siempre el mismo
+    (lo necesita el checkpoint de la carga delta).
+    """
+    rutas = sorted(glob.glob(patron))
+    if not rutas:
+        raise FileNotFoundError(f"No hay archivos que coincidan con {patron}")
+
+    detener = threading.Event()
+
+    def poner(cola, item) -> bool:
+        # put con timeout para no quedarse bloqueado si el consumidor ya se fue
+        while not detener.is_set():
+            try:
+                cola.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def productor(ruta, cola):
+        try:
+            for batch in _batches_csv_arrow(ruta, block_size):
+                if not poner(cola, batch):
+                    return
+            poner(cola, _FIN)
+        except Exception as e:
+            poner(cola, e)
+
+    pendientes = iter(rutas)
+    colas = deque()
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        def lanzar():
+            ruta = next(pendientes, None)
+            if ruta is not None:
+                cola = queue.Queue(maxsize=2)
+                pool.submit(productor, ruta, cola)
+                colas.append(cola)
+
+        try:
+            for _ in range(hilos):
+                lanzar()
+            while colas:
+                cola = colas.popleft()
+                while True:
+                    item = cola.get()
+                    if item is _FIN:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                lanzar()
+        finally:
+            detener.set()
+
+
+def _por_valor(valores: list, funcion) -> list:
+    """funcion() sobre una columna, una vez por valor distinto (titulos y emails se repiten)."""
+    cache = {v: funcion(v) for v in set(valores)}
+    return [cache[v] for v in valores]
+
+
+def registros_de_batch(batch):
+    """
+    Convierte un RecordBatch en registros canonicos (user_doc, ticket_doc),
+    los mismos documentos que leer_registros pero armados desde las
+    columnas: las filas sin ticket_id o email se quitan con una mascara de
+    Arrow, title_norm y email_norm se calculan una vez por valor distinto y
+    cada documento se arma de un zip de columnas, sin dict intermedio por
+    fila. createdAt/created_at es el mismo para todo el lote.
+    """
+    import pyarrow.compute as pc
+
+    validas = pc.and_(
+        pc.not_equal(batch.column("ticket_id"), ""), pc.not_equal(batch.column("email"), "")
+    )
+    batch = batch.filter(validas)
+    if not batch.num_rows:
+        return
+    col = {c: batch.column(c).to_pylist() for c in ENCABEZADOS_CSV}
+    emails_norm = _por_valor(col["email"], normalizar_email)
+    titulos_norm = _por_valor(col["title"], normalizar_texto)
+    ahora = datetime.utcnow()
+
+    usuarios = zip(col["user_id"], col["expediente"], col["email"], emails_norm,
+                   col["password"], col["role"])
+    tickets = zip(col["ticket_id"], col["title"], titulos_norm, col["description"],
+                  col["category"], col["status"], col["priority"], col["user_id"],
+                  col["installation_id"], col["place_name"], col["object_name"],
+                  col["lost_status"], col["turno"])
+    # Mismos campos y orden que _user_doc y _ticket_doc
+    for (u_id, exp, email, email_norm, pwd, rol), t in zip(usuarios, tickets):
+        yield (
+            {
+                "user_id": u_id, "expediente": exp, "email": email,
+                "email_norm": email_norm, "password": pwd, "role": rol,
+                "createdAt": ahora,
+            },
+            {
+                "ticket_id": t[0], "title": t[1], "title_norm": t[2],
+                "description": t[3], "category": t[4], "status": t[5],
+                "priority": t[6], "user_id": t[7], "installation_id": t[8],
+                "place_name": t[9], "object_name": t[10], "lost_status": t[11],
+                "turno": t[12], "created_at": ahora,
+            },
+        )
+
+
+def leer_registros_columnar(patron: str = CSV_PATH, hilos: int = 4):
+    """Como leer_registros, pero sobre la fuente columnar (glob, .gz/.zst)."""
+    for batch in leer_lotes_csv(patron, hilos=hilos):
+        yield from registros_de_batch(batch)
+
+
+# ---------- Carga incremental (delta) ----------
+#
+# Cada sink guarda en Mongo su watermark:
+# - ingest_cargados: un documento por (sink, ticket_id) con el hash del
+#   registro cargado y el registro mismo (para deshacer lo anterior si cambia).
+# - ingest_checkpoints: un documento por sink con las filas de la fuente ya
+#   confirmadas; si una carga se interrumpe, la siguiente retoma desde ahi.
+# Solo las cargas delta la registran. Un sink sin checkpoint (nunca cargado
+# en delta, o despues de una carga completa) se recarga completo en su
+# primera carga delta.
+
+
+def _registro_delta(user_doc: dict, ticket_doc: dict) -> dict:
+    """
+    Campos del ticket (sin _id, created_at ni title_norm, que sale del titulo)
+    mas los del usuario que se denormalizan.
+    """
+    registro = {
+        k: v for k, v in ticket_doc.items() if k not in ("_id", "created_at", "title_norm")
+    }
+    registro["role"] = user_doc.get("role")
+    registro["email"] = user_doc.get("email")
+    return registro
+
+
+def _hash_registro(registro: dict) -> str:
+    data = json.dumps(registro, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def _filtrar_delta(sink: str, lote: list) -> tuple:
+    """
+    Separa del lote lo que el sink aun no tiene o cambio desde la ultima carga.
+    Regresa (lote_filtrado, previos, pendientes):
+    - previos: {ticket_id: registro anterior} de los tickets que cambiaron.
+    - pendientes: lo que hay que registrar en ingest_cargados al confirmar.
+    """
+    ids = [f"{sink}|{t['ticket_id']}" for _, t in lote]
+    cargados = {
+        d["_id"]: d
+        for d in db.ingest_cargados.find({"_id": {"$in": ids}}, {"hash": 1, "registro": 1})
+    }
+
+    filtrado, previos, pendientes = [], {}, []
+    for (user_doc, ticket_doc), _id in zip(lote, ids):
+        registro = _registro_delta(user_doc, ticket_doc)
+        h = _hash_registro(registro)
+        previo = cargados.get(_id)
+        if previo is not None:
+            if previo["hash"] == h:
+                continue
+            previos[ticket_doc["ticket_id"]] = previo["registro"]
+        filtrado.append((user_doc, ticket_doc))
+        pendientes.append(
+            UpdateOne(
+                {"_id": _id},
+                {"$set": {
+                    "sink": sink,
+                    "ticket_id": ticket_doc["ticket_id"],
+                    "hash": h,
+                    "registro": registro,
+                }},
+                upsert=True,
+            )
+        )
+    return filtrado, previos, pendientes
+
+
+def _checkpoint(sink: str, fuente: str, filas: int, en_curso: bool = True) -> None:
+    db.ingest_checkpoints.update_one(
+        {"_id": sink},
+        {"$set": {
+            "fuente": fuente,
+            "filas": filas,
+            "en_curso": en_curso,
+            "actualizado": datetime.utcnow(),
+        }},
+        upsert=True,
+    )
+
+
+def _fila_de_reanudacion(sinks, fuente: str) -> int:
+    """
+    Fila desde la que se puede retomar: la menor confirmada entre los sinks
+    si todos quedaron a medias sobre la misma fuente; si no, cero.
+    """
+    checkpoints = {
+        c["_id"]: c for c in db.ingest_checkpoints.find({"_id": {"$in": list(sinks)}})
+    }
+    filas = []
+    for sink in sinks:
+        c = checkpoints.get(sink)
+        if not c or not c.get("en_curso") or c.get("fuente") != fuente:
+            return 0
+        filas.append(c.get("filas", 0))
+    return min(filas)
+
+
+def _tiene_watermark(sink: str) -> bool:
+    """True si el sink ya tiene una carga delta registrada (su checkpoint existe)."""
+    return db.ingest_checkpoints.find_one({"_id": sink}, {"_id": 1}) is not None
+
+
+def reset_watermarks(sinks=("mongo", "cassandra", "dgraph")) -> None:
+    """Olvida lo cargado por los sinks (la siguiente carga delta sera completa)."""
+    db.ingest_cargados.delete_many({"sink": {"$in": list(sinks)}})
+    db.ingest_checkpoints.delete_many({"_id": {"$in": list(sinks)}})
+
+
+# ---------- Sinks ----------
+
+
+def _upsert_tickets(tickets, docs, resumen, rollups=None, previos=None, ts=None) -> None:
+    """
+    Upsert por ticket_id (modo delta): crea los nuevos y actualiza los que
+    cambiaron. En ticket_rollups suma los nuevos y, para los que cambiaron,
+    resta su version anterior (`previos`, ticket_id -> registro). Solo los
+    creados se registran en tickets_ts; sin confirmacion (w=0) no hay
+    upserted_ids y se toman como creados los que no tienen version anterior.
+    """
+    if not docs:
+        return
+    ops = []
+    for d in docs:
+        campos = {k: v for k, v in d.items() if k != "created_at"}
+        ops.append(
+            UpdateOne(
+                codificar_consulta({"ticket_id": d["ticket_id"]}),
+                codificar_actualizacion(
+                    {"$set": campos, "$setOnInsert": {"created_at": d["created_at"]}}
+                ),
+                upsert=True,
+            )
+        )
+    result = tickets.bulk_write(ops, ordered=False)
+    if result.acknowledged:
+        resumen["insertados"] += result.upserted_count
+        resumen["actualizados"] += result.modified_count
+        creados = set(result.upserted_ids)
+    else:
+        resumen["tickets_sin_confirmar"] += len(ops)
+        creados = None
+
+    previos = previos or {}
+    if ts is not None:
+        registrar_eventos(ts, [
+            d for i, d in enumerate(docs)
+            if (i in creados if creados is not None else d["ticket_id"] not in previos)
+        ])
+    if rollups is None:
+        return
+    nuevos = []
+    anteriores = []
+    for i, d in enumerate(docs):
+        previo = previos.get(d["ticket_id"])
+        if creados is not None and i in creados:
+            nuevos.append(d)
+        elif previo is not None:
+            # Cambio: sale de sus grupos anteriores y entra a los nuevos
+            nuevos.append(d)
+            anteriores.append(previo)
+        elif creados is None:
+            nuevos.append(d)
+    aplicar_deltas(rollups, nuevos, anteriores)
+
+
+def _sink_mongo(delta: bool = False, write_concern: str = "normal"):
+    """
+    Sink de Mongo: upsert de usuarios nuevos + insert_many de tickets por lote.
+    En modo delta sin watermark los tickets que cambiaron no traen su version
+    anterior para restarla de ticket_rollups: los conteos se recalculan al
+    final.
+    """
+    ensure_mongo_indexes()
+    recalcular_rollups = delta and not _tiene_watermark("mongo")
+    wc = WRITE_CONCERN_PERFILES[write_concern]
+    users = db.users.with_options(write_concern=wc)
+    tickets = tickets_db().with_options(write_concern=wc)
+    rollups = db.ticket_rollups.with_options(write_concern=wc)
+    ts = db.tickets_ts.with_options(write_concern=wc)
+
+    resumen = {
+        "insertados": 0,
+        "actualizados": 0,
+        "duplicados": 0,
+        "tickets_sin_confirmar": 0,
+        "usuarios_nuevos": 0,
+        "usuarios_existentes": 0,
+        "usuarios_sin_confirmar": 0,
+    }
+    emails_vistos = set()
+
+    def procesar(lote, previos):
+        nuevos = []
+        for user_doc, _ in lote:
+            if user_doc["email"] not in emails_vistos:
+                emails_vistos.add(user_doc["email"])
+                nuevos.append(dict(user_doc))
+        _bulk_upsert_usuarios(users, nuevos, resumen)
+        # Copias: insert_many agrega _id a los documentos y el lote es compartido
+        docs = [dict(t) for _, t in lote]
+        if delta:
+            _upsert_tickets(tickets, docs, resumen, rollups, previos, ts)
+        else:
+            _insert_many_tickets(tickets, docs, resumen, rollups, ts)
+
+    def cerrar():
+        if recalcular_rollups:
+            reconstruir_rollups(db)
+
+    return procesar, cerrar, resumen
+
+
+def _sink_cassandra(delta: bool = False, concurrency: int = 64, batch_size: int = 20):
+    """
+    Sink de Cassandra: mismas escrituras que populate_cassandra_async.
+    En modo delta no trunca; para los tickets que cambiaron borra las filas
+    anteriores cuya llave ya no coincide y revierte sus contadores. Los que
+    cambiaron de estado se mueven de cubeta (sentencias_cambio_ticket).
+    Sin watermark no se sabe que contadores ya se sumaron: trunca y recarga.
+    """
+    from Cassandra import model as cass_model
+
+    session = get_cassandra_session()
+    stmts = _preparar_carga_cassandra(
+        session, truncar=not delta or not _tiene_watermark("cassandra")
+    )
+    stmts_delta = {
+        tabla: session.prepare(cql) for tabla, cql in CQL_CONTADOR_DELTA.items()
+    }
+    stmts_antiguedad = cass_model.preparar_antiguedad(session)
+    stmts_borrar = {
+        tabla: session.prepare(
+            f"DELETE FROM {tabla} WHERE " + " AND ".join(f"{c} = ?" for c in columnas)
+        )
+        for tabla, columnas in CLAVE_PRIMARIA_CASSANDRA.items()
+    }
+    now = datetime.utcnow()
+    resumen = {"escritas": {}, "errores": {}, "primer_error": {}, "updates_contadores": 0}
+
+    def procesar(lote, previos):
+        errores_previos = sum(resumen["errores"].values())
+        usuarios = {u["user_id"]: u for u, _ in lote}
+        sentencias = []
+        borrar = []
+        # ticket_id -> ultimo estado del lote (un solo movimiento por ticket)
+        cambios_estado = {}
+        deltas = {}
+        for _, ticket in lote:
+            previo = previos.get(ticket["ticket_id"])
+            nuevas = _sentencias_ticket(ticket, usuarios, now)
+            for tabla, params in nuevas:
+                if tabla in CQL_CONTADOR_DELTA:
+                    llave = (tabla, params)
+                    deltas[llave] = deltas.get(llave, 0) + 1
+                elif previo is None or tabla not in TABLAS_ANTIGUEDAD:
+                    sentencias.append((tabla, params))
+
+            if previo is None:
+                continue
+            # Un cambio de estado lo mueve a la cubeta de hoy (o lo saca si se cerro)
+            if previo["status"] != ticket["status"]:
+                cambios_estado[ticket["ticket_id"]] = ticket["status"]
+            usuario_previo = {previo["user_id"]: {"role": previo["role"], "email": previo["email"]}}
+            llaves_nuevas = {
+                (tabla, params[:len(CLAVE_PRIMARIA_CASSANDRA[tabla])])
+                for tabla, params in nuevas
+                if tabla in CLAVE_PRIMARIA_CASSANDRA
+            }
+            for tabla, params in _sentencias_ticket(previo, usuario_previo, now):
+                if tabla in TABLAS_ANTIGUEDAD:
+                    continue
+                if tabla in CQL_CONTADOR_DELTA:
+                    llave = (tabla, params)
+                    deltas[llave] = deltas.get(llave, 0) - 1
+                    continue
+                llave = (tabla, params[:len(CLAVE_PRIMARIA_CASSANDRA[tabla])])
+                if llave not in llaves_nuevas:
+                    borrar.append(llave)
+
+        # Los borrados van antes para no competir con las nuevas escrituras
+        if borrar:
+            _ejecutar_trabajos(
+                session,
+                [(tabla, 1, stmts_borrar[tabla], llave) for tabla, llave in borrar],
+                concurrency,
+                resumen,
+            )
+        trabajos = _agrupar_por_particion(stmts, sentencias, batch_size)
+        contadores = _trabajos_contadores(stmts_delta, deltas)
+
+        # Cambios de estado: se leen juntas las cubetas anteriores y los
+        # movimientos van con las demas escrituras del lote
+        ids = list(cambios_estado)
+        anteriores = _leer_concurrente(
+            session, stmts_antiguedad["leer"], [(t,) for t in ids], concurrency
+        ) if ids else []
+        antiguedad = [
+            (tabla, 1, stmts_antiguedad[nombre], params)
+            for ticket_id, previo in zip(ids, anteriores)
+            for tabla, nombre, params in cass_model.sentencias_cambio_ticket(
+                ticket_id, cambios_estado[ticket_id], now, previo
+            )
+        ]
+
+        _ejecutar_trabajos(session, trabajos + contadores + antiguedad, concurrency, resumen)
+        resumen["updates_contadores"] += len(contadores)
+
+        # Si algo fallo el lote no se confirma: sin watermark ni checkpoint,
+        # la siguiente corrida delta lo vuelve a mandar
+        fallidas = sum(resumen["errores"].values()) - errores_previos
+        if fallidas:
+            raise RuntimeError(f"{fallidas} escrituras de Cassandra fallaron")
+
+    return procesar, lambda: None, resumen
+
+
+def _refs_existentes_dgraph(client) -> dict:
+    """UIDs de los nodos compartidos y usuarios que ya existen en Dgraph."""
+    query = """
+    {
+      agente(func: type(Agente)) { uid agente_id }
+      periodo(func: type(PeriodoTemporal)) { uid periodo_id }
+      horario(func: type(Horario)) { uid horario_id }
+      tipo(func: type(TipoProblema)) { uid tipo_id }
+      categoria(func: type(Categoria)) { uid nombre }
+      instalacion(func: type(Instalacion)) { uid instal_id }
+      palabra(func: type(PalabraClave)) { uid palabra }
+      usuario(func: type(Usuario)) { uid user_id }
+    }
+    """
+    txn = client.txn(read_only=True)
+    try:
+        data = json.loads(txn.query(query).json)
+    finally:
+        txn.discard()
+
+    mes_por_periodo = {p["periodo_id"]: mes for mes, p in PERIODOS_DGRAPH.items()}
+    clave_por_horario = {h["horario_id"]: k for k, h in HORARIOS_DGRAPH.items()}
+    campos = {
+        "agente": ("agente_id", lambda v: v),
+        "periodo": ("periodo_id", mes_por_periodo.get),
+        "horario": ("horario_id", clave_por_horario.get),
+        "tipo": ("tipo_id", lambda v: v),
+        "categoria": ("nombre", lambda v: v),
+        "instalacion": ("instal_id", lambda v: v),
+        "palabra": ("palabra", lambda v: v),
+        "usuario": ("user_id", lambda v: v),
+    }
+    refs = {}
+    for grupo, (campo, llave_de) in campos.items():
+        refs[grupo] = {}
+        for nodo in data.get(grupo, []):
+            llave = llave_de(nodo.get(campo))
+            if llave is not None:
+                refs[grupo][llave] = nodo["uid"]
+    return refs
+
+
+def _uids_tickets_dgraph(client, ticket_ids) -> dict:
+    """ticket_id -> (uid, uid del usuario que lo creo o None) de los tickets que ya existen."""
+    if not ticket_ids:
+        return {}
+    query = """
+    query tickets($ids: string) {
+      t(func: eq(ticket_id, $ids)) { uid ticket_id ~creo { uid } }
+    }
+    """
+    txn = client.txn(read_only=True)
+    try:
+        res = txn.query(query, variables={"$ids": json.dumps(list(ticket_ids))})
+        data = json.loads(res.json)
+    finally:
+        txn.discard()
+    return {
+        t["ticket_id"]: (t["uid"], (t.get("~creo") or [{}])[0].get("uid"))
+        for t in data.get("t", [])
+    }
+
+
+def _sink_dgraph(delta: bool = False):
+    """
+    Sink de Dgraph: crea los nodos fijos al inicio y, por cada lote, primero
+    los usuarios/categorias/instalaciones/palabras que aun no existen y luego
+    los tickets con los UIDs ya resueltos.
+    En modo delta reutiliza los nodos existentes y actualiza en su lugar los
+    tickets que cambiaron.
+    """
+    stub = create_client_stub()
+    client = create_client(stub)
+    client.alter(pydgraph.Operation(schema=DGRAPH_SCHEMA))
+
+    objetos, refs = _nodos_fijos()
+    if delta:
+        existentes = _refs_existentes_dgraph(client)
+        for grupo, nodos in existentes.items():
+            refs[grupo].update(nodos)
+        pendientes = {v for grupo in refs.values() for v in grupo.values()}
+        objetos = [o for o in objetos if o["uid"] in pendientes]
+    if objetos:
+        _resolver_refs(refs, _commit_dgraph(client, objetos))
+    resumen = {"nodos_creados": len(objetos), "tickets_actualizados": 0}
+
+    def procesar(lote, previos):
+        tickets = [t for _, t in lote]
+        instalaciones = {}
+        por_palabra = _tokenizar_lote(tickets)
+        for t in tickets:
+            inst_id = t.get("installation_id")
+            if inst_id and inst_id not in instalaciones:
+                instalaciones[inst_id] = t.get("place_name") or inst_id
+        categorias = dict.fromkeys(t["category"] for t in tickets if t.get("category"))
+
+        nuevos = _nodos_nuevos(refs, categorias, instalaciones, por_palabra)
+        for u, _ in lote:
+            if u["user_id"] not in refs["usuario"]:
+                refs["usuario"][u["user_id"]] = f"_:u_{u['user_id']}"
+                nuevos.append(_usuario_obj(u, refs["usuario"][u["user_id"]]))
+        if nuevos:
+            try:
+                uids = _commit_dgraph(client, nuevos)
+            except Exception:
+                _descartar_blanks(refs)
+                raise
+            _resolver_refs(refs, uids)
+            resumen["nodos_creados"] += len(nuevos)
+
+        # Tickets que ya existen (cambiaron o se cargaron sin watermark):
+        # se reescriben sobre su nodo existente
+        uids = _uids_tickets_dgraph(client, [t["ticket_id"] for t in tickets]) if delta else {}
+        objetos = _lote_tickets_dgraph(
+            [t for t in tickets if t["ticket_id"] not in uids], refs, por_palabra
+        )
+        palabras = _palabras_por_ticket(por_palabra)
+        borrar = []
+        for t in tickets:
+            if t["ticket_id"] not in uids:
+                continue
+            # El creador anterior sale del grafo (~creo), haya watermark o no
+            uid, anterior = uids[t["ticket_id"]]
+            ticket_obj = _ticket_obj(t, refs, palabras.get(t["ticket_id"], []))
+            ticket_obj["uid"] = uid
+            objetos.append(ticket_obj)
+            # contiene y escalado_a se recalculan: quitamos los anteriores
+            borrar.append({"uid": uid, "contiene": None, "escalado_a": None})
+
+            actual = refs["usuario"].get(t.get("user_id"))
+            if anterior != actual:
+                if anterior:
+                    borrar.append({"uid": anterior, "creo": [{"uid": uid}]})
+                if actual:
+                    objetos.append({"uid": actual, "creo": [{"uid": uid}]})
+            resumen["tickets_actualizados"] += 1
+
+        _commit_dgraph(client, objetos, borrar=borrar)
+
+    return procesar, lambda: close_client_stub(stub), resumen
+
+
+SINKS_PIPELINE = {
+    "mongo": _sink_mongo,
+    "cassandra": _sink_cassandra,
+    "dgraph": _sink_dgraph,
+}
+
+
+def _worker_sink(nombre, cola, procesar, cerrar, resumen, delta, fuente, inicio) -> None:
+    """
+    Consume lotes de la cola hasta _FIN; un lote con error no detiene al sink.
+    En modo delta, despues de cada lote confirmado registra la watermark y
+    el checkpoint; el checkpoint solo avanza mientras no haya lotes
+    fallidos, asi una carga interrumpida se retoma desde el ultimo lote
+    confirmado. La carga completa no registra nada.
+    """
+    filas = inicio
+    continuo = True
+    try:
+        while True:
+            lote = cola.get()
+            if lote is _FIN:
+                break
+            try:
+                if delta:
+                    filtrado, previos, pendientes = _filtrar_delta(nombre, lote)
+                else:
+                    filtrado, previos, pendientes = lote, {}, []
+                if filtrado:
+                    procesar(filtrado, previos)
+                if pendientes:
+                    db.ingest_cargados.bulk_write(pendientes, ordered=False)
+                resumen["tickets"] += len(filtrado)
+                resumen["sin_cambios"] += len(lote) - len(filtrado)
+            except Exception as e:
+                print(f"Pipeline [{nombre}]: lote de {len(lote)} tickets fallo: {e}")
+                resumen["lotes_con_error"] += 1
+                resumen["tickets_con_error"] += len(lote)
+                continuo = False
+                continue
+
+            if delta and continuo:
+                filas += len(lote)
+                continuo = _guardar_checkpoint(nombre, fuente, filas)
+
+        if delta and continuo:
+            # Carga completa: la siguiente corrida empieza desde el principio
+            _guardar_checkpoint(nombre, fuente, 0, en_curso=False)
+    finally:
+        cerrar()
+
+
+def _guardar_checkpoint(nombre, fuente, filas, en_curso: bool = True) -> bool:
+    """
+    _checkpoint sin tirar el hilo del sink: si Mongo falla se avisa y el sink
+    sigue vaciando su cola (el lector no se queda bloqueado). Regresa False
+    si no se pudo guardar; desde ahi el checkpoint ya no avanza.
+    """
+    try:
+        _checkpoint(nombre, fuente, filas, en_curso)
+        return True
+    except Exception as e:
+        print(f"Pipeline [{nombre}]: no se pudo guardar el checkpoint: {e}")
+        return False
+
+
+def _poner_en_sink(cola, hilo, item) -> bool:
+    """put a la cola de un sink; False si su hilo ya termino (nadie la vacia)."""
+    while True:
+        try:
+            cola.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            if not hilo.is_alive():
+                return False
+
+
+def populate_pipeline(
+    csv_file: str = CSV_PATH,
+    chunk_size: int = CHUNK_SIZE,
+    max_lotes_en_cola: int = 4,
+    sinks=("mongo", "cassandra", "dgraph"),
+    delta: bool = False,
+    columnar: bool = False,
+) -> dict:
+    """
+    Populate en una sola pasada: lee el CSV una vez y reparte cada lote de
+    registros a los sinks (Mongo, Cassandra, Dgraph), cada uno en su hilo.
+    Las colas estan acotadas a max_lotes_en_cola lotes: si un sink se atrasa
+    el lector se detiene (backpressure) en vez de acumular todo en memoria.
+    El tiempo total queda cerca del sink mas lento y no se relee Mongo.
+
+    Con delta=True no se trunca ni se recrea nada: cada sink solo carga los
+    tickets nuevos o que cambiaron segun su watermark, y si la corrida
+    anterior quedo a medias se retoma desde el ultimo lote confirmado. Un
+    sink sin watermark se recarga completo (ver _tiene_watermark).
+
+    Con columnar=True la fuente se lee con pyarrow: csv_file puede ser un
+    glob de varios archivos y cada uno puede venir comprimido (.gz, .zst).
+    Los documentos se arman desde las columnas de cada lote (ver
+    registros_de_batch).
+    Regresa el resumen de cada sink.
+    """
+    print("=== Populate pipeline: " + " + ".join(sinks) + (" (delta)" if delta else "") + " ===")
+
+    inicio = 0
+    if delta:
+        # Sin checkpoint, lo que haya en ingest_cargados es de una carga que
+        # fallo antes de confirmar nada: el sink se recarga completo
+        for nombre in sinks:
+            if not _tiene_watermark(nombre):
+                reset_watermarks((nombre,))
+        inicio = _fila_de_reanudacion(sinks, csv_file)
+        if inicio:
+            print(f"Pipeline: retomando desde la fila {inicio}")
+    else:
+        # Carga completa: la watermark anterior ya no describe lo cargado
+        reset_watermarks(sinks)
+
+    resumenes = {}
+    hilos = []
+    colas = []
+    try:
+        for nombre in sinks:
+            procesar, cerrar, resumen = SINKS_PIPELINE[nombre](delta=delta)
+            resumen.update({
+                "tickets": 0,
+                "sin_cambios": 0,
+                "lotes_con_error": 0,
+                "tickets_con_error": 0,
+            })
+            resumenes[nombre] = resumen
+
+            cola = queue.Queue(maxsize=max_lotes_en_cola)
+            hilo = threading.Thread(
+                target=_worker_sink,
+                args=(nombre, cola, procesar, cerrar, resumen, delta, csv_file, inicio),
+                name=f"sink-{nombre}",
+                daemon=True,
+            )
+            hilo.start()
+            colas.append(cola)
+            hilos.append(hilo)
+
+        lector = leer_registros_columnar if columnar else leer_registros
+        registros = islice(lector(csv_file), inicio, None)
+        for lote in _chunks(registros, chunk_size):
+            for cola, hilo in zip(colas, hilos):
+                if not _poner_en_sink(cola, hilo, lote):
+                    raise RuntimeError(f"El {hilo.name} termino antes de tiempo")
+    finally:
+        for cola, hilo in zip(colas, hilos):
+            _poner_en_sink(cola, hilo, _FIN)
+        for hilo in hilos:
+            hilo.join()
+
+    for nombre, resumen in resumenes.items():
+        print(
+            f"Pipeline [{nombre}]: {resumen['tickets']} tickets cargados, "
+            f"{resumen['sin_cambios']} sin cambios "
+            f"({resumen['tickets_con_error']} con error)"
+        )
+        for tabla, n in sorted(resumen.get("errores", {}).items()):
+            print(f"- {tabla}: {n} escrituras con error ({resumen['primer_error'][tabla]})")
+    return resumenes
+
+
+# ---------- MAIN GLOBAL ----------
 
 def main():
     print("=== Populate: Mongo + Cassandra + Dgraph ===")
 
     generar_csv_simple(archivo=CSV_PATH, filas=100)
+    populate_pipeline()
 
-    populate_mongo()
-    populate_cassandra()
-    populate_dgraph() 
     print("=== Populate completado ===")
 
 
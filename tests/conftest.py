@@ -0,0 +1,11 @@
+"""
+Pruebas de las funciones puras (sin Mongo, Cassandra ni Dgraph reales).
+
+    python -m pytest -q
+
+Las que necesitan una base de Mongo usan mongomock y se saltan si no esta.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+from cassandra.query import BatchStatement
+
+import populate
+from Cassandra.model import DIAS_POR_CUBETA, cubeta_antiguedad, dias_en_rango
+
+# BatchStatement.add formatea los statements de texto: un %s por parametro
+STMTS = {
+    tabla: f"INSERT INTO {tabla} VALUES ({', '.join(['%s'] * n)})"
+    for tabla, n in (
+        ("tickets_por_estado", 3), ("tickets_por_usuario_dia", 4),
+        ("cubetas_antiguedad", 2), ("historial_ticket", 2),
+    )
+}
+
+
+def test_agrupa_por_llave_de_particion():
+    sentencias = [("tickets_por_estado", ("abierto", i, f"TK-{i}")) for i in range(5)]
+    sentencias.append(("tickets_por_estado", ("cerrado", 0, "TK-9")))
+    trabajos = populate._agrupar_por_particion(STMTS, sentencias, batch_size=2)
+
+    filas = sorted((t[0], t[1]) for t in trabajos)
+    assert filas == [("tickets_por_estado", 1)] * 2 + [("tickets_por_estado", 2)] * 2
+    for tabla, n, stmt, params in trabajos:
+        if n > 1:
+            assert isinstance(stmt, BatchStatement) and params is None
+        else:
+            assert stmt == STMTS[tabla]
+
+
+def test_llave_compuesta_separa_particiones():
+    sentencias = [
+        ("tickets_por_usuario_dia", ("U1", date(2025, 3, 1), 9, "TK-1")),
+        ("tickets_por_usuario_dia", ("U1", date(2025, 3, 2), 9, "TK-2")),
+    ]
+    trabajos = populate._agrupar_por_particion(STMTS, sentencias, batch_size=20)
+    assert [t[1] for t in trabajos] == [1, 1]
+
+
+def test_una_vez_por_lote_y_sin_particion():
+    sentencias = [("cubetas_antiguedad", (0, date(2025, 3, 1)))] * 3
+    sentencias.append(("historial_ticket", ("TK-1", datetime(2025, 3, 1))))
+    trabajos = populate._agrupar_por_particion(STMTS, sentencias, batch_size=20)
+    assert sorted(t[0] for t in trabajos) == ["cubetas_antiguedad", "historial_ticket"]
+
+
+def test_cubeta_antiguedad():
+    dia = date(2025, 3, 5)
+    cubeta = cubeta_antiguedad(dia)
+    assert cubeta <= dia and (dia - cubeta).days < DIAS_POR_CUBETA
+    assert cubeta.toordinal() % DIAS_POR_CUBETA == 0
+    assert cubeta_antiguedad(datetime(2025, 3, 5, 23, 59)) == cubeta
+    assert cubeta_antiguedad(cubeta) == cubeta
+    assert cubeta_antiguedad(date.fromordinal(cubeta.toordinal() + DIAS_POR_CUBETA)) != cubeta
+
+
+def test_dias_en_rango():
+    assert dias_en_rango(date(2025, 2, 27), date(2025, 3, 2)) == [
+        date(2025, 2, 27), date(2025, 2, 28), date(2025, 3, 1), date(2025, 3, 2),
+    ]
+    assert dias_en_rango(date(2025, 3, 1), date(2025, 3, 1)) == [date(2025, 3, 1)]
+    assert dias_en_rango(date(2025, 3, 2), date(2025, 3, 1)) == []
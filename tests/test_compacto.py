@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pytest
+
+from Mongo.compacto import (
+    TicketCrudo, codificar_consulta, codificar_doc, codificar_orden, decodificar,
+)
+
+TICKET = {
+    "ticket_id": "TK-1",
+    "title": "Daño en pantalla",
+    "title_norm": "dano en pantalla",
+    "description": "no prende",
+    "category": "cosas_perdidas",
+    "status": "en_proceso",
+    "priority": "alta",
+    "user_id": "U001",
+    "installation_id": "biblioteca",
+    "place_name": "Biblioteca",
+    "object_name": "USB",
+    "lost_status": "activo",
+    "turno": "tarde_noche",
+    "created_at": datetime(2025, 3, 1, 10, 30),
+}
+
+
+def test_doc_ida_y_vuelta():
+    guardado = codificar_doc(TICKET)
+    assert guardado["tid"] == "TK-1"
+    assert guardado["c"] == 3 and guardado["s"] == 2 and guardado["tu"] == 2
+    assert decodificar(guardado) == TICKET
+
+
+def test_doc_sin_campos_vacios():
+    ticket = dict(TICKET, category="docentes", object_name="", lost_status=None)
+    guardado = codificar_doc(ticket)
+    assert "o" not in guardado and "ls" not in guardado
+    assert "object_name" not in decodificar(guardado)
+
+
+def test_filtro_codifica_enums_y_operadores():
+    filtro = {"category": {"$in": ["docentes", "cosas_perdidas"]}, "status": {"$ne": "cerrado"}}
+    assert codificar_consulta(filtro) == {"c": {"$in": [2, 3]}, "s": {"$ne": 3}}
+
+
+def test_filtro_deja_literales_con_pesos():
+    filtro = {
+        "title": "$100",
+        "description": {"$regex": "^$"},
+        "place_name": {"$in": ["$x", "Biblioteca"]},
+    }
+    assert codificar_consulta(filtro) == {
+        "ti": "$100",
+        "de": {"$regex": "^$"},
+        "pl": {"$in": ["$x", "Biblioteca"]},
+    }
+
+
+def test_pipeline_traduce_referencias():
+    pipeline = [
+        {"$match": {"title": "$100", "$expr": {"$eq": ["$status", "$priority"]}}},
+        {"$group": {"_id": {"category": "$category"}, "total": {"$sum": 1}}},
+        {"$project": {"etiqueta": {"$literal": "$category"}}},
+        {"$facet": {"abiertos": [{"$match": {"status": "abierto"}}]}},
+    ]
+    assert codificar_consulta(pipeline) == [
+        {"$match": {"ti": "$100", "$expr": {"$eq": ["$s", "$p"]}}},
+        {"$group": {"_id": {"c": "$c"}, "total": {"$sum": 1}}},
+        {"$project": {"etiqueta": {"$literal": "$category"}}},
+        {"$facet": {"abiertos": [{"$match": {"s": 1}}]}},
+    ]
+
+
+def test_variables_de_pipeline_no_se_tocan():
+    assert codificar_consulta([{"$project": {"x": "$$ROOT"}}]) == [{"$project": {"x": "$$ROOT"}}]
+
+
+def test_nombres_cortos_no_se_aceptan():
+    with pytest.raises(ValueError):
+        codificar_consulta({"c": 1})
+    with pytest.raises(ValueError):
+        codificar_consulta([{"$group": {"_id": None, "s": {"$sum": 1}}}])
+
+
+def test_orden():
+    assert codificar_orden([("created_at", -1), ("ticket_id", -1)]) == [("ca", -1), ("tid", -1)]
+    assert codificar_orden("title_norm") == "tn"
+
+
+def test_ticket_crudo_lee_nombres_largos():
+    bson = pytest.importorskip("bson")
+    from bson.codec_options import CodecOptions
+    from bson.raw_bson import RawBSONDocument
+
+    crudo = bson.decode(
+        bson.encode(codificar_doc(TICKET)), CodecOptions(document_class=RawBSONDocument)
+    )
+    ticket = TicketCrudo(crudo)
+    assert ticket["category"] == "cosas_perdidas"
+    assert ticket.get("turno") == "tarde_noche"
+    assert ticket.get("no_existe") is None
+    assert dict(ticket) == TICKET
@@ -0,0 +1,64 @@
+import pytest
+
+import populate
+
+mongomock = pytest.importorskip("mongomock")
+
+FILA = {
+    "user_id": "U001", "expediente": "770503", "email": "user1@iteso.mx",
+    "password": "x", "role": "alumno", "ticket_id": "TK-1", "title": "Daño en pantalla",
+    "description": "no prende", "category": "instalaciones", "status": "abierto",
+    "priority": "alta", "installation_id": "biblioteca", "place_name": "Biblioteca",
+    "object_name": "", "lost_status": "", "turno": "manana",
+}
+
+
+def _registro(**cambios):
+    fila = dict(FILA, **cambios)
+    return populate._user_doc(fila), populate._ticket_doc(fila)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    base = mongomock.MongoClient().Soporte
+    monkeypatch.setattr(populate, "db", base)
+    return base
+
+
+def _confirmar(db, pendientes):
+    db.ingest_cargados.bulk_write(pendientes, ordered=False)
+
+
+def test_primera_carga_pasa_todo(db):
+    lote = [_registro(), _registro(ticket_id="TK-2")]
+    filtrado, previos, pendientes = populate._filtrar_delta("mongo", lote)
+    assert filtrado == lote
+    assert previos == {}
+    assert len(pendientes) == 2
+
+
+def test_sin_cambios_se_omite_y_cambios_traen_el_previo(db):
+    _confirmar(db, populate._filtrar_delta("mongo", [_registro(), _registro(ticket_id="TK-2")])[2])
+
+    # created_at cambia en cada lectura y no cuenta como cambio
+    sin_cambio = _registro()
+    cambiado = _registro(ticket_id="TK-2", status="cerrado")
+    filtrado, previos, pendientes = populate._filtrar_delta("mongo", [sin_cambio, cambiado])
+
+    assert filtrado == [cambiado]
+    assert list(previos) == ["TK-2"]
+    assert previos["TK-2"]["status"] == "abierto"
+    assert len(pendientes) == 1
+
+
+def test_la_watermark_es_por_sink(db):
+    _confirmar(db, populate._filtrar_delta("mongo", [_registro()])[2])
+    filtrado, _, _ = populate._filtrar_delta("cassandra", [_registro()])
+    assert len(filtrado) == 1
+
+
+def test_cambio_de_usuario_denormalizado_cuenta(db):
+    _confirmar(db, populate._filtrar_delta("mongo", [_registro()])[2])
+    filtrado, previos, _ = populate._filtrar_delta("mongo", [_registro(role="docente")])
+    assert len(filtrado) == 1
+    assert previos["TK-1"]["role"] == "alumno"
@@ -0,0 +1,37 @@
+import json
+
+import populate
+
+
+def test_nodo_rdf():
+    assert populate._nodo_rdf("0x1a") == "<0x1a>"
+    assert populate._nodo_rdf("_:t_TK-1") == "_:t_TK-1"
+    # Letras (tambien con acento) se quedan; lo demas se escapa
+    assert populate._nodo_rdf("_:p_año x") == "_:p_año_20_x"
+    assert populate._nodo_rdf("_:u_a.b@c") == "_:u_a_2e_b_40_c"
+
+
+def test_nquads_escapa_literales():
+    obj = {
+        "uid": "_:t_TK-1",
+        "titulo": 'Dice "hola"\nen dos lineas \\ fin',
+        "prioridad": 3,
+        "fecha_creacion": "2025-03-01T10:30:00",
+        "creado_por": {"uid": "0x2"},
+        "contiene": [{"uid": "_:p_dano"}, {"uid": "_:p_puerta"}],
+    }
+    lineas = list(populate._nquads(obj))
+    assert lineas[0] == f"_:t_TK-1 <titulo> {json.dumps(obj['titulo'])} .\n"
+    assert "\n" not in lineas[0][:-1]
+    assert lineas[1] == '_:t_TK-1 <prioridad> "3" .\n'
+    assert lineas[2] == '_:t_TK-1 <fecha_creacion> "2025-03-01T10:30:00"^^<xs:dateTime> .\n'
+    assert lineas[3] == "_:t_TK-1 <creado_por> <0x2> .\n"
+    assert lineas[4:] == [
+        "_:t_TK-1 <contiene> _:p_dano .\n",
+        "_:t_TK-1 <contiene> _:p_puerta .\n",
+    ]
+
+
+def test_nquads_conserva_acentos():
+    (linea,) = populate._nquads({"uid": "0x1", "titulo": "Daño"})
+    assert linea == '<0x1> <titulo> "Daño" .\n'
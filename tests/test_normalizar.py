@@ -0,0 +1,30 @@
+from Mongo.normalizar import normalizar_email, normalizar_texto, rango_prefijo
+
+
+def _coincide(prefijo, titulo):
+    rango = rango_prefijo(prefijo)
+    valor = normalizar_texto(titulo)
+    return rango["$gte"] <= valor < rango["$lt"]
+
+
+def test_normalizar_texto():
+    assert normalizar_texto("  Daño   en PANTALLA ") == "dano en pantalla"
+    assert normalizar_texto("Ñandú") == "nandu"
+    assert normalizar_texto(None) == ""
+
+
+def test_prefijo_sin_acentos_ni_mayusculas():
+    assert _coincide("Dano", "Daño en pantalla")
+    assert _coincide("DAÑO", "daño en pantalla")
+    assert _coincide("daño en", "Daño en pantalla")
+    assert not _coincide("Dano", "Falla en proyector")
+    assert not _coincide("Danos", "Daño en pantalla")
+
+
+def test_prefijo_vacio():
+    assert rango_prefijo("   ") == {"$exists": True}
+
+
+def test_normalizar_email():
+    assert normalizar_email(" Ana@ITESO.mx ") == "ana@iteso.mx"
+    assert normalizar_email(None) == ""
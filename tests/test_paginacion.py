@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from Mongo.client import ORDEN_TICKETS, ORDEN_USUARIOS, _codificar_token, _filtro_despues_de
+
+
+def test_token_conserva_fechas_y_object_ids():
+    ultimo = {"user_id": "U007", "_id": ObjectId("65f000000000000000000001")}
+    filtro = _filtro_despues_de(_codificar_token(ultimo, ORDEN_USUARIOS), ORDEN_USUARIOS)
+    assert filtro == {"$or": [
+        {"user_id": {"$gt": "U007"}},
+        {"user_id": "U007", "_id": {"$gt": ObjectId("65f000000000000000000001")}},
+    ]}
+
+
+def test_filtro_respeta_direccion_descendente():
+    fecha = datetime(2025, 3, 1, 10, 30)
+    token = _codificar_token({"created_at": fecha, "ticket_id": "TK-9"}, ORDEN_TICKETS)
+    assert _filtro_despues_de(token, ORDEN_TICKETS) == {"$or": [
+        {"created_at": {"$lt": fecha}},
+        {"created_at": fecha, "ticket_id": {"$lt": "TK-9"}},
+    ]}
+
+
+def test_token_es_texto_seguro_para_url():
+    token = _codificar_token({"created_at": datetime(2025, 1, 1), "ticket_id": "TK-1"}, ORDEN_TICKETS)
+    assert all(c.isalnum() or c in "-_=" for c in token)